@@ -93,6 +93,37 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'portfolio-tracker',
+    }
+}
+
+PORTFOLIO_METRICS_CACHE_TIMEOUT = 60 * 60
+
+# Optional memory-mapped columnar copy of the prices used by analytics reads.
+# Disabled when None; set it to e.g. BASE_DIR / 'price_store' and run
+# `python manage.py build_price_store` to enable it.
+PRICE_STORE_DIR = None
+
+# Metrics and trades fill a missing price with the asset's last price when it is
+# at most this many calendar days old. Off by default: with 0 only prices of the
+# same date are used, so an asset without a price on a date drops out of the
+# valuation of that date.
+PRICE_STALENESS_DAYS = 0
+
+# Trades lock their portfolio; a transaction that fails on lock contention is
+# retried with backoff up to this many times before the trade is rejected.
+TRADE_MAX_ATTEMPTS = 5
+
+# Number of processes backtests run on. None uses one per CPU core.
+BACKTEST_WORKERS = None
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
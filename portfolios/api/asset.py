@@ -8,7 +8,7 @@ from ..services.portfolio_service import (
 )
 from portfolios.models import Portfolio, Asset, Price, Holding
 from rest_framework import serializers, status
-from portfolios.selectors.portfolio_selector import get_portfolio_assets
+from portfolios.selectors.portfolio_selector import get_portfolio_assets, count_portfolio_assets
 from .pagination import StandardResultsSetPagination
 
 
@@ -26,7 +26,9 @@ class PortfolioAssetsApi(APIView):
     
     def get(self, request: Request, portfolio_id: int) -> Response:
         try:
-            assets_data, latest_date = get_portfolio_assets(portfolio_id)
+            paginator = self.pagination_class()
+            offset, limit = paginator.get_window(request)
+            assets_data, latest_date = get_portfolio_assets(portfolio_id, offset, limit)
             if latest_date is None:
                 return Response({"assets": []})
             
@@ -35,13 +37,10 @@ class PortfolioAssetsApi(APIView):
                 "date": latest_date.strftime("%Y-%m-%d"),
                 "assets": assets_data
             }
-            
-            paginator = self.pagination_class()
-            paginated_data = paginator.paginate_queryset(response_data["assets"], request)
-            response_data["assets"] = paginated_data
+            count = count_portfolio_assets(portfolio_id)
             
             serializer = self.OutputSerializer(response_data)
-            return paginator.get_paginated_response(serializer.data)
+            return paginator.get_windowed_response(serializer.data, count)
         except Portfolio.DoesNotExist:
             return Response({"error": "Portfolio not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -50,9 +49,11 @@ class BuyAssetApi(APIView):
     class InputSerializer(serializers.Serializer):
         amount = serializers.DecimalField(max_digits=20, decimal_places=2)
         date = serializers.DateField(required=False)
+        dry_run = serializers.BooleanField(default=False)
 
     class OutputSerializer(serializers.Serializer):
         message = serializers.CharField()
+        dry_run = serializers.BooleanField()
         portfolio_id = serializers.IntegerField()
         asset_id = serializers.IntegerField()
         quantity = serializers.DecimalField(max_digits=20, decimal_places=4)
@@ -67,7 +68,9 @@ class BuyAssetApi(APIView):
         date = input_serializer.validated_data.get('date', datetime.now().date())
 
         try:
-            response = execute_buy_transaction(portfolio_id, asset_id, amount, date)
+            response = execute_buy_transaction(
+                portfolio_id, asset_id, amount, date, input_serializer.validated_data['dry_run']
+            )
             output_serializer = self.OutputSerializer(response)
             return Response(output_serializer.data)
         except (Portfolio.DoesNotExist, Asset.DoesNotExist):
@@ -86,9 +89,11 @@ class SellAssetApi(APIView):
     class InputSerializer(serializers.Serializer):
         amount = serializers.DecimalField(max_digits=20, decimal_places=2)
         date = serializers.DateField(required=False)
+        dry_run = serializers.BooleanField(default=False)
 
     class OutputSerializer(serializers.Serializer):
         message = serializers.CharField()
+        dry_run = serializers.BooleanField()
         portfolio_id = serializers.IntegerField()
         asset_id = serializers.IntegerField()
         quantity = serializers.DecimalField(max_digits=20, decimal_places=4)
@@ -103,7 +108,9 @@ class SellAssetApi(APIView):
         date = input_serializer.validated_data.get('date', datetime.now().date())
 
         try:
-            response = execute_sell_transaction(portfolio_id, asset_id, amount, date)
+            response = execute_sell_transaction(
+                portfolio_id, asset_id, amount, date, input_serializer.validated_data['dry_run']
+            )
             output_serializer = self.OutputSerializer(response)
             return Response(output_serializer.data)
         except (Portfolio.DoesNotExist, Asset.DoesNotExist) as e:
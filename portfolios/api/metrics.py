@@ -1,15 +1,62 @@
+import csv
+import json
+from datetime import date
+from typing import Iterator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.request import Request
 from portfolios.api.pagination import StandardResultsSetPagination
-from portfolios.services.metrics_service import get_portfolio_metrics
+from portfolios.models import Portfolio
+from portfolios.services.metrics_service import get_portfolio_metrics_page, get_batch_portfolio_metrics, stream_portfolio_metrics
+from portfolios.services.metrics_cache_service import get_metrics_cache_stats
+from portfolios.services.risk_service import DEFAULT_VOLATILITY_WINDOWS, get_portfolio_risk
+from portfolios.services.metrics_engine import DAILY, parse_resolution
+
+
+class Echo:
+    def write(self, value: str) -> str:
+        return value
+
+
+def ndjson_lines(metrics: Iterator[dict]) -> Iterator[str]:
+    for result in metrics:
+        yield json.dumps(result, cls=DjangoJSONEncoder) + "\n"
+
+
+def csv_lines(metrics: Iterator[dict], asset_names: list[str]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(["date", "total_value", *asset_names])
+    for result in metrics:
+        weights = result["weights"]
+        yield writer.writerow([
+            result["date"].isoformat(),
+            result["total_value"],
+            *(weights.get(asset_name, "") for asset_name in asset_names)
+        ])
 
 
 class PortfolioMetricsApi(APIView):
     class InputSerializer(serializers.Serializer):
         start_date = serializers.DateField()
         end_date = serializers.DateField()
+        stream = serializers.ChoiceField(choices=['ndjson', 'csv'], required=False)
+        resolution = serializers.CharField(required=False, default=DAILY)
+
+        def validate_resolution(self, value):
+            try:
+                return parse_resolution(value)
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
+
+        def validate(self, data):
+            if data['start_date'] > data['end_date']:
+                raise serializers.ValidationError("Start date must be before or equal to end date")
+            if data.get('stream') and data['resolution'] != DAILY:
+                raise serializers.ValidationError("Streams return daily metrics and cannot be downsampled")
+            return data
 
     class OutputSerializer(serializers.Serializer):
         date = serializers.DateField()
@@ -24,17 +71,125 @@ class PortfolioMetricsApi(APIView):
 
         start_date = input_serializer.validated_data['start_date']
         end_date = input_serializer.validated_data['end_date']
+        stream = input_serializer.validated_data.get('stream')
+        resolution = input_serializer.validated_data['resolution']
 
         try:
-            metrics = get_portfolio_metrics(portfolio_id, start_date, end_date)
-            output_serializer = self.OutputSerializer(metrics, many=True)
-            
+            if stream:
+                return self.get_streaming_response(portfolio_id, start_date, end_date, stream)
+
             paginator = self.pagination_class()
-            paginated_data = paginator.paginate_queryset(output_serializer.data, request)
-            return paginator.get_paginated_response(paginated_data)
+            offset, limit = paginator.get_window(request)
+            metrics, count = get_portfolio_metrics_page(portfolio_id, start_date, end_date, offset, limit, resolution)
+            output_serializer = self.OutputSerializer(metrics, many=True)
+            return paginator.get_windowed_response(output_serializer.data, count)
             
         except ValueError as e:
             return Response(
                 {"error": str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
-            ) 
+            )
+
+    def get_streaming_response(self, portfolio_id: int, start_date: date, end_date: date, stream: str) -> StreamingHttpResponse:
+        asset_names, metrics = stream_portfolio_metrics(portfolio_id, start_date, end_date)
+        if stream == 'csv':
+            response = StreamingHttpResponse(csv_lines(metrics, asset_names), content_type='text/csv')
+            response['Content-Disposition'] = f'attachment; filename="portfolio_{portfolio_id}_metrics.csv"'
+            return response
+        return StreamingHttpResponse(ndjson_lines(metrics), content_type='application/x-ndjson')
+
+
+class PortfolioRiskApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        start_date = serializers.DateField()
+        end_date = serializers.DateField()
+        windows = serializers.ListField(
+            child=serializers.IntegerField(min_value=2),
+            required=False,
+            default=list(DEFAULT_VOLATILITY_WINDOWS)
+        )
+        risk_free_rate = serializers.FloatField(required=False, default=0.0)
+
+        def validate(self, data):
+            if data['start_date'] > data['end_date']:
+                raise serializers.ValidationError("Start date must be before or equal to end date")
+            return data
+
+    class OutputSerializer(serializers.Serializer):
+        class SummarySerializer(serializers.Serializer):
+            total_return = serializers.FloatField(allow_null=True)
+            volatility = serializers.FloatField(allow_null=True)
+            max_drawdown = serializers.FloatField(allow_null=True)
+            max_drawdown_peak_date = serializers.DateField(allow_null=True)
+            max_drawdown_trough_date = serializers.DateField(allow_null=True)
+            sharpe_ratio = serializers.FloatField(allow_null=True)
+
+        class SeriesSerializer(serializers.Serializer):
+            date = serializers.DateField()
+            total_value = serializers.DecimalField(max_digits=20, decimal_places=2)
+            daily_return = serializers.FloatField(allow_null=True)
+            drawdown = serializers.FloatField()
+            volatility = serializers.DictField(child=serializers.FloatField(allow_null=True))
+
+        summary = SummarySerializer()
+        series = SeriesSerializer(many=True)
+
+    def get(self, request: Request, portfolio_id: int) -> Response:
+        input_serializer = self.InputSerializer(data=request.query_params)
+        input_serializer.is_valid(raise_exception=True)
+
+        try:
+            risk = get_portfolio_risk(portfolio_id, **input_serializer.validated_data)
+            output_serializer = self.OutputSerializer(risk)
+            return Response(output_serializer.data)
+        except Portfolio.DoesNotExist:
+            return Response({"error": "Portfolio not found"}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class PortfolioBatchMetricsApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        portfolio_ids = serializers.ListField(child=serializers.IntegerField(), min_length=1)
+        start_date = serializers.DateField()
+        end_date = serializers.DateField()
+
+        def validate(self, data):
+            if data['start_date'] > data['end_date']:
+                raise serializers.ValidationError("Start date must be before or equal to end date")
+            return data
+
+    class OutputSerializer(serializers.Serializer):
+        portfolio_id = serializers.IntegerField()
+        metrics = PortfolioMetricsApi.OutputSerializer(many=True)
+
+    def get(self, request: Request) -> Response:
+        input_serializer = self.InputSerializer(data=request.query_params)
+        input_serializer.is_valid(raise_exception=True)
+
+        try:
+            metrics = get_batch_portfolio_metrics(
+                input_serializer.validated_data['portfolio_ids'],
+                input_serializer.validated_data['start_date'],
+                input_serializer.validated_data['end_date']
+            )
+            output_serializer = self.OutputSerializer(
+                [{"portfolio_id": portfolio_id, "metrics": results} for portfolio_id, results in metrics.items()],
+                many=True
+            )
+            return Response({"results": output_serializer.data})
+        except Portfolio.DoesNotExist as e:
+            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class MetricsCacheStatsApi(APIView):
+    class OutputSerializer(serializers.Serializer):
+        hits = serializers.IntegerField()
+        misses = serializers.IntegerField()
+        hit_ratio = serializers.FloatField()
+
+    def get(self, request: Request) -> Response:
+        serializer = self.OutputSerializer(get_metrics_cache_stats())
+        return Response(serializer.data)
@@ -18,5 +18,15 @@ class StandardResultsSetPagination(_LimitOffsetPagination):
             ('results', data)
         ])
 
+    def get_window(self, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        return self.offset, self.limit
+
+    def get_windowed_response(self, data, count):
+        self.count = count
+        return self.get_paginated_response(data)
+
     def get_paginated_response(self, data):
         return Response(self.get_paginated_data(data))
@@ -4,12 +4,18 @@ from rest_framework.response import Response
 from datetime import datetime
 from rest_framework.request import Request
 
-from portfolios.models import Portfolio, Asset, Holding, Price
+from portfolios.models import Portfolio, Asset, Holding, Price, Weight
 from portfolios.selectors.portfolio_selector import get_portfolio_by_id
 from portfolios.selectors.holding_selector import get_latest_portfolio_holdings
 from portfolios.selectors.weight_selector import get_latest_portfolio_weights
+from portfolios.selectors.trade_selector import get_portfolio_trades
 from .pagination import StandardResultsSetPagination
-from portfolios.services.portfolio_service import rebalance_portfolio
+from portfolios.services.portfolio_service import (
+    TRADE_SIDES,
+    rebalance_portfolio,
+    rebalance_to_target_weights,
+    execute_batch_trades
+)
 
 
 class PortfolioApi(APIView):    
@@ -55,19 +61,25 @@ class PortfolioDetailApi(APIView):
 class PortfolioHoldingsApi(APIView):
     pagination_class = StandardResultsSetPagination
 
+    class InputSerializer(serializers.Serializer):
+        as_of = serializers.DateField(required=False)
+
     class OutputSerializer(serializers.Serializer):
         id = serializers.IntegerField()
         portfolio_id = serializers.IntegerField()
         asset_id = serializers.IntegerField()
-        quantity = serializers.DecimalField(max_digits=20, decimal_places=4)
+        quantity = serializers.DecimalField(max_digits=20, decimal_places=4, source='position')
         date = serializers.DateField()
         created_at = serializers.DateTimeField()
         updated_at = serializers.DateTimeField()
 
     def get(self, request: Request, portfolio_id: int) -> Response:
+        input_serializer = self.InputSerializer(data=request.query_params)
+        input_serializer.is_valid(raise_exception=True)
+
         try:
             portfolio = get_portfolio_by_id(portfolio_id)
-            holdings = get_latest_portfolio_holdings(portfolio)
+            holdings = get_latest_portfolio_holdings(portfolio, input_serializer.validated_data.get('as_of'))
             
             paginator = self.pagination_class()
             page = paginator.paginate_queryset(holdings, request)
@@ -80,6 +92,80 @@ class PortfolioHoldingsApi(APIView):
             )
 
 
+class PortfolioTradesApi(APIView):
+    pagination_class = StandardResultsSetPagination
+
+    class InputSerializer(serializers.Serializer):
+        class OrderSerializer(serializers.Serializer):
+            asset_id = serializers.IntegerField()
+            side = serializers.ChoiceField(choices=TRADE_SIDES)
+            amount = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+        date = serializers.DateField(required=False)
+        orders = OrderSerializer(many=True, allow_empty=False)
+
+    class OutputSerializer(serializers.Serializer):
+        id = serializers.IntegerField()
+        portfolio_id = serializers.IntegerField()
+        asset_id = serializers.IntegerField()
+        quantity = serializers.DecimalField(max_digits=20, decimal_places=4)
+        price = serializers.DecimalField(max_digits=20, decimal_places=2)
+        date = serializers.DateField()
+        created_at = serializers.DateTimeField()
+
+    class BatchOutputSerializer(serializers.Serializer):
+        class TradeSerializer(serializers.Serializer):
+            asset_id = serializers.IntegerField()
+            side = serializers.CharField()
+            quantity = serializers.DecimalField(max_digits=20, decimal_places=4)
+            price = serializers.DecimalField(max_digits=20, decimal_places=2)
+            total = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+        message = serializers.CharField()
+        portfolio_id = serializers.IntegerField()
+        date = serializers.DateField()
+        trades = TradeSerializer(many=True)
+        total_bought = serializers.DecimalField(max_digits=20, decimal_places=2)
+        total_sold = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+    def get(self, request: Request, portfolio_id: int) -> Response:
+        try:
+            portfolio = get_portfolio_by_id(portfolio_id)
+            trades = get_portfolio_trades(portfolio)
+
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(trades, request)
+            serializer = self.OutputSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        except Portfolio.DoesNotExist:
+            return Response(
+                {"error": "Portfolio not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+    def post(self, request: Request, portfolio_id: int) -> Response:
+        input_serializer = self.InputSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+
+        orders = input_serializer.validated_data['orders']
+        date = input_serializer.validated_data.get('date', datetime.now().date())
+
+        try:
+            response_data = execute_batch_trades(portfolio_id, orders, date)
+            output_serializer = self.BatchOutputSerializer(response_data)
+            return Response(output_serializer.data)
+        except (Portfolio.DoesNotExist, Asset.DoesNotExist) as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except (Price.DoesNotExist, ValueError) as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
 class PortfolioWeightsApi(APIView):
     pagination_class = StandardResultsSetPagination
 
@@ -110,6 +196,7 @@ class PortfolioWeightsApi(APIView):
 
 class TransactionSerializer(serializers.Serializer):
     message = serializers.CharField()
+    dry_run = serializers.BooleanField()
     portfolio_id = serializers.IntegerField()
     asset_id = serializers.IntegerField()
     quantity = serializers.DecimalField(max_digits=20, decimal_places=4)
@@ -129,8 +216,10 @@ class RebalancePortfolioApi(APIView):
         buy_amount = serializers.DecimalField(max_digits=20, decimal_places=2)
         sell_asset_id = serializers.IntegerField()
         buy_asset_id = serializers.IntegerField()
+        dry_run = serializers.BooleanField(default=False)
 
     class OutputSerializer(serializers.Serializer):
+        dry_run = serializers.BooleanField()
         sell_transaction = TransactionSerializer()
         buy_transaction = TransactionSerializer()
         metrics = MetricsSerializer(many=True)
@@ -151,7 +240,8 @@ class RebalancePortfolioApi(APIView):
                 sell_amount=data['sell_amount'],
                 buy_amount=data['buy_amount'],
                 start_date=start_date,
-                end_date=end_date
+                end_date=end_date,
+                dry_run=data['dry_run']
             )
             
             output_serializer = self.OutputSerializer(response_data)
@@ -167,3 +257,68 @@ class RebalancePortfolioApi(APIView):
                 {"error": str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class PortfolioTargetRebalanceApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        class TargetWeightSerializer(serializers.Serializer):
+            asset_id = serializers.IntegerField()
+            weight = serializers.DecimalField(max_digits=6, decimal_places=4, min_value=0, max_value=1)
+
+        date = serializers.DateField(required=False)
+        weights = TargetWeightSerializer(many=True, allow_empty=False, required=False)
+        dry_run = serializers.BooleanField(default=False)
+
+        def validate_weights(self, weights):
+            asset_ids = [weight['asset_id'] for weight in weights]
+            if len(set(asset_ids)) != len(asset_ids):
+                raise serializers.ValidationError("Each asset can only have one target weight")
+            return weights
+
+    class OutputSerializer(serializers.Serializer):
+        class TradeSerializer(serializers.Serializer):
+            asset_id = serializers.IntegerField()
+            side = serializers.CharField()
+            quantity = serializers.DecimalField(max_digits=20, decimal_places=4)
+            price = serializers.DecimalField(max_digits=20, decimal_places=2)
+            total = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+        class PositionSerializer(serializers.Serializer):
+            asset_id = serializers.IntegerField()
+            quantity = serializers.DecimalField(max_digits=20, decimal_places=4)
+            weight = serializers.DecimalField(max_digits=7, decimal_places=6)
+
+        message = serializers.CharField()
+        dry_run = serializers.BooleanField()
+        portfolio_id = serializers.IntegerField()
+        date = serializers.DateField()
+        total_value = serializers.DecimalField(max_digits=20, decimal_places=2)
+        trades = TradeSerializer(many=True)
+        weights = PositionSerializer(many=True)
+
+    def post(self, request: Request, portfolio_id: int) -> Response:
+        input_serializer = self.InputSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+
+        data = input_serializer.validated_data
+        date = data.get('date', datetime.now().date())
+        target_weights = (
+            {weight['asset_id']: weight['weight'] for weight in data['weights']}
+            if 'weights' in data
+            else None
+        )
+
+        try:
+            response_data = rebalance_to_target_weights(portfolio_id, date, target_weights, data['dry_run'])
+            output_serializer = self.OutputSerializer(response_data)
+            return Response(output_serializer.data)
+        except (Portfolio.DoesNotExist, Asset.DoesNotExist) as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except (Price.DoesNotExist, Weight.DoesNotExist, ValueError) as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
@@ -0,0 +1,42 @@
+from rest_framework.views import APIView
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.request import Request
+from portfolios.services.price_service import (
+    PRICE_CONFLICT_IGNORE,
+    PRICE_CONFLICT_UPDATE,
+    bulk_create_prices
+)
+
+
+class BulkPriceApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        # Rows are validated by the service so that a bad row is reported back
+        # instead of failing the whole request.
+        prices = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+        on_conflict = serializers.ChoiceField(
+            choices=[PRICE_CONFLICT_IGNORE, PRICE_CONFLICT_UPDATE],
+            default=PRICE_CONFLICT_IGNORE
+        )
+
+    class OutputSerializer(serializers.Serializer):
+        class RejectSerializer(serializers.Serializer):
+            index = serializers.IntegerField()
+            error = serializers.CharField()
+
+        received = serializers.IntegerField()
+        written = serializers.IntegerField()
+        rejected = RejectSerializer(many=True)
+        elapsed_seconds = serializers.FloatField()
+        rows_per_second = serializers.FloatField()
+
+    def post(self, request: Request) -> Response:
+        input_serializer = self.InputSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+
+        result = bulk_create_prices(
+            input_serializer.validated_data['prices'],
+            input_serializer.validated_data['on_conflict']
+        )
+        output_serializer = self.OutputSerializer(result)
+        return Response(output_serializer.data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,74 @@
+import tempfile
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse
+from rest_framework.views import APIView
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.request import Request
+from portfolios.services.transfer_service import (
+    PARQUET,
+    TRANSFER_CONFLICT_IGNORE,
+    TRANSFER_CONFLICT_UPDATE,
+    TRANSFER_FORMATS,
+    export_table,
+    import_table
+)
+
+
+class DataExportApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        file_format = serializers.ChoiceField(choices=TRANSFER_FORMATS, default=PARQUET)
+
+    def get(self, request: Request, table: str) -> Response:
+        input_serializer = self.InputSerializer(data=request.query_params)
+        input_serializer.is_valid(raise_exception=True)
+        file_format = input_serializer.validated_data['file_format']
+
+        export_file = tempfile.TemporaryFile()
+        try:
+            export_table(table, file_format, export_file)
+        except ValueError as e:
+            export_file.close()
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ImproperlyConfigured as e:
+            export_file.close()
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        export_file.seek(0)
+        return FileResponse(export_file, as_attachment=True, filename=f"{table}.{file_format}")
+
+
+class DataImportApi(APIView):
+    class InputSerializer(serializers.Serializer):
+        file = serializers.FileField()
+        file_format = serializers.ChoiceField(choices=TRANSFER_FORMATS, default=PARQUET)
+        on_conflict = serializers.ChoiceField(
+            choices=[TRANSFER_CONFLICT_IGNORE, TRANSFER_CONFLICT_UPDATE],
+            default=TRANSFER_CONFLICT_IGNORE
+        )
+
+    class OutputSerializer(serializers.Serializer):
+        received = serializers.IntegerField()
+        written = serializers.IntegerField()
+        rejected = serializers.IntegerField()
+        elapsed_seconds = serializers.FloatField()
+        rows_per_second = serializers.FloatField()
+
+    def post(self, request: Request, table: str) -> Response:
+        input_serializer = self.InputSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+
+        try:
+            result = import_table(
+                table,
+                input_serializer.validated_data['file_format'],
+                input_serializer.validated_data['file'],
+                input_serializer.validated_data['on_conflict']
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ImproperlyConfigured as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        output_serializer = self.OutputSerializer(result)
+        return Response(output_serializer.data, status=status.HTTP_201_CREATED)
@@ -1,5 +1,7 @@
 from django.urls import path
-from .metrics import PortfolioMetricsApi
+from .metrics import PortfolioMetricsApi, PortfolioRiskApi, PortfolioBatchMetricsApi, MetricsCacheStatsApi
+from .price import BulkPriceApi
+from .transfer import DataExportApi, DataImportApi
 from .asset import (
     PortfolioAssetsApi,
     BuyAssetApi,
@@ -9,7 +11,9 @@ from .portfolio import (
     PortfolioApi,
     PortfolioDetailApi,
     PortfolioHoldingsApi,
+    PortfolioTradesApi,
     PortfolioWeightsApi,
+    PortfolioTargetRebalanceApi,
     RebalancePortfolioApi
 )
 
@@ -19,9 +23,17 @@ urlpatterns = [
     path('portfolios/<int:pk>/', PortfolioDetailApi.as_view(), name='portfolio-detail'),
     path('portfolios/<int:portfolio_id>/assets/', PortfolioAssetsApi.as_view(), name='portfolio-assets'),
     path('portfolios/<int:portfolio_id>/holdings/', PortfolioHoldingsApi.as_view(), name='portfolio-holdings'),
+    path('portfolios/<int:portfolio_id>/trades/', PortfolioTradesApi.as_view(), name='portfolio-trades'),
     path('portfolios/<int:portfolio_id>/weights/', PortfolioWeightsApi.as_view(), name='portfolio-weights'),
     path('portfolios/<int:portfolio_id>/metrics/', PortfolioMetricsApi.as_view(), name='portfolio-metrics'),
+    path('portfolios/<int:portfolio_id>/risk/', PortfolioRiskApi.as_view(), name='portfolio-risk'),
+    path('prices/bulk/', BulkPriceApi.as_view(), name='bulk-prices'),
+    path('export/<str:table>/', DataExportApi.as_view(), name='data-export'),
+    path('import/<str:table>/', DataImportApi.as_view(), name='data-import'),
+    path('metrics/', PortfolioBatchMetricsApi.as_view(), name='portfolio-batch-metrics'),
+    path('metrics/cache/', MetricsCacheStatsApi.as_view(), name='metrics-cache-stats'),
     path('portfolios/<int:portfolio_id>/assets/<int:asset_id>/buy/', BuyAssetApi.as_view(), name='buy-asset'),
     path('portfolios/<int:portfolio_id>/assets/<int:asset_id>/sell/', SellAssetApi.as_view(), name='sell-asset'),
     path('portfolios/<int:portfolio_id>/rebalance/', RebalancePortfolioApi.as_view(), name='execute-sell-buy-and-metrics'),
+    path('portfolios/<int:portfolio_id>/rebalance/targets/', PortfolioTargetRebalanceApi.as_view(), name='portfolio-rebalance-targets'),
 ]
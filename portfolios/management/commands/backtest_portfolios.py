@@ -0,0 +1,64 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from portfolios.models import Portfolio
+from portfolios.services.backtest_engine import BACKTEST_STRATEGIES, MONTHLY
+from portfolios.services.backtest_service import BACKTEST_DRIFT_THRESHOLD, run_backtests
+from datetime import datetime
+
+
+class Command(BaseCommand):
+    """
+    Backtest rebalancing portfolios to their Weight targets over a date range.
+    Arguments:
+        --start-date: First date of the backtest in YYYY-MM-DD format
+        --end-date: Last date of the backtest in YYYY-MM-DD format
+        --portfolio-id: Portfolio to backtest, can be repeated (defaults to every portfolio)
+        --strategy: monthly (default), quarterly or drift, can be repeated
+        --drift-threshold: Weight deviation that triggers a drift rebalance (defaults to 0.05)
+        --initial-value: Value invested on the first date (defaults to each portfolio's initial value)
+        --workers: Number of processes the backtests run on (defaults to BACKTEST_WORKERS or the CPU count)
+        --output: Optional path of a JSON file to write the value series and trade logs to
+    """
+    help = 'Backtest rebalancing portfolios to their weight targets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', type=str, required=True, help='First date of the backtest in YYYY-MM-DD format')
+        parser.add_argument('--end-date', type=str, required=True, help='Last date of the backtest in YYYY-MM-DD format')
+        parser.add_argument('--portfolio-id', type=int, action='append', help='Portfolio to backtest. Can be repeated. Defaults to every portfolio.')
+        parser.add_argument('--strategy', type=str, action='append', choices=BACKTEST_STRATEGIES, help='Rebalancing strategy. Can be repeated. Defaults to monthly.')
+        parser.add_argument('--drift-threshold', type=float, default=BACKTEST_DRIFT_THRESHOLD, help='Weight deviation that triggers a drift rebalance')
+        parser.add_argument('--initial-value', type=float, help="Value invested on the first date. Defaults to each portfolio's initial value.")
+        parser.add_argument('--workers', type=int, help='Number of processes the backtests run on')
+        parser.add_argument('--output', type=str, help='Path of a JSON file to write the value series and trade logs to')
+
+    def handle(self, **options):
+        try:
+            start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            portfolio_ids = options['portfolio_id'] or list(Portfolio.objects.values_list('id', flat=True))
+            results = run_backtests(
+                portfolio_ids,
+                options['strategy'] or [MONTHLY],
+                start_date,
+                end_date,
+                initial_value=options['initial_value'],
+                drift_threshold=options['drift_threshold'],
+                workers=options['workers']
+            )
+        except (ValueError, Portfolio.DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        for result in results:
+            if result['final_value'] is None:
+                self.stdout.write(f'Portfolio {result["portfolio_id"]} {result["strategy"]}: no prices in range')
+                continue
+            self.stdout.write(
+                f'Portfolio {result["portfolio_id"]} {result["strategy"]}: final value {result["final_value"]:.2f}, '
+                f'return {result["total_return"]:.2%}, turnover {result["turnover"]:.2f}, '
+                f'{result["rebalances"]} rebalances, {len(result["trades"])} trades'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, cls=DjangoJSONEncoder)
+        self.stdout.write(self.style.SUCCESS(f'Ran {len(results)} backtests'))
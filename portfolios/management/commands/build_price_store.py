@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from portfolios.services.price_store_service import rebuild_price_store, refresh_price_store
+from datetime import datetime
+
+
+class Command(BaseCommand):
+    """
+    Build the memory-mapped columnar price store configured by PRICE_STORE_DIR.
+    Arguments:
+        --start-date: Date in YYYY-MM-DD format from which to refresh an existing store (defaults to a full rebuild)
+    """
+    help = 'Build the memory-mapped columnar price store'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            help='Date in YYYY-MM-DD format from which to refresh an existing store. Defaults to a full rebuild.'
+        )
+
+    def handle(self, **options):
+        try:
+            if options['start_date']:
+                start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+                prices = refresh_price_store(start_date)
+            else:
+                prices = rebuild_price_store()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Price store built from {prices} prices'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from portfolios.services.trading_calendar_service import build_trading_calendar
+from datetime import datetime
+
+
+class Command(BaseCommand):
+    """
+    Build the trading calendar used as the dates of the price grid.
+    Weekdays between the start and end dates are trading days, except holidays.
+    Arguments:
+        --start-date: First date of the calendar in YYYY-MM-DD format
+        --end-date: Last date of the calendar in YYYY-MM-DD format
+        --holidays: Dates in YYYY-MM-DD format that are not trading days
+    """
+    help = 'Build the trading calendar used as the dates of the price grid'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', type=str, required=True, help='First date of the calendar in YYYY-MM-DD format')
+        parser.add_argument('--end-date', type=str, required=True, help='Last date of the calendar in YYYY-MM-DD format')
+        parser.add_argument('--holidays', type=str, nargs='*', default=[], help='Dates in YYYY-MM-DD format that are not trading days')
+
+    def handle(self, **options):
+        try:
+            start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            holidays = [datetime.strptime(holiday, '%Y-%m-%d').date() for holiday in options['holidays']]
+            trading_days = build_trading_calendar(start_date, end_date, holidays)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Trading calendar built with {trading_days} trading days'))
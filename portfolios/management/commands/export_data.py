@@ -0,0 +1,35 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from portfolios.services.transfer_service import (
+    PARQUET,
+    TRANSFER_CHUNK_SIZE,
+    TRANSFER_FORMATS,
+    TRANSFER_TABLES,
+    export_table
+)
+
+
+class Command(BaseCommand):
+    """
+    Export prices, weights or holdings to a Parquet or Arrow IPC file.
+    Arguments:
+        --table: Table to export (prices, weights or holdings)
+        --output: Path of the file to write
+        --format: parquet (default) or arrow
+        --chunk-size: Number of rows read and written per batch
+    """
+    help = 'Export prices, weights or holdings to a Parquet or Arrow IPC file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', type=str, required=True, choices=list(TRANSFER_TABLES), help='Table to export')
+        parser.add_argument('--output', type=str, required=True, help='Path of the file to write')
+        parser.add_argument('--format', type=str, default=PARQUET, choices=TRANSFER_FORMATS, help='File format. Defaults to parquet.')
+        parser.add_argument('--chunk-size', type=int, default=TRANSFER_CHUNK_SIZE, help='Number of rows read and written per batch')
+
+    def handle(self, **options):
+        try:
+            exported = export_table(options['table'], options['format'], options['output'], options['chunk_size'])
+        except (ValueError, ImproperlyConfigured) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {exported} {options["table"]} rows to {options["output"]}'))
@@ -0,0 +1,58 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from portfolios.services.transfer_service import (
+    PARQUET,
+    TRANSFER_CHUNK_SIZE,
+    TRANSFER_CONFLICT_IGNORE,
+    TRANSFER_CONFLICT_UPDATE,
+    TRANSFER_FORMATS,
+    TRANSFER_TABLES,
+    import_table
+)
+import os
+
+
+class Command(BaseCommand):
+    """
+    Import prices, weights or holdings from a Parquet or Arrow IPC file.
+    Arguments:
+        --table: Table to import (prices, weights or holdings)
+        --input: Path of the file to read
+        --format: parquet (default) or arrow
+        --on-conflict: ignore (default) keeps existing rows, update overwrites their values
+        --chunk-size: Number of rows read and written per batch
+    """
+    help = 'Import prices, weights or holdings from a Parquet or Arrow IPC file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', type=str, required=True, choices=list(TRANSFER_TABLES), help='Table to import')
+        parser.add_argument('--input', type=str, required=True, help='Path of the file to read')
+        parser.add_argument('--format', type=str, default=PARQUET, choices=TRANSFER_FORMATS, help='File format. Defaults to parquet.')
+        parser.add_argument(
+            '--on-conflict',
+            type=str,
+            default=TRANSFER_CONFLICT_IGNORE,
+            choices=[TRANSFER_CONFLICT_IGNORE, TRANSFER_CONFLICT_UPDATE],
+            help='ignore keeps existing rows, update overwrites their values. Defaults to ignore.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=TRANSFER_CHUNK_SIZE, help='Number of rows read and written per batch')
+
+    def handle(self, **options):
+        if not os.path.exists(options['input']):
+            raise CommandError(f'File not found: {options["input"]}')
+
+        try:
+            result = import_table(
+                options['table'],
+                options['format'],
+                options['input'],
+                options['on_conflict'],
+                options['chunk_size']
+            )
+        except (ValueError, ImproperlyConfigured) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result["written"]} of {result["received"]} {options["table"]} rows '
+            f'({result["rejected"]} rejected) at {result["rows_per_second"]:.0f} rows/s'
+        ))
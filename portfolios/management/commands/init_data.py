@@ -27,7 +27,12 @@ class Command(BaseCommand):
             return
 
         try:
-            load_data_from_excel(excel_path)
+            results = load_data_from_excel(excel_path)
+            for table, result in results.items():
+                self.stdout.write(
+                    f'Loaded {result["written"]} new {table} from {result["received"]} cells, '
+                    f'{result["rejected"]} rejected, {result["rows_per_second"]:.0f} rows/s'
+                )
             self.stdout.write(self.style.SUCCESS('Data loaded successfully from Excel'))
         except Exception as e:
             self.stdout.write(
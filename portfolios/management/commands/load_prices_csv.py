@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from portfolios.management.utils.csv_loader import CSV_CHUNK_SIZE, load_prices_from_csv
+import os
+
+
+class Command(BaseCommand):
+    """
+    Load prices from a CSV or gzip-compressed CSV file with asset, date and price columns.
+    Arguments:
+        --csv-file: Path to the CSV file (.csv or .csv.gz)
+        --chunk-size: Number of rows read, validated and written per chunk
+        --checkpoint-file: Path of the checkpoint used to resume an interrupted load. Defaults to the CSV path plus '.checkpoint'
+        --restart: Ignore an existing checkpoint and load the file from the start
+    """
+    help = 'Load prices from a CSV or gzip-compressed CSV file in chunks, resuming interrupted loads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv-file', type=str, required=True, help='Path to the CSV file (.csv or .csv.gz)')
+        parser.add_argument('--chunk-size', type=int, default=CSV_CHUNK_SIZE, help='Number of rows read, validated and written per chunk')
+        parser.add_argument(
+            '--checkpoint-file',
+            type=str,
+            help="Path of the checkpoint used to resume an interrupted load. Defaults to the CSV path plus '.checkpoint'."
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and load the file from the start')
+
+    def handle(self, **options):
+        if not os.path.exists(options['csv_file']):
+            raise CommandError(f'File not found: {options["csv_file"]}')
+        if options['chunk_size'] <= 0:
+            raise CommandError('Chunk size must be positive')
+
+        try:
+            result = load_prices_from_csv(
+                options['csv_file'],
+                options['chunk_size'],
+                options['checkpoint_file'],
+                options['restart']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if result["resumed_rows"]:
+            self.stdout.write(f'Resumed after {result["resumed_rows"]} rows loaded previously')
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {result["written"]} of {result["received"]} price rows '
+            f'({result["rejected"]} rejected) at {result["rows_per_second"]:.0f} rows/s'
+        ))
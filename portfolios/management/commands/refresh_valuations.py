@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from portfolios.models import Portfolio
+from portfolios.services.valuation_service import refresh_portfolio_valuations
+from datetime import date, datetime
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the materialized daily valuations of portfolios.
+    Arguments:
+        --portfolio-id: Only refresh the portfolio with this id (defaults to all portfolios)
+        --start-date: Date in YYYY-MM-DD format from which to refresh (defaults to the first holding date)
+    """
+    help = 'Rebuild the materialized daily valuations of portfolios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--portfolio-id',
+            type=int,
+            help='Only refresh the portfolio with this id. Defaults to all portfolios.'
+        )
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            help='Date in YYYY-MM-DD format from which to refresh. Defaults to the first holding date.'
+        )
+
+    def handle(self, **options):
+        start_date = (
+            datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+            if options['start_date']
+            else date.min
+        )
+        portfolios = Portfolio.objects.all()
+        if options['portfolio_id']:
+            portfolios = portfolios.filter(id=options['portfolio_id'])
+
+        for portfolio in portfolios:
+            refreshed = refresh_portfolio_valuations(portfolio, start_date)
+            self.stdout.write(f'Refreshed {refreshed} valuations for portfolio "{portfolio.name}"')
+
+        self.stdout.write(self.style.SUCCESS('Valuations refreshed successfully'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from portfolios.models import Portfolio
+from portfolios.selectors.portfolio_selector import get_portfolio_by_id
+from portfolios.services.trade_service import snapshot_holdings, snapshot_all_holdings
+from datetime import datetime, date
+
+
+class Command(BaseCommand):
+    """
+    Record position snapshots that fold the trade ledger into holdings, so that
+    positions are read from a recent snapshot plus a short tail of trades.
+    Arguments:
+        --date: Date of the snapshot in YYYY-MM-DD format (defaults to today)
+        --portfolio-id: Portfolio to snapshot (defaults to every portfolio)
+    """
+    help = 'Record position snapshots from the trade ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Date of the snapshot in YYYY-MM-DD format. Defaults to today.')
+        parser.add_argument('--portfolio-id', type=int, help='Portfolio to snapshot. Defaults to every portfolio.')
+
+    def handle(self, **options):
+        try:
+            snapshot_date = datetime.strptime(options['date'], '%Y-%m-%d').date() if options['date'] else date.today()
+            if options['portfolio_id']:
+                snapshots = snapshot_holdings(get_portfolio_by_id(options['portfolio_id']), snapshot_date)
+            else:
+                snapshots = snapshot_all_holdings(snapshot_date)
+        except (ValueError, Portfolio.DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Recorded {snapshots} holding snapshots on {snapshot_date}'))
@@ -0,0 +1,153 @@
+import json
+import os
+import time
+import pandas as pd
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from portfolios.models import Asset, Price
+from portfolios.selectors.asset_selector import get_asset_ids_by_names
+from portfolios.selectors.price_selector import get_price_keys_between
+from portfolios.services.price_service import MAX_PRICE, propagate_price_changes, refresh_latest_prices
+import logging
+
+logger = logging.getLogger(__name__)
+
+CSV_CHUNK_SIZE = 100_000
+CSV_COLUMNS = ('asset', 'date', 'price')
+
+# The file is read chunk_size rows at a time and every chunk is committed on its own,
+# so memory is bounded by the chunk size whatever the size of the file. After
+# each commit a checkpoint records the rows read so far, the counters and the
+# earliest date written per asset; a load that is interrupted resumes after the
+# last committed chunk, and latest prices and valuations are only refreshed once
+# the whole file is in. A chunk committed just before an interruption is read
+# again on resume, which is harmless because existing prices are kept.
+
+
+def get_checkpoint_path(file_path: str) -> str:
+    return f"{file_path}.checkpoint"
+
+def _read_checkpoint(checkpoint_path: str, file_path: str) -> dict:
+    if not os.path.exists(checkpoint_path):
+        return {"rows": 0, "written": 0, "rejected": 0, "start_dates": {}}
+    with open(checkpoint_path) as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    if checkpoint.get("file_size") != os.path.getsize(file_path):
+        error_msg = f"Checkpoint {checkpoint_path} was written for a different file than {file_path}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    logger.info(f"Resuming load of {file_path} after {checkpoint['rows']} rows")
+    return checkpoint
+
+def _write_checkpoint(checkpoint_path: str, checkpoint: dict) -> None:
+    # Written to a temporary file and renamed, so an interruption never leaves a
+    # truncated checkpoint behind.
+    temporary_path = f"{checkpoint_path}.tmp"
+    with open(temporary_path, 'w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, checkpoint_path)
+
+def _resolve_asset_ids(names: list[str], asset_ids: dict[str, int]) -> None:
+    missing_names = [name for name in names if name not in asset_ids]
+    if not missing_names:
+        return
+    Asset.objects.bulk_create([Asset(name=name) for name in missing_names], ignore_conflicts=True)
+    asset_ids.update(get_asset_ids_by_names(missing_names))
+
+def _load_chunk(chunk: pd.DataFrame, asset_ids: dict[str, int]) -> tuple[pd.DataFrame, int, int]:
+    chunk = chunk.assign(
+        asset=chunk['asset'].str.strip(),
+        date=pd.to_datetime(chunk['date'], errors='coerce', format='ISO8601'),
+        price=pd.to_numeric(chunk['price'], errors='coerce').round(2)
+    )
+    valid = (
+        chunk['asset'].notna() & (chunk['asset'] != '')
+        & chunk['date'].notna() & (chunk['date'] <= pd.Timestamp(timezone.now().date()))
+        & (chunk['price'] > 0) & (chunk['price'] < float(MAX_PRICE))
+    )
+    rejected = int((~valid).sum())
+    chunk = chunk[valid].drop_duplicates(['asset', 'date'])
+
+    _resolve_asset_ids(chunk['asset'].unique().tolist(), asset_ids)
+    chunk = chunk.assign(asset_id=chunk['asset'].map(asset_ids), date=chunk['date'].dt.date)
+    # Existing prices are kept; the ones in the range of the chunk are read with
+    # one query, so only new rows are inserted and counted as written.
+    new_prices = chunk
+    if len(chunk):
+        existing_keys = get_price_keys_between(chunk['asset_id'].unique().tolist(), chunk['date'].min(), chunk['date'].max())
+        if existing_keys:
+            keys = pd.MultiIndex.from_frame(chunk[['asset_id', 'date']])
+            new_prices = chunk[~keys.isin(list(existing_keys))]
+    Price.objects.bulk_create([
+        Price(asset_id=asset_id, date=price_date, price=Decimal(str(price)))
+        for asset_id, price_date, price in zip(new_prices['asset_id'].tolist(), new_prices['date'].tolist(), new_prices['price'].tolist())
+    ], ignore_conflicts=True)
+    return chunk, len(new_prices), rejected
+
+def load_prices_from_csv(
+    file_path: str,
+    chunk_size: int = CSV_CHUNK_SIZE,
+    checkpoint_path: str = None,
+    restart: bool = False
+) -> dict:
+    logger.info(f"Loading prices from CSV file: {file_path}")
+    started_at = time.perf_counter()
+    checkpoint_path = checkpoint_path or get_checkpoint_path(file_path)
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = _read_checkpoint(checkpoint_path, file_path)
+    checkpoint["file_size"] = os.path.getsize(file_path)
+    resumed_rows = checkpoint["rows"]
+
+    asset_ids = {}
+    # Rows already loaded are skipped line by line as they are parsed, without
+    # holding their indexes in memory. Gzip files are detected by their extension.
+    reader = pd.read_csv(
+        file_path,
+        usecols=list(CSV_COLUMNS),
+        dtype={'asset': str, 'date': str},
+        skiprows=lambda line: 0 < line <= resumed_rows,
+        chunksize=chunk_size,
+        compression='infer'
+    )
+    with reader:
+        for chunk in reader:
+            with transaction.atomic():
+                loaded, written, rejected = _load_chunk(chunk, asset_ids)
+
+            # Every valid row is propagated, including the ones already stored: a
+            # chunk committed before an interruption is found stored on resume.
+            checkpoint["rows"] += len(chunk)
+            checkpoint["written"] += written
+            checkpoint["rejected"] += rejected
+            start_dates = loaded.groupby('asset_id')['date'].min()
+            for asset_id, start_date in zip(start_dates.index.tolist(), start_dates.tolist()):
+                previous = checkpoint["start_dates"].get(str(asset_id))
+                if previous is None or start_date.isoformat() < previous:
+                    checkpoint["start_dates"][str(asset_id)] = start_date.isoformat()
+            _write_checkpoint(checkpoint_path, checkpoint)
+
+            elapsed = time.perf_counter() - started_at
+            loaded_rows = checkpoint["rows"] - resumed_rows
+            logger.info(f"Loaded {checkpoint['rows']} price rows, {checkpoint['rejected']} rejected, {loaded_rows / elapsed if elapsed else 0.0:.0f} rows/s")
+
+    start_dates = {int(asset_id): date.fromisoformat(start_date) for asset_id, start_date in checkpoint["start_dates"].items()}
+    if start_dates:
+        refresh_latest_prices(list(start_dates))
+        propagate_price_changes(list(start_dates), min(start_dates.values()))
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - started_at
+    result = {
+        "received": checkpoint["rows"],
+        "written": checkpoint["written"],
+        "rejected": checkpoint["rejected"],
+        "resumed_rows": resumed_rows,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": (checkpoint["rows"] - resumed_rows) / elapsed if elapsed else 0.0
+    }
+    logger.info(f"Loaded {result['written']} of {result['received']} prices, {result['rejected']} rejected, {result['rows_per_second']:.0f} rows/s")
+    return result
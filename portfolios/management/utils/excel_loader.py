@@ -1,99 +1,163 @@
+import time
 import pandas as pd
-from decimal import Decimal, InvalidOperation
-from portfolios.selectors.asset_selector import get_asset_by_name
-from portfolios.services.asset_service import create_asset
-from portfolios.services.portfolio_service import create_portfolio
-from portfolios.selectors.portfolio_selector import get_portfolio_by_name
-from portfolios.services.weight_service import create_weight
-from portfolios.services.price_service import create_price
+from decimal import Decimal
+from django.db import transaction
+from portfolios.models import Asset, Portfolio, Price, Weight
+from portfolios.selectors.asset_selector import get_asset_ids_by_names
+from portfolios.selectors.portfolio_selector import get_portfolio_ids_by_names
+from portfolios.selectors.price_selector import get_price_keys_between
+from portfolios.selectors.weight_selector import get_weight_keys_between
+from portfolios.services.price_service import propagate_price_changes, refresh_latest_prices
+from portfolios.services.metrics_cache_service import bump_portfolio_data_versions
 import logging
 
 logger = logging.getLogger(__name__)
 
-def load_data_from_excel(file_path: str) -> None:
+EXCEL_BATCH_SIZE = 5000
+
+def load_data_from_excel(file_path: str, batch_size: int = EXCEL_BATCH_SIZE) -> dict:
     logger.info(f"Loading data from Excel file: {file_path}")
     df_weights = pd.read_excel(file_path, sheet_name="weights")
     df_weights['date'] = pd.to_datetime(df_weights['date'], dayfirst=True)
     logger.debug(f"Loaded weights data: {len(df_weights)} rows")
-    
+
     df_prices = pd.read_excel(file_path, sheet_name="prices")
-    df_prices.set_index('date', inplace=True)
+    df_prices['date'] = pd.to_datetime(df_prices['date'])
     logger.debug(f"Loaded prices data: {len(df_prices)} rows")
-    
-    assets = create_assets(df_weights['asset'].unique())
-    portfolios = create_portfolios(df_weights.columns[2:])
-    
-    create_prices(df_prices)
-    create_weights(df_weights, portfolios, assets)
+
+    # Each sheet is melted into one row per value, so rows are validated, diffed
+    # and inserted as whole columns instead of cell by cell.
+    prices = df_prices.melt(id_vars='date', var_name='asset', value_name='price')
+    weights = df_weights.melt(id_vars=['date', 'asset'], var_name='portfolio', value_name='weight')
+    weights['portfolio'] = weights['portfolio'].str.strip().str.lower()
+
+    asset_ids = create_assets(list(dict.fromkeys([*df_weights['asset'].unique(), *prices['asset'].unique()])))
+    portfolio_ids = create_portfolios(list(weights['portfolio'].unique()))
+
+    with transaction.atomic():
+        price_result = create_prices(prices, asset_ids, batch_size)
+        weight_result = create_weights(weights, asset_ids, portfolio_ids, batch_size)
+
+    bump_portfolio_data_versions(list(portfolio_ids.values()))
+    if price_result["written"]:
+        propagate_price_changes(
+            list(asset_ids.values()),
+            prices['date'].min().date(),
+            prices['date'].max().date()
+        )
     logger.info("Data loading completed successfully")
+    return {"prices": price_result, "weights": weight_result}
+
+def create_assets(asset_names: list[str]) -> dict[str, int]:
+    logger.debug(f"Creating assets from {len(asset_names)} names")
+    Asset.objects.bulk_create([Asset(name=name) for name in asset_names], ignore_conflicts=True)
+    asset_ids = get_asset_ids_by_names(asset_names)
+    logger.info(f"Processed {len(asset_ids)} assets")
+    return asset_ids
+
+def create_portfolios(portfolio_names: list[str]) -> dict[str, int]:
+    logger.debug(f"Creating portfolios from {len(portfolio_names)} names")
+    Portfolio.objects.bulk_create([Portfolio(name=name, initial_value=0) for name in portfolio_names], ignore_conflicts=True)
+    portfolio_ids = get_portfolio_ids_by_names(portfolio_names)
+    logger.info(f"Processed {len(portfolio_ids)} portfolios")
+    return portfolio_ids
+
+def _drop_existing(rows: pd.DataFrame, key_columns: list[str], existing_keys: set[tuple]) -> pd.DataFrame:
+    if not existing_keys:
+        return rows
+    keys = pd.MultiIndex.from_frame(rows[key_columns])
+    return rows[~keys.isin(list(existing_keys))]
+
+def _bulk_insert(model: type, objects: list, batch_size: int, table: str) -> None:
+    started_at = time.perf_counter()
+    for offset in range(0, len(objects), batch_size):
+        model.objects.bulk_create(objects[offset:offset + batch_size])
+        written = min(offset + batch_size, len(objects))
+        elapsed = time.perf_counter() - started_at
+        logger.info(f"Inserted {written} of {len(objects)} new {table} rows, {written / elapsed if elapsed else 0.0:.0f} rows/s")
+
+def _load_result(received: int, written: int, rejected: int, started_at: float) -> dict:
+    elapsed = time.perf_counter() - started_at
+    return {
+        "received": received,
+        "written": written,
+        "rejected": rejected,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": received / elapsed if elapsed else 0.0
+    }
+
+def create_prices(prices: pd.DataFrame, asset_ids: dict[str, int], batch_size: int = EXCEL_BATCH_SIZE) -> dict:
+    logger.debug(f"Creating prices from {len(prices)} cells")
+    started_at = time.perf_counter()
+    received = len(prices)
+    # Empty cells are dates an asset has no price on; anything else that is not a
+    # positive number is rejected.
+    filled = prices['price'].notna()
+    prices = prices.assign(
+        asset_id=prices['asset'].map(asset_ids),
+        price=pd.to_numeric(prices['price'], errors='coerce'),
+        date=prices['date'].dt.date
+    )
+    valid = prices['asset_id'].notna() & (prices['price'] > 0)
+    rejected = int((~valid & filled).sum())
+    if rejected:
+        logger.warning(f"Skipping {rejected} invalid price values")
+    prices = prices[valid].astype({'asset_id': int}).drop_duplicates(['asset_id', 'date'])
+
+    # Existing prices are kept; the ones in the range of the sheet are read with one query.
+    existing_keys = (
+        get_price_keys_between(list(asset_ids.values()), prices['date'].min(), prices['date'].max())
+        if len(prices) else set()
+    )
+    prices = _drop_existing(prices, ['asset_id', 'date'], existing_keys)
+
+    objects = [
+        Price(asset_id=asset_id, date=price_date, price=Decimal(str(price)))
+        for asset_id, price_date, price in zip(prices['asset_id'].tolist(), prices['date'].tolist(), prices['price'].tolist())
+    ]
+    _bulk_insert(Price, objects, batch_size, 'price')
+    refresh_latest_prices(list(prices['asset_id'].unique().tolist()))
+
+    result = _load_result(received, len(objects), rejected, started_at)
+    logger.info(f"Created {len(objects)} prices from {received} cells, {result['rows_per_second']:.0f} rows/s")
+    return result
+
+def create_weights(
+    weights: pd.DataFrame,
+    asset_ids: dict[str, int],
+    portfolio_ids: dict[str, int],
+    batch_size: int = EXCEL_BATCH_SIZE
+) -> dict:
+    logger.debug(f"Creating weights from {len(weights)} cells")
+    started_at = time.perf_counter()
+    received = len(weights)
+    filled = weights['weight'].notna()
+    weights = weights.assign(
+        asset_id=weights['asset'].map(asset_ids),
+        portfolio_id=weights['portfolio'].map(portfolio_ids),
+        weight=pd.to_numeric(weights['weight'], errors='coerce'),
+        date=weights['date'].dt.date
+    )
+    valid = weights['asset_id'].notna() & weights['portfolio_id'].notna() & weights['weight'].between(0, 1)
+    rejected = int((~valid & filled).sum())
+    if rejected:
+        logger.warning(f"Skipping {rejected} invalid weight values")
+    weights = weights[valid].astype({'asset_id': int, 'portfolio_id': int}).drop_duplicates(['portfolio_id', 'asset_id', 'date'])
+
+    existing_keys = (
+        get_weight_keys_between(list(portfolio_ids.values()), weights['date'].min(), weights['date'].max())
+        if len(weights) else set()
+    )
+    weights = _drop_existing(weights, ['portfolio_id', 'asset_id', 'date'], existing_keys)
+
+    objects = [
+        Weight(portfolio_id=portfolio_id, asset_id=asset_id, date=weight_date, weight=Decimal(str(weight)))
+        for portfolio_id, asset_id, weight_date, weight in zip(
+            weights['portfolio_id'].tolist(), weights['asset_id'].tolist(), weights['date'].tolist(), weights['weight'].tolist()
+        )
+    ]
+    _bulk_insert(Weight, objects, batch_size, 'weight')
 
-def create_assets(asset_names: list[str]) -> dict:
-    logger.debug(f"Creating assets from names: {asset_names}")
-    assets = {}
-    for name in asset_names:
-        try:
-            asset = create_asset(name)
-            logger.info(f"Created new asset: {asset}")
-        except ValueError as e:
-            logger.warning(f"Asset already exists: {str(e)}")
-            asset = get_asset_by_name(name)
-            logger.info(f"Retrieved existing asset: {asset}")
-        assets[name] = asset
-    logger.info(f"Processed {len(assets)} assets")
-    return assets
-
-def create_portfolios(portfolio_names: list[str]) -> dict:
-    logger.debug(f"Creating portfolios from names: {portfolio_names}")
-    portfolios = {}
-    for name in portfolio_names:
-        normalized_name = name.strip().lower()
-        logger.debug(f"Processing portfolio: '{normalized_name}'")
-        try:
-            portfolio = create_portfolio(normalized_name)
-            logger.info(f"Created new portfolio: {portfolio}")
-        except ValueError as e:
-            logger.warning(f"Portfolio already exists: {str(e)}")
-            portfolio = get_portfolio_by_name(normalized_name)
-            logger.info(f"Retrieved existing portfolio: {portfolio}")
-        portfolios[normalized_name] = portfolio
-    logger.info(f"Processed {len(portfolios)} portfolios")
-    return portfolios
-
-def create_prices(df_prices: pd.DataFrame) -> None:
-    logger.debug(f"Creating prices for {len(df_prices)} dates")
-    for date, row in df_prices.iterrows():
-        for asset_name, price in row.items():
-            try:
-                price_value = Decimal(str(price))
-                asset = get_asset_by_name(asset_name)
-                try:
-                    create_price(asset, date, price_value)
-                    logger.debug(f"Created price for {asset_name} on {date}: {price_value}")
-                except ValueError as e:
-                    logger.info(f"Skipping existing price: {str(e)}")
-            except (ValueError, TypeError, InvalidOperation):
-                logger.warning(f"Invalid price value for {asset_name} on {date}: {price}")
-    logger.info(f"Price creation completed for {len(df_prices)} dates")
-
-def create_weights(df_weights: pd.DataFrame, portfolios: dict, assets: dict) -> None:
-    logger.debug(f"Creating weights for {len(df_weights)} rows")
-    portfolio_columns = [col for col in df_weights.columns if col not in ['date', 'asset']]
-    
-    for _, row in df_weights.iterrows():
-        date = row['date']
-        asset_name = row['asset']
-        asset = assets[asset_name]
-
-        for portfolio_name in portfolio_columns:
-            weight_value = row[portfolio_name]
-            if pd.notna(weight_value):
-                try:
-                    weight_decimal = Decimal(str(weight_value))
-                    try:
-                        create_weight(portfolios[portfolio_name], asset, date, weight_decimal)
-                        logger.debug(f"Created weight for {asset_name} in {portfolio_name} on {date}: {weight_decimal}")
-                    except ValueError as e:
-                        logger.info(f"Skipping existing weight: {str(e)}")
-                except (ValueError, TypeError, InvalidOperation):
-                    logger.warning(f"Invalid weight value for {asset_name} in {portfolio_name} on {date}: {weight_value}")
-    logger.info(f"Weight creation completed for {len(df_weights)} rows")
+    result = _load_result(received, len(objects), rejected, started_at)
+    logger.info(f"Created {len(objects)} weights from {received} cells, {result['rows_per_second']:.0f} rows/s")
+    return result
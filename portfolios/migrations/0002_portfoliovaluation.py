@@ -0,0 +1,31 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('total_value', models.FloatField()),
+                ('weights', models.JSONField(default=dict)),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='portfolios.portfolio')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('portfolio', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def populate_latest_prices(apps, schema_editor):
+    Price = apps.get_model('portfolios', 'Price')
+    LatestPrice = apps.get_model('portfolios', 'LatestPrice')
+    latest_price_id = Price.objects.filter(
+        asset=models.OuterRef('asset')
+    ).order_by('-date').values('id')[:1]
+    rows = Price.objects.filter(id=models.Subquery(latest_price_id)).values_list('asset_id', 'id')
+    LatestPrice.objects.bulk_create([
+        LatestPrice(asset_id=asset_id, price_id=price_id)
+        for asset_id, price_id in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0002_portfoliovaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatestPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('asset', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='latest_price', to='portfolios.asset')),
+                ('price', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='portfolios.price')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(populate_latest_prices, migrations.RunPython.noop),
+    ]
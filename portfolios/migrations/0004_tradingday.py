@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0003_latestprice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradingDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField(unique=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
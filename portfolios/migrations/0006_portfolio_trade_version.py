@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0005_trade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='trade_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.20 on 2026-10-18 20:41
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def include_recorded_trades(apps, schema_editor):
+    # Existing snapshots were updated in place by every trade up to their date, so
+    # they include all the trades recorded so far.
+    Holding = apps.get_model('portfolios', 'Holding')
+    Portfolio = apps.get_model('portfolios', 'Portfolio')
+    Holding.objects.update(trade_version=Subquery(
+        Portfolio.objects.filter(pk=OuterRef('portfolio_id')).values('trade_version')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0006_portfolio_trade_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='holding',
+            name='trade_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='trade_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(include_recorded_trades, migrations.RunPython.noop),
+    ]
@@ -3,5 +3,9 @@ from .portfolio import Portfolio
 from .price import Price
 from .weight import Weight
 from .holding import Holding
+from .valuation import PortfolioValuation
+from .latest_price import LatestPrice
+from .trading_day import TradingDay
+from .trade import Trade
 
-__all__ = ['Asset', 'Portfolio', 'Price', 'Weight', 'Holding']
+__all__ = ['Asset', 'Portfolio', 'Price', 'Weight', 'Holding', 'PortfolioValuation', 'LatestPrice', 'TradingDay', 'Trade']
@@ -11,6 +11,9 @@ class Holding(BaseModel):
     asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
     date = models.DateField()
     quantity = models.DecimalField(max_digits=12, decimal_places=2)
+    # The trade version of the portfolio when the snapshot was written: it includes
+    # the trades up to its date recorded at or before that version.
+    trade_version = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = ('portfolio', 'asset', 'date')
@@ -0,0 +1,12 @@
+from django.db import models
+from core.models import BaseModel
+from .asset import Asset
+from .price import Price
+
+
+class LatestPrice(BaseModel):
+    asset = models.OneToOneField(Asset, on_delete=models.CASCADE, related_name='latest_price')
+    price = models.ForeignKey(Price, on_delete=models.CASCADE, related_name='+')
+
+    def __str__(self):
+        return f"{self.asset_id} - {self.price_id}"
@@ -6,6 +6,9 @@ from core.models import BaseModel
 class Portfolio(BaseModel):
     name = models.CharField(max_length=100, unique=True)
     initial_value = models.DecimalField(max_digits=20, decimal_places=2, null=True, blank=True)
+    # Incremented by every batch of trades; the update locks the portfolio row so
+    # trades of a portfolio read and change its positions one at a time.
+    trade_version = models.PositiveIntegerField(default=0)
 
     def clean(self):
         if not self.name.strip():
@@ -0,0 +1,34 @@
+from django.db import models
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from core.models import BaseModel
+from .asset import Asset
+from .portfolio import Portfolio
+
+
+class Trade(BaseModel):
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE)
+    asset = models.ForeignKey(Asset, on_delete=models.CASCADE)
+    date = models.DateField()
+    quantity = models.DecimalField(max_digits=12, decimal_places=2)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    # The trade version of the portfolio the trade was recorded at.
+    trade_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date', 'id']
+        indexes = [models.Index(fields=['portfolio', 'asset', 'date'])]
+
+    def clean(self):
+        if self.quantity == 0:
+            raise ValidationError("Trade quantity cannot be zero")
+        if self.date > timezone.now().date():
+            raise ValidationError("Trade date cannot be in the future")
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Trades are append-only and cannot be changed")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.portfolio.name} - {self.asset.name} - {self.date} - {self.quantity}"
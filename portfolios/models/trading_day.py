@@ -0,0 +1,12 @@
+from django.db import models
+from core.models import BaseModel
+
+
+class TradingDay(BaseModel):
+    date = models.DateField(unique=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}"
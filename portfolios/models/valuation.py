@@ -0,0 +1,17 @@
+from django.db import models
+from core.models import BaseModel
+from .portfolio import Portfolio
+
+
+class PortfolioValuation(BaseModel):
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE)
+    date = models.DateField()
+    total_value = models.FloatField()
+    weights = models.JSONField(default=dict)
+
+    class Meta:
+        unique_together = ('portfolio', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.portfolio_id} - {self.date} - {self.total_value}"
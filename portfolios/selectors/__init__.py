@@ -1,5 +1,8 @@
-from .asset_selector import get_asset_by_id, get_asset_by_name
-from .holding_selector import get_holdings_by_date, get_asset_latest_holding_before_date, get_latest_portfolio_holdings, get_first_portfolio_holding
-from .portfolio_selector import get_portfolio_by_id, get_portfolio_by_name
-from .price_selector import get_prices_by_date_range, get_latest_price, get_price_by_date
+from .asset_selector import get_asset_by_id, get_assets_by_ids, get_asset_by_name, get_asset_ids_by_names, get_asset_names_by_ids
+from .holding_selector import get_holdings_by_date, get_asset_latest_holding_before_date, get_latest_portfolio_holdings, get_current_holdings, get_asset_positions, get_first_portfolio_holding, get_portfolio_ids_holding_assets, get_holding_rows_until, get_holding_rows_for_portfolios_until, get_portfolio_asset_ids
+from .portfolio_selector import get_portfolio_by_id, get_portfolios_by_ids, get_portfolio_by_name
+from .price_selector import get_prices_by_date_range, get_price_rows_by_date_range, get_price_rows_since, get_latest_price, get_latest_prices, get_price_by_date, get_last_price_between, get_last_prices_between, get_existing_price_keys
 from .weight_selector import get_portfolio_weights_by_date, get_latest_portfolio_weights
+from .valuation_selector import get_portfolio_valuations, has_portfolio_valuations, get_materialized_portfolio_ids_holding_assets
+from .trading_day_selector import get_trading_dates
+from .trade_selector import get_portfolio_trades, get_asset_ids_traded_since_snapshot
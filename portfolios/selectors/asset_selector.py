@@ -14,6 +14,16 @@ def get_asset_by_id(asset_id: int) -> Asset:
         logger.error(error_msg)
         raise Asset.DoesNotExist(error_msg)
 
+def get_assets_by_ids(asset_ids: list[int]) -> dict[int, Asset]:
+    logger.debug(f"Getting assets by ids: {asset_ids}")
+    assets = Asset.objects.in_bulk(asset_ids)
+    missing_ids = [asset_id for asset_id in asset_ids if asset_id not in assets]
+    if missing_ids:
+        error_msg = f"Assets with ids {missing_ids} not found"
+        logger.error(error_msg)
+        raise Asset.DoesNotExist(error_msg)
+    return assets
+
 def get_asset_by_name(name: str) -> Asset:
     logger.debug(f"Getting asset by name: {name}")
     try:
@@ -24,3 +34,15 @@ def get_asset_by_name(name: str) -> Asset:
         error_msg = f"Asset with name '{name}' not found"
         logger.error(error_msg)
         raise Asset.DoesNotExist(error_msg)
+
+def get_asset_ids_by_names(names: list[str]) -> dict[str, int]:
+    logger.debug(f"Getting asset ids for {len(names)} names")
+    asset_ids = dict(Asset.objects.filter(name__in=names).values_list('name', 'id'))
+    logger.debug(f"Found {len(asset_ids)} asset ids")
+    return asset_ids
+
+def get_asset_names_by_ids(asset_ids: list[int]) -> dict[int, str]:
+    logger.debug(f"Getting asset names for ids: {asset_ids}")
+    asset_names = dict(Asset.objects.filter(id__in=asset_ids).values_list('id', 'name'))
+    logger.debug(f"Found {len(asset_names)} asset names")
+    return asset_names
@@ -1,9 +1,20 @@
-from portfolios.models import Holding, Portfolio, Asset
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Q, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from portfolios.models import Holding, Portfolio, Asset, Trade
 from datetime import date
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Holdings are position snapshots that include every trade up to their date that
+# was recorded before them, so on a shared date the trades are ordered before the
+# snapshot. Trades are only ever inserted; a backdated one is added on top of the
+# snapshots written before it.
+TRADE_EVENT = 0
+SNAPSHOT_EVENT = 1
+
 def get_holdings_by_date(portfolio: Portfolio, date: date) -> list[Holding]:
     logger.debug(f"Getting holdings for portfolio '{portfolio.name}' on {date}")
     holdings = Holding.objects.filter(
@@ -29,23 +40,140 @@ def get_asset_latest_holding_before_date(portfolio: Portfolio, asset: Asset, dat
         logger.error(error_msg)
         raise Holding.DoesNotExist(error_msg)
 
-def get_latest_portfolio_holdings(portfolio: Portfolio) -> list[Holding]:
-    logger.debug(f"Getting latest holdings for portfolio '{portfolio.name}'")
-    holdings = Holding.objects.filter(
-        portfolio=portfolio
-    ).select_related('asset')
-    logger.debug(f"Found {len(holdings)} holdings")
-    return holdings
+def get_latest_portfolio_holdings(portfolio: Portfolio, as_of: date = None) -> QuerySet[Holding]:
+    logger.debug(f"Getting latest holdings for portfolio '{portfolio.name}' as of {as_of}")
+    return get_current_holdings(portfolio, as_of).order_by('asset__name')
+
+def get_current_holdings(portfolio: Portfolio, as_of: date = None) -> QuerySet[Holding]:
+    logger.debug(f"Getting current holdings for portfolio '{portfolio.name}' as of {as_of}")
+    return _get_positions(portfolio, as_of).filter(position__gt=0).select_related('asset')
+
+def get_asset_positions(portfolio: Portfolio, asset_ids: list[int], as_of: date) -> dict[int, Holding]:
+    logger.debug(f"Getting positions of assets {asset_ids} in portfolio '{portfolio.name}' as of {as_of}")
+    positions = {
+        holding.asset_id: holding
+        for holding in _get_positions(portfolio, as_of).filter(asset_id__in=asset_ids)
+    }
+    logger.debug(f"Found {len(positions)} positions")
+    return positions
+
+def get_lowest_asset_positions(portfolio: Portfolio, asset_ids: list[int], as_of: date) -> dict[int, Decimal]:
+    # A trade changes every position from its date on, so a backdated one must fit
+    # the lowest of them: the position on its date, then each later snapshot and trade.
+    logger.debug(f"Getting lowest positions of assets {asset_ids} in portfolio '{portfolio.name}' from {as_of}")
+    events = _get_position_events({'portfolio': portfolio, 'asset_id__in': asset_ids}, ('asset_id',))
+    lowest = {}
+    for row_date, asset_id, quantity in _fold_position_events(events):
+        # Rows are in date order, so the position on the date comes first.
+        if row_date <= as_of:
+            lowest[asset_id] = quantity
+        else:
+            lowest[asset_id] = min(lowest.get(asset_id, Decimal(0)), quantity)
+    logger.debug(f"Found lowest positions from {len(events)} snapshots and trades")
+    return lowest
+
+def _get_positions(portfolio: Portfolio, as_of: date = None) -> QuerySet[Holding]:
+    # The position of an asset is its latest snapshot plus the trades it does not
+    # include, annotated as position: the ones after its date, and the ones up to
+    # its date recorded after it. Both subqueries are range scans of the
+    # (portfolio, asset, date) indexes of holdings and trades.
+    snapshots = Holding.objects.filter(portfolio=portfolio)
+    trades = Trade.objects.filter(portfolio=portfolio)
+    if as_of is not None:
+        snapshots = snapshots.filter(date__lte=as_of)
+        trades = trades.filter(date__lte=as_of)
+
+    latest_holding = snapshots.filter(
+        asset=OuterRef('asset')
+    ).order_by('-date').values('date')[:1]
+    traded_quantity = trades.filter(
+        Q(date__gt=OuterRef('date')) | Q(trade_version__gt=OuterRef('trade_version')),
+        asset=OuterRef('asset')
+    ).order_by().values('asset').annotate(total=Sum('quantity')).values('total')
+    return Holding.objects.filter(
+        portfolio=portfolio,
+        date=Subquery(latest_holding)
+    ).annotate(
+        position=F('quantity') + Coalesce(
+            Subquery(traded_quantity),
+            Value(Decimal(0)),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+    )
 
 def get_first_portfolio_holding(portfolio: Portfolio) -> Holding:
     logger.debug(f"Getting first holding for portfolio '{portfolio.name}'")
     try:
         holding = Holding.objects.filter(
             portfolio=portfolio
-        ).order_by('date').first()
+        ).select_related('portfolio', 'asset').order_by('date').first()
         logger.debug(f"Found holding: {holding}")
         return holding
     except Holding.DoesNotExist:
         error_msg = f"No holdings found for portfolio '{portfolio.name}'"
         logger.error(error_msg)
         raise Holding.DoesNotExist(error_msg)
+
+def get_portfolio_ids_holding_assets(asset_ids: list[int]) -> list[int]:
+    logger.debug(f"Getting portfolios holding assets {asset_ids}")
+    portfolio_ids = list(Holding.objects.filter(
+        asset_id__in=asset_ids
+    ).values_list('portfolio_id', flat=True).distinct())
+    logger.debug(f"Found {len(portfolio_ids)} portfolios")
+    return portfolio_ids
+
+def _get_position_events(filters: dict, fields: tuple[str, ...]) -> list[tuple]:
+    # Snapshots and trades are read in one query, ordered as they apply.
+    snapshots = Holding.objects.filter(**filters).annotate(
+        kind=Value(SNAPSHOT_EVENT, output_field=IntegerField())
+    ).order_by().values_list('date', 'kind', 'trade_version', *fields, 'quantity')
+    trades = Trade.objects.filter(**filters).annotate(
+        kind=Value(TRADE_EVENT, output_field=IntegerField())
+    ).order_by().values_list('date', 'kind', 'trade_version', *fields, 'quantity')
+    return list(snapshots.union(trades, all=True).order_by('date', 'kind'))
+
+def _fold_position_events(events: list[tuple]) -> list[tuple]:
+    # Replays the ledger: a trade changes the position of its key and a snapshot
+    # sets it, plus the trades up to its date recorded after it, which it does not
+    # include. One row is kept per date and key, with the position at its close.
+    positions = {}
+    trades = defaultdict(list)
+    rows = {}
+    for event_date, kind, trade_version, *key, quantity in events:
+        key = tuple(key)
+        if kind == SNAPSHOT_EVENT:
+            positions[key] = quantity + sum(
+                (traded for version, traded in trades[key] if version > trade_version),
+                Decimal(0)
+            )
+        else:
+            positions[key] = positions.get(key, Decimal(0)) + quantity
+            trades[key].append((trade_version, quantity))
+        rows[(event_date, key)] = positions[key]
+    return [(event_date, *key, quantity) for (event_date, key), quantity in rows.items()]
+
+def get_holding_rows_until(portfolio: Portfolio, end_date: date) -> list[tuple]:
+    logger.debug(f"Getting holding rows for portfolio '{portfolio.name}' until {end_date}")
+    events = _get_position_events({'portfolio': portfolio, 'date__lte': end_date}, ('asset_id',))
+    rows = _fold_position_events(events)
+    logger.debug(f"Found {len(rows)} holding rows from {len(events)} snapshots and trades")
+    return rows
+
+def get_holding_rows_for_portfolios_until(portfolio_ids: list[int], end_date: date) -> list[tuple]:
+    logger.debug(f"Getting holding rows for portfolios {portfolio_ids} until {end_date}")
+    events = _get_position_events({'portfolio_id__in': portfolio_ids, 'date__lte': end_date}, ('portfolio_id', 'asset_id'))
+    rows = [
+        (portfolio_id, row_date, asset_id, quantity)
+        for row_date, portfolio_id, asset_id, quantity in _fold_position_events(events)
+    ]
+    logger.debug(f"Found {len(rows)} holding rows from {len(events)} snapshots and trades")
+    return rows
+
+def get_portfolio_asset_ids(portfolio: Portfolio, end_date: date) -> list[int]:
+    logger.debug(f"Getting assets held by portfolio '{portfolio.name}' until {end_date}")
+    asset_ids = list(Holding.objects.filter(
+        portfolio=portfolio,
+        date__lte=end_date
+    ).order_by('asset_id').values_list('asset_id', flat=True).distinct())
+    logger.debug(f"Found {len(asset_ids)} assets")
+    return asset_ids
@@ -1,8 +1,8 @@
 from portfolios.models import Portfolio
-from portfolios.selectors.holding_selector import get_latest_portfolio_holdings
-from portfolios.selectors.price_selector import get_latest_price
+from django.db.models import QuerySet
+from portfolios.selectors.holding_selector import get_current_holdings
 from datetime import datetime
-from portfolios.models import Price
+from portfolios.models import Holding
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,6 +19,20 @@ def get_portfolio_by_id(portfolio_id: int) -> Portfolio:
         logger.error(error_msg)
         raise Portfolio.DoesNotExist(error_msg)
 
+def get_portfolios_by_ids(portfolio_ids: list[int]) -> list[Portfolio]:
+    logger.debug(f"Getting portfolios by ids: {portfolio_ids}")
+    portfolios = Portfolio.objects.in_bulk(portfolio_ids)
+    missing_ids = [portfolio_id for portfolio_id in portfolio_ids if portfolio_id not in portfolios]
+    if missing_ids:
+        error_msg = f"Portfolios with ids {missing_ids} not found"
+        logger.error(error_msg)
+        raise Portfolio.DoesNotExist(error_msg)
+    return [portfolios[portfolio_id] for portfolio_id in dict.fromkeys(portfolio_ids)]
+
+def get_portfolio_trade_versions(portfolio_ids: list[int]) -> dict[int, int]:
+    logger.debug(f"Getting trade versions of portfolios {portfolio_ids}")
+    return dict(Portfolio.objects.filter(id__in=portfolio_ids).values_list('id', 'trade_version'))
+
 def get_portfolio_by_name(name: str) -> Portfolio:
     logger.debug(f"Getting portfolio by name: {name}")
     try:
@@ -30,10 +44,17 @@ def get_portfolio_by_name(name: str) -> Portfolio:
         logger.error(error_msg)
         raise Portfolio.DoesNotExist(error_msg)
     
-def get_portfolio_assets(portfolio_id: int) -> tuple[list, datetime]:
-    logger.debug(f"Getting portfolio assets for portfolio: {portfolio_id}")
+def get_portfolio_ids_by_names(names: list[str]) -> dict[str, int]:
+    logger.debug(f"Getting portfolio ids for {len(names)} names")
+    portfolio_ids = dict(Portfolio.objects.filter(name__in=names).values_list('name', 'id'))
+    logger.debug(f"Found {len(portfolio_ids)} portfolio ids")
+    return portfolio_ids
+
+def get_portfolio_assets(portfolio_id: int, offset: int = 0, limit: int = None) -> tuple[list, datetime]:
+    logger.debug(f"Getting portfolio assets for portfolio: {portfolio_id}, offset {offset}, limit {limit}")
     portfolio = get_portfolio_by_id(portfolio_id)
-    holdings = get_latest_portfolio_holdings(portfolio)
+    stop = offset + limit if limit is not None else None
+    holdings = list(_get_valued_holdings(portfolio).order_by('asset__name')[offset:stop])
     
     if not holdings:
         logger.warning(f"No holdings found for portfolio: {portfolio_id}")
@@ -41,21 +62,28 @@ def get_portfolio_assets(portfolio_id: int) -> tuple[list, datetime]:
 
     assets_data = []
     for holding in holdings:
-        try:
-            latest_price = get_latest_price(holding.asset)
-            
-            if latest_price:
-                assets_data.append({
-                    "asset_id": holding.asset.id,
-                    "asset_name": holding.asset.name,
-                    "quantity": holding.quantity,
-                    "price": latest_price.price,
-                    "value": holding.quantity * latest_price.price,
-                    "date": latest_price.date
-                })
-        except Price.DoesNotExist:
-            continue
+        latest_price = holding.asset.latest_price.price
+        assets_data.append({
+            "asset_id": holding.asset.id,
+            "asset_name": holding.asset.name,
+            "quantity": holding.position,
+            "price": latest_price.price,
+            "value": holding.position * latest_price.price,
+            "date": latest_price.date
+        })
     
     logger.debug(f"Found {len(assets_data)} assets for portfolio: {portfolio_id}")
 
-    return assets_data, latest_price.date if latest_price else None
+    return assets_data, max(asset_data["date"] for asset_data in assets_data)
+
+def count_portfolio_assets(portfolio_id: int) -> int:
+    logger.debug(f"Counting portfolio assets for portfolio: {portfolio_id}")
+    portfolio = get_portfolio_by_id(portfolio_id)
+    return _get_valued_holdings(portfolio).count()
+
+def _get_valued_holdings(portfolio: Portfolio) -> QuerySet[Holding]:
+    # Current positions with the latest price of their asset joined in the same
+    # query, so the cost does not depend on how much history the portfolio has.
+    return get_current_holdings(portfolio).select_related(
+        'asset__latest_price__price'
+    ).filter(asset__latest_price__isnull=False)
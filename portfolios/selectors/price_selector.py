@@ -1,5 +1,9 @@
-from portfolios.models import Price, Asset
-from datetime import date
+from functools import reduce
+from operator import or_
+from django.db.models import DateField, Exists, ExpressionWrapper, OuterRef, Q, QuerySet, Subquery
+from django.db.models.lookups import GreaterThanOrEqual, LessThanOrEqual
+from portfolios.models import Price, Asset, LatestPrice, TradingDay
+from datetime import date, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,15 +19,23 @@ def get_prices_by_date_range(asset_ids: list[int], start_date: date, end_date: d
 
 def get_latest_price(asset: Asset) -> Price:
     logger.debug(f"Getting latest price for asset '{asset.name}'")
-    price = Price.objects.filter(
-        asset=asset
-    ).order_by('-date').first()
-    logger.debug(f"Found price: {price}")
-    if not price:
+    try:
+        price = LatestPrice.objects.select_related('price').get(asset=asset).price
+        logger.debug(f"Found price: {price}")
+        return price
+    except LatestPrice.DoesNotExist:
         error_msg = f"Price not found for asset '{asset.name}'"
         logger.error(error_msg)
         raise Price.DoesNotExist(error_msg)
-    return price
+
+def get_latest_prices(asset_ids: list[int]) -> dict[int, Price]:
+    logger.debug(f"Getting latest prices for assets {asset_ids}")
+    prices = {
+        latest_price.asset_id: latest_price.price
+        for latest_price in LatestPrice.objects.filter(asset_id__in=asset_ids).select_related('price')
+    }
+    logger.debug(f"Found {len(prices)} latest prices")
+    return prices
 
 def get_price_by_date(asset: Asset, date: date) -> Price:
     logger.debug(f"Getting price for asset '{asset.name}' on {date}")
@@ -35,3 +47,141 @@ def get_price_by_date(asset: Asset, date: date) -> Price:
         error_msg = f"Price not found for asset '{asset.name}' on {date}"
         logger.error(error_msg)
         raise Price.DoesNotExist(error_msg)
+
+def get_price_rows_by_date_range(asset_ids: list[int], start_date: date, end_date: date) -> list[tuple]:
+    logger.debug(f"Getting price rows for assets {asset_ids} from {start_date} to {end_date}")
+    rows = list(Price.objects.filter(
+        asset_id__in=asset_ids,
+        date__range=(start_date, end_date)
+    ).order_by('date').values_list('date', 'asset_id', 'price'))
+    logger.debug(f"Found {len(rows)} price rows")
+    return rows
+
+def get_price_rows_since(start_date: date, asset_ids: list[int] | None = None) -> list[tuple]:
+    logger.debug(f"Getting price rows since {start_date} for assets {asset_ids}")
+    prices = Price.objects.filter(date__gte=start_date)
+    if asset_ids is not None:
+        prices = prices.filter(asset_id__in=asset_ids)
+    rows = list(prices.order_by('date').values_list('date', 'asset_id', 'price'))
+    logger.debug(f"Found {len(rows)} price rows")
+    return rows
+
+def get_existing_price_keys(asset_ids: list[int], dates: list[date]) -> set[tuple[int, date]]:
+    logger.debug(f"Getting existing prices for {len(asset_ids)} assets on {len(dates)} dates")
+    keys = set(Price.objects.filter(
+        asset_id__in=asset_ids,
+        date__in=dates
+    ).values_list('asset_id', 'date'))
+    logger.debug(f"Found {len(keys)} existing prices")
+    return keys
+
+def get_price_keys_between(asset_ids: list[int], start_date: date, end_date: date) -> set[tuple[int, date]]:
+    logger.debug(f"Getting existing prices for {len(asset_ids)} assets from {start_date} to {end_date}")
+    keys = set(Price.objects.filter(
+        asset_id__in=asset_ids,
+        date__range=(start_date, end_date)
+    ).values_list('asset_id', 'date'))
+    logger.debug(f"Found {len(keys)} existing prices")
+    return keys
+
+def _get_valued_dates_query(
+    asset_ids: list[int],
+    held_ranges: list[tuple[int, date, date]],
+    start_date: date,
+    end_date: date,
+    staleness_days: int,
+    calendar_bounds: tuple[date, date] | None
+) -> QuerySet:
+    # The dates value_holdings keeps: grid dates on which an asset held that day
+    # has a price at most staleness_days old. Grid dates are the price dates of
+    # the assets, and the trading days between the first and last day of the
+    # calendar when prices are filled.
+    held_ranges = [
+        (asset_id, max(first_date, start_date), min(last_date, end_date))
+        for asset_id, first_date, last_date in held_ranges
+        if first_date <= end_date and last_date >= start_date
+    ]
+    if not held_ranges:
+        return Price.objects.none().values_list('date', flat=True)
+    if not staleness_days:
+        held_prices = reduce(or_, (
+            Q(asset_id=asset_id, date__range=(first_date, last_date))
+            for asset_id, first_date, last_date in held_ranges
+        ))
+        return Price.objects.filter(held_prices).order_by().values_list('date', flat=True).distinct()
+
+    fresh_held_price = Exists(Price.objects.filter(
+        reduce(or_, (
+            Q(asset_id=asset_id) & GreaterThanOrEqual(OuterRef('date'), first_date) & LessThanOrEqual(OuterRef('date'), last_date)
+            for asset_id, first_date, last_date in held_ranges
+        )),
+        date__lte=OuterRef('date'),
+        date__gte=ExpressionWrapper(OuterRef('date') - timedelta(days=staleness_days), output_field=DateField())
+    ))
+    price_dates = Price.objects.filter(asset_id__in=asset_ids, date__range=(start_date, end_date))
+    if calendar_bounds is not None:
+        price_dates = price_dates.exclude(date__range=calendar_bounds)
+    dates = price_dates.filter(fresh_held_price).order_by().values_list('date', flat=True).distinct()
+    if calendar_bounds is None:
+        return dates
+    trading_dates = TradingDay.objects.filter(
+        fresh_held_price,
+        date__range=(max(start_date, calendar_bounds[0]), min(end_date, calendar_bounds[1]))
+    ).order_by().values_list('date', flat=True)
+    return dates.union(trading_dates)
+
+def count_valued_dates(
+    asset_ids: list[int],
+    held_ranges: list[tuple[int, date, date]],
+    start_date: date,
+    end_date: date,
+    staleness_days: int,
+    calendar_bounds: tuple[date, date] | None
+) -> int:
+    logger.debug(f"Counting valued dates of {len(held_ranges)} held ranges from {start_date} to {end_date}")
+    count = _get_valued_dates_query(asset_ids, held_ranges, start_date, end_date, staleness_days, calendar_bounds).count()
+    logger.debug(f"Found {count} valued dates")
+    return count
+
+def get_valued_dates(
+    asset_ids: list[int],
+    held_ranges: list[tuple[int, date, date]],
+    start_date: date,
+    end_date: date,
+    staleness_days: int,
+    calendar_bounds: tuple[date, date] | None,
+    offset: int = 0,
+    limit: int = None
+) -> list[date]:
+    logger.debug(f"Getting valued dates of {len(held_ranges)} held ranges from {start_date} to {end_date}, offset {offset}, limit {limit}")
+    dates = _get_valued_dates_query(asset_ids, held_ranges, start_date, end_date, staleness_days, calendar_bounds).order_by('date')
+    stop = offset + limit if limit is not None else None
+    dates = list(dates[offset:stop])
+    logger.debug(f"Found {len(dates)} valued dates")
+    return dates
+
+def get_last_price_between(asset: Asset, start_date: date, end_date: date) -> Price:
+    logger.debug(f"Getting last price for asset '{asset.name}' from {start_date} to {end_date}")
+    price = Price.objects.filter(
+        asset=asset,
+        date__range=(start_date, end_date)
+    ).order_by('-date').first()
+    if price is None:
+        error_msg = f"Price not found for asset '{asset.name}' from {start_date} to {end_date}"
+        logger.error(error_msg)
+        raise Price.DoesNotExist(error_msg)
+    logger.debug(f"Found price: {price}")
+    return price
+
+def get_last_prices_between(asset_ids: list[int], start_date: date, end_date: date) -> dict[int, Price]:
+    logger.debug(f"Getting last prices for assets {asset_ids} from {start_date} to {end_date}")
+    last_date = Price.objects.filter(
+        asset=OuterRef('asset'),
+        date__range=(start_date, end_date)
+    ).order_by('-date').values('date')[:1]
+    prices = {
+        price.asset_id: price
+        for price in Price.objects.filter(asset_id__in=asset_ids, date=Subquery(last_date))
+    }
+    logger.debug(f"Found {len(prices)} prices")
+    return prices
@@ -0,0 +1,47 @@
+from decimal import Decimal
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Q, QuerySet, Subquery, Sum
+from portfolios.models import Holding, Trade, Portfolio
+from datetime import date
+import logging
+
+logger = logging.getLogger(__name__)
+
+def get_portfolio_trades(portfolio: Portfolio) -> QuerySet[Trade]:
+    logger.debug(f"Getting trades for portfolio '{portfolio.name}'")
+    return Trade.objects.filter(portfolio=portfolio).order_by('date', 'id')
+
+def get_asset_ids_traded_since_snapshot(portfolio: Portfolio, date: date) -> list[int]:
+    logger.debug(f"Getting assets of portfolio '{portfolio.name}' traded after their latest snapshot until {date}")
+    # A snapshot leaves out the trades after its date and the ones up to its date
+    # recorded after it. An asset with a snapshot on the date itself is left out,
+    # since there can only be one per date.
+    latest_snapshot = Holding.objects.filter(
+        portfolio=portfolio,
+        asset=OuterRef('asset'),
+        date__lte=date
+    ).order_by('-date')
+    asset_ids = list(Trade.objects.filter(
+        portfolio=portfolio,
+        date__lte=date
+    ).annotate(
+        snapshot_date=Subquery(latest_snapshot.values('date')[:1]),
+        snapshot_version=Subquery(latest_snapshot.values('trade_version')[:1])
+    ).filter(
+        Q(snapshot_date__isnull=True) | Q(date__gt=F('snapshot_date')) | Q(trade_version__gt=F('snapshot_version'))
+    ).exclude(snapshot_date=date).values_list('asset_id', flat=True).distinct())
+    logger.debug(f"Found {len(asset_ids)} assets")
+    return asset_ids
+
+def get_trade_flows(portfolio: Portfolio, start_date: date, end_date: date) -> dict[date, Decimal]:
+    logger.debug(f"Getting trade flows of portfolio '{portfolio.name}' from {start_date} to {end_date}")
+    flows = Trade.objects.filter(
+        portfolio=portfolio,
+        date__gte=start_date,
+        date__lte=end_date
+    ).values('date').annotate(flow=Sum(ExpressionWrapper(
+        F('quantity') * F('price'),
+        output_field=DecimalField(max_digits=24, decimal_places=4)
+    ))).values_list('date', 'flow')
+    flows = dict(flows)
+    logger.debug(f"Found trade flows on {len(flows)} dates")
+    return flows
@@ -0,0 +1,24 @@
+from django.db.models import Max, Min
+from portfolios.models import TradingDay
+from datetime import date
+import logging
+
+logger = logging.getLogger(__name__)
+
+def get_trading_calendar_bounds() -> tuple[date, date] | None:
+    logger.debug("Getting the dates covered by the trading calendar")
+    bounds = TradingDay.objects.aggregate(first_date=Min('date'), last_date=Max('date'))
+    if bounds['first_date'] is None:
+        logger.debug("Trading calendar is empty")
+        return None
+    return bounds['first_date'], bounds['last_date']
+
+def get_trading_dates(start_date: date, end_date: date, offset: int = 0, limit: int = None) -> list[date]:
+    logger.debug(f"Getting trading dates from {start_date} to {end_date}, offset {offset}, limit {limit}")
+    dates = TradingDay.objects.filter(
+        date__range=(start_date, end_date)
+    ).order_by('date').values_list('date', flat=True)
+    stop = offset + limit if limit is not None else None
+    dates = list(dates[offset:stop])
+    logger.debug(f"Found {len(dates)} trading dates")
+    return dates
@@ -0,0 +1,51 @@
+from django.db.models import Exists, OuterRef
+from portfolios.models import PortfolioValuation, Portfolio, Holding
+from datetime import date
+import logging
+
+logger = logging.getLogger(__name__)
+
+def get_portfolio_valuations(portfolio: Portfolio, start_date: date, end_date: date) -> list[PortfolioValuation]:
+    logger.debug(f"Getting valuations for portfolio '{portfolio.name}' from {start_date} to {end_date}")
+    valuations = list(PortfolioValuation.objects.filter(
+        portfolio=portfolio,
+        date__range=(start_date, end_date)
+    ).order_by('date'))
+    logger.debug(f"Found {len(valuations)} valuations")
+    return valuations
+
+def count_portfolio_valuations(portfolio: Portfolio, start_date: date, end_date: date) -> int:
+    logger.debug(f"Counting valuations for portfolio '{portfolio.name}' from {start_date} to {end_date}")
+    count = PortfolioValuation.objects.filter(portfolio=portfolio, date__range=(start_date, end_date)).count()
+    logger.debug(f"Found {count} valuations")
+    return count
+
+def get_valuation_dates(portfolio: Portfolio, start_date: date, end_date: date, offset: int = 0, limit: int = None) -> list[date]:
+    logger.debug(f"Getting valuation dates for portfolio '{portfolio.name}' from {start_date} to {end_date}, offset {offset}, limit {limit}")
+    dates = PortfolioValuation.objects.filter(
+        portfolio=portfolio,
+        date__range=(start_date, end_date)
+    ).order_by('date').values_list('date', flat=True)
+    stop = offset + limit if limit is not None else None
+    dates = list(dates[offset:stop])
+    logger.debug(f"Found {len(dates)} valuation dates")
+    return dates
+
+def has_portfolio_valuations(portfolio: Portfolio) -> bool:
+    logger.debug(f"Checking valuations for portfolio '{portfolio.name}'")
+    return PortfolioValuation.objects.filter(portfolio=portfolio).exists()
+
+def get_materialized_portfolio_ids_holding_assets(asset_ids: list[int]) -> list[int]:
+    logger.debug(f"Getting materialized portfolios holding assets {asset_ids}")
+    portfolio_ids = list(Portfolio.objects.filter(
+        Exists(Holding.objects.filter(portfolio=OuterRef('pk'), asset_id__in=asset_ids)),
+        Exists(PortfolioValuation.objects.filter(portfolio=OuterRef('pk')))
+    ).values_list('id', flat=True))
+    logger.debug(f"Found {len(portfolio_ids)} portfolios")
+    return portfolio_ids
+
+def get_materialized_portfolio_ids() -> list[int]:
+    logger.debug("Getting materialized portfolios")
+    portfolio_ids = list(PortfolioValuation.objects.order_by('portfolio_id').values_list('portfolio_id', flat=True).distinct())
+    logger.debug(f"Found {len(portfolio_ids)} portfolios")
+    return portfolio_ids
@@ -1,5 +1,7 @@
 from portfolios.models import Weight, Portfolio
 from datetime import date
+from decimal import Decimal
+from django.db.models import Subquery
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,3 +17,34 @@ def get_latest_portfolio_weights(portfolio: Portfolio) -> list[Weight]:
     weights = list(Weight.objects.filter(portfolio=portfolio).order_by('-date'))
     logger.debug(f"Found {len(weights)} weights")
     return weights
+
+def get_target_weights(portfolio: Portfolio, date: date) -> dict[int, Decimal]:
+    logger.debug(f"Getting target weights for portfolio '{portfolio.name}' on {date}")
+    # The targets are the weights of the latest date on or before the given one.
+    latest_date = Weight.objects.filter(portfolio=portfolio, date__lte=date).order_by('-date').values('date')[:1]
+    weights = dict(Weight.objects.filter(portfolio=portfolio, date=Subquery(latest_date)).values_list('asset_id', 'weight'))
+    if not weights:
+        error_msg = f"No target weights found for portfolio '{portfolio.name}' on or before {date}"
+        logger.error(error_msg)
+        raise Weight.DoesNotExist(error_msg)
+    logger.debug(f"Found {len(weights)} target weights")
+    return weights
+
+def get_weight_rows_for_portfolios_until(portfolio_ids: list[int], end_date: date) -> list[tuple]:
+    logger.debug(f"Getting weight rows for portfolios {portfolio_ids} until {end_date}")
+    rows = list(
+        Weight.objects.filter(portfolio_id__in=portfolio_ids, date__lte=end_date)
+        .order_by('portfolio_id', 'date', 'asset_id')
+        .values_list('portfolio_id', 'date', 'asset_id', 'weight')
+    )
+    logger.debug(f"Found {len(rows)} weight rows")
+    return rows
+
+def get_weight_keys_between(portfolio_ids: list[int], start_date: date, end_date: date) -> set[tuple[int, int, date]]:
+    logger.debug(f"Getting existing weights for {len(portfolio_ids)} portfolios from {start_date} to {end_date}")
+    keys = set(Weight.objects.filter(
+        portfolio_id__in=portfolio_ids,
+        date__range=(start_date, end_date)
+    ).values_list('portfolio_id', 'asset_id', 'date'))
+    logger.debug(f"Found {len(keys)} existing weights")
+    return keys
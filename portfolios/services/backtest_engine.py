@@ -0,0 +1,96 @@
+import numpy as np
+from portfolios.services.metrics_engine import UNIX_EPOCH_ORDINAL, forward_fill
+import logging
+
+logger = logging.getLogger(__name__)
+
+MONTHLY = 'monthly'
+QUARTERLY = 'quarterly'
+DRIFT = 'drift'
+BACKTEST_STRATEGIES = (MONTHLY, QUARTERLY, DRIFT)
+
+# Quantities below this are left untraded, so float noise does not show up as trades.
+MIN_TRADE_QUANTITY = 1e-9
+
+
+def period_start_indexes(date_ordinals: np.ndarray, strategy: str) -> np.ndarray:
+    days = (date_ordinals - UNIX_EPOCH_ORDINAL).astype('datetime64[D]')
+    periods = days.astype('datetime64[M]').astype(np.int64)
+    if strategy == QUARTERLY:
+        periods = periods // 3
+    if len(periods) == 0:
+        return np.arange(0)
+    return np.flatnonzero(np.insert(periods[1:] != periods[:-1], 0, True))
+
+
+def _rebalance_quantities(value: float, prices: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    # Targets of assets without a price yet are spread over the priced ones.
+    weights = np.where(np.isnan(prices), 0.0, np.nan_to_num(targets))
+    weights_sum = weights.sum()
+    if weights_sum <= 0:
+        return np.zeros(len(prices))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(weights > 0, value * weights / weights_sum / prices, 0.0)
+
+
+def _next_rebalance_index(scheduled: np.ndarray, index: int, count: int) -> int:
+    position = np.searchsorted(scheduled, index, side='right')
+    return int(scheduled[position]) if position < len(scheduled) else count
+
+
+def run_backtest(
+    date_ordinals: np.ndarray,
+    prices: np.ndarray,
+    targets: np.ndarray,
+    strategy: str,
+    initial_value: float,
+    drift_threshold: float = None
+) -> tuple[np.ndarray, float, list[tuple[int, int, float, float]]]:
+    # Quantities only change on rebalance dates, so the dates between two
+    # rebalances are valued as one (dates x assets) product. Calendar strategies
+    # know every rebalance date upfront; a drift strategy finds the next one as
+    # the first date of the segment whose weights move further than the
+    # threshold from their targets.
+    prices = forward_fill(prices)
+    count, asset_count = prices.shape
+    totals = np.full(count, np.nan)
+    trades = []
+    turnover = 0.0
+    scheduled = period_start_indexes(date_ordinals, strategy) if strategy != DRIFT else np.arange(0)
+
+    quantities = np.zeros(asset_count)
+    index = 0
+    while index < count:
+        price_row = prices[index]
+        value = initial_value if index == 0 else float(np.nansum(quantities * price_row))
+        new_quantities = _rebalance_quantities(value, price_row, targets[index])
+        changes = new_quantities - quantities
+        traded = np.flatnonzero(np.abs(changes) > MIN_TRADE_QUANTITY)
+        trades.extend((index, int(column), float(changes[column]), float(price_row[column])) for column in traded)
+        # The initial allocation funds the portfolio and is not counted as turnover.
+        if index > 0 and value > 0:
+            turnover += float(np.abs(changes[traded] * price_row[traded]).sum()) / 2 / value
+        quantities = new_quantities
+
+        stop = _next_rebalance_index(scheduled, index, count)
+        values = quantities * prices[index:stop]
+        segment_totals = np.nansum(values, axis=1)
+        if strategy == DRIFT:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                weights = np.nan_to_num(values / segment_totals[:, np.newaxis])
+                target_weights = np.where(np.isnan(prices[index:stop]), 0.0, np.nan_to_num(targets[index:stop]))
+                target_weights = np.nan_to_num(target_weights / target_weights.sum(axis=1, keepdims=True))
+            drift = np.abs(weights - target_weights).max(axis=1)
+            drifted = np.flatnonzero(drift[1:] > drift_threshold)
+            if len(drifted):
+                stop = index + 1 + int(drifted[0])
+                segment_totals = segment_totals[:stop - index]
+
+        totals[index:stop] = segment_totals
+        index = stop
+    return totals, turnover, trades
+
+
+def run_backtest_job(job: tuple) -> tuple[np.ndarray, float, list[tuple[int, int, float, float]]]:
+    # Module-level so worker processes can run it without setting up Django.
+    return run_backtest(*job)
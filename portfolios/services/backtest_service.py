@@ -0,0 +1,123 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import numpy as np
+from django.conf import settings
+from portfolios.selectors.portfolio_selector import get_portfolios_by_ids
+from portfolios.selectors.weight_selector import get_weight_rows_for_portfolios_until
+from portfolios.services.backtest_engine import BACKTEST_STRATEGIES, run_backtest_job
+from portfolios.services.metrics_engine import align_as_of, build_date_asset_matrix
+from portfolios.services.portfolio_service import BUY, SELL
+from portfolios.services.price_grid_service import build_price_grid
+import logging
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_DRIFT_THRESHOLD = 0.05
+
+
+def get_backtest_workers() -> int:
+    return getattr(settings, 'BACKTEST_WORKERS', None) or os.cpu_count() or 1
+
+def run_backtests(
+    portfolio_ids: list[int],
+    strategies: list[str],
+    start_date: date,
+    end_date: date,
+    initial_value: float = None,
+    drift_threshold: float = BACKTEST_DRIFT_THRESHOLD,
+    workers: int = None
+) -> list[dict]:
+    logger.debug(f"Running backtests {strategies} for portfolios {portfolio_ids} from {start_date} to {end_date}")
+    started_at = time.perf_counter()
+    unknown_strategies = [strategy for strategy in strategies if strategy not in BACKTEST_STRATEGIES]
+    if unknown_strategies:
+        error_msg = f"Unknown strategies {unknown_strategies}. Expected some of {', '.join(BACKTEST_STRATEGIES)}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    if start_date > end_date:
+        error_msg = "Start date must be before or equal to end date"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    portfolios = get_portfolios_by_ids(portfolio_ids)
+    weight_rows = {portfolio.id: [] for portfolio in portfolios}
+    for portfolio_id, *row in get_weight_rows_for_portfolios_until(list(weight_rows), end_date):
+        weight_rows[portfolio_id].append(tuple(row))
+
+    # Prices are read once for the union of target assets; every backtest then
+    # runs on its own columns of the shared grid.
+    asset_ids = list(dict.fromkeys(row[1] for rows in weight_rows.values() for row in rows))
+    date_ordinals, prices = build_price_grid(asset_ids, start_date, end_date)
+    column_by_asset = {asset_id: column for column, asset_id in enumerate(asset_ids)}
+
+    runs, jobs = [], []
+    for portfolio in portfolios:
+        rows = weight_rows[portfolio.id]
+        value = initial_value or portfolio.initial_value
+        if not rows or not value:
+            error_msg = f"Portfolio {portfolio.id} needs target weights and an initial value to be backtested"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        portfolio_asset_ids = list(dict.fromkeys(row[1] for row in rows))
+        weight_ordinals, weights = build_date_asset_matrix(rows, portfolio_asset_ids)
+        # Every weight date lists complete targets, so an asset missing from it has
+        # a target of 0 rather than its previous weight.
+        targets = align_as_of(weight_ordinals, np.nan_to_num(weights), date_ordinals)
+        portfolio_prices = prices[:, [column_by_asset[asset_id] for asset_id in portfolio_asset_ids]]
+        # Backtests start on the first date with both targets and prices.
+        valid = ~np.isnan(targets).all(axis=1) & ~np.isnan(portfolio_prices).all(axis=1)
+        first = int(np.argmax(valid)) if valid.any() else len(valid)
+
+        for strategy in strategies:
+            runs.append((portfolio, portfolio_asset_ids, strategy, float(value), date_ordinals[first:]))
+            jobs.append((date_ordinals[first:], portfolio_prices[first:], targets[first:], strategy, float(value), drift_threshold))
+
+    outputs = _run_backtest_jobs(jobs, workers or get_backtest_workers())
+    results = [
+        _build_backtest_result(run, output, start_date, end_date)
+        for run, output in zip(runs, outputs)
+    ]
+    logger.info(f"Ran {len(results)} backtests in {time.perf_counter() - started_at:.2f}s")
+    return results
+
+def _run_backtest_jobs(jobs: list[tuple], workers: int) -> list[tuple]:
+    if workers <= 1 or len(jobs) <= 1:
+        return [run_backtest_job(job) for job in jobs]
+    # Backtests are pure array work on data already read, so they run in worker
+    # processes that never touch the database.
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        return list(executor.map(run_backtest_job, jobs))
+
+def _build_backtest_result(run: tuple, output: tuple, start_date: date, end_date: date) -> dict:
+    portfolio, asset_ids, strategy, initial_value, date_ordinals = run
+    totals, turnover, trades = output
+    dates = [date.fromordinal(ordinal) for ordinal in date_ordinals.tolist()]
+    final_value = float(totals[-1]) if len(totals) else None
+    return {
+        "portfolio_id": portfolio.id,
+        "strategy": strategy,
+        "start_date": start_date,
+        "end_date": end_date,
+        "initial_value": initial_value,
+        "final_value": final_value,
+        "total_return": final_value / initial_value - 1 if final_value is not None else None,
+        "turnover": turnover,
+        "rebalances": len({index for index, _, _, _ in trades}),
+        "series": [
+            {"date": result_date, "total_value": total_value}
+            for result_date, total_value in zip(dates, totals.tolist())
+        ],
+        "trades": [
+            {
+                "date": dates[index],
+                "asset_id": asset_ids[column],
+                "side": BUY if quantity > 0 else SELL,
+                "quantity": abs(quantity),
+                "price": price
+            }
+            for index, column, quantity, price in trades
+        ]
+    }
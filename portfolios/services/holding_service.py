@@ -1,34 +1,48 @@
 from portfolios.models import Holding, Portfolio, Asset
 from datetime import date
 from portfolios.models import Price
+from portfolios.selectors.portfolio_selector import get_portfolio_trade_versions
 from portfolios.selectors.weight_selector import get_portfolio_weights_by_date
-from portfolios.selectors.price_selector import get_price_by_date
+from portfolios.services.price_grid_service import get_grid_price
+from portfolios.services.metrics_cache_service import bump_portfolio_data_versions
+from portfolios.services.valuation_service import refresh_portfolio_valuations
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_holding(portfolio: Portfolio, asset: Asset, date: date, quantity: float) -> Holding:
+def create_holding(portfolio: Portfolio, asset: Asset, date: date, quantity: float, propagate: bool = True) -> Holding:
     logger.debug(f"Creating holding for portfolio '{portfolio.name}', asset '{asset.name}' on {date}")
     if Holding.objects.filter(portfolio=portfolio, asset=asset, date=date).exists():
         error_msg = f"Holding for portfolio '{portfolio.name}' and asset '{asset.name}' on {date} already exists"
         logger.warning(error_msg)
         raise ValueError(error_msg)
     
+    # A holding set directly includes every trade up to its date recorded so far.
     holding = Holding.objects.create(
         portfolio=portfolio,
         asset=asset,
         date=date,
-        quantity=quantity
+        quantity=quantity,
+        trade_version=get_portfolio_trade_versions([portfolio.id])[portfolio.id]
     )
     logger.info(f"Created holding: {holding}")
+    if propagate:
+        propagate_holding_changes(portfolio, date)
     return holding
 
+def propagate_holding_changes(portfolio: Portfolio, start_date: date) -> None:
+    logger.debug(f"Propagating holding changes for portfolio '{portfolio.name}' from {start_date}")
+    bump_portfolio_data_versions([portfolio.id])
+    refresh_portfolio_valuations(portfolio, start_date)
+
 def update_holding(holding: Holding, new_data: dict) -> Holding:
     logger.debug(f"Updating holding {holding} with data: {new_data}")
     for key, value in new_data.items():
         setattr(holding, key, value)
+    holding.trade_version = get_portfolio_trade_versions([holding.portfolio_id])[holding.portfolio_id]
     holding.save()
     logger.info(f"Updated holding: {holding}")
+    propagate_holding_changes(holding.portfolio, holding.date)
     return holding
 
 def create_initial_holdings(portfolio: Portfolio, date: date) -> list[dict]:
@@ -44,7 +58,7 @@ def create_initial_holdings(portfolio: Portfolio, date: date) -> list[dict]:
     for weight in weights:
         asset = weight.asset
         try:
-            price = get_price_by_date(asset, date).price
+            price = get_grid_price(asset, date).price
             logger.debug(f"Found price {price} for asset '{asset.name}' on {date}")
         except Price.DoesNotExist:
             error_msg = f"Price not found for asset '{asset.name}' on {date}"
@@ -59,12 +73,14 @@ def create_initial_holdings(portfolio: Portfolio, date: date) -> list[dict]:
         logger.debug(f"Calculated quantity {quantity} for asset '{asset.name}'")
         
         try: 
-            holding = create_holding(portfolio, asset, date, quantity)
+            holding = create_holding(portfolio, asset, date, quantity, propagate=False)
             holdings_created.append(holding)
             logger.info(f"Created holding: {holding}")
         except ValueError as e:
             logger.warning(f"Skipping holding for asset '{asset.name}' on {date}: {e}")
             continue
 
+    if holdings_created:
+        propagate_holding_changes(portfolio, date)
     logger.info(f"Created {len(holdings_created)} holdings for portfolio '{portfolio.name}' on {date} using initial value ${portfolio.initial_value:,.0f}")
     return holdings_created 
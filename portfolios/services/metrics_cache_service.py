@@ -0,0 +1,94 @@
+import time
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from portfolios.models import Portfolio
+from portfolios.services.metrics_engine import DAILY
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRICS_CACHE_HITS_KEY = 'portfolio-metrics-cache:hits'
+METRICS_CACHE_MISSES_KEY = 'portfolio-metrics-cache:misses'
+PRICE_DATA_VERSION_KEY = 'price-data-version'
+
+
+def get_metrics_cache_timeout() -> int:
+    return getattr(settings, 'PORTFOLIO_METRICS_CACHE_TIMEOUT', 60 * 60)
+
+def _get_data_version_key(portfolio: Portfolio) -> str:
+    # The creation timestamp keeps entries of a deleted portfolio from being
+    # served to a new one that reuses its id.
+    return f"portfolio-data-version:{portfolio.id}:{portfolio.created_at.timestamp()}"
+
+def _new_data_version() -> int:
+    # Versions start from a clock value rather than 1 so that an evicted version
+    # key never comes back as a version whose entries are still cached.
+    return time.time_ns()
+
+def _increment(key: str) -> None:
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+def _get_version(key: str) -> int:
+    cache.add(key, _new_data_version(), timeout=None)
+    version = cache.get(key)
+    if version is None:
+        version = _new_data_version()
+        cache.set(key, version, timeout=None)
+    return version
+
+def _bump_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_data_version(), timeout=None)
+
+def get_portfolio_data_version(portfolio: Portfolio) -> int:
+    return _get_version(_get_data_version_key(portfolio))
+
+def bump_portfolio_data_versions(portfolio_ids: list[int]) -> None:
+    logger.debug(f"Bumping data versions for portfolios {portfolio_ids}")
+    for portfolio in Portfolio.objects.filter(id__in=portfolio_ids).only('id', 'created_at'):
+        _bump_version(_get_data_version_key(portfolio))
+
+def get_price_data_version() -> int:
+    # Unlike portfolio versions, this covers prices of assets no portfolio holds yet.
+    return _get_version(PRICE_DATA_VERSION_KEY)
+
+def bump_price_data_version() -> None:
+    logger.debug("Bumping price data version")
+    _bump_version(PRICE_DATA_VERSION_KEY)
+
+def get_metrics_cache_key(portfolio: Portfolio, start_date: date, end_date: date, resolution: str | int = DAILY) -> str:
+    version = get_portfolio_data_version(portfolio)
+    return f"portfolio-metrics:{portfolio.id}:{version}:{start_date}:{end_date}:{resolution}"
+
+def get_cached_metrics(cache_key: str) -> list[dict] | None:
+    results = cache.get(cache_key)
+    if results is None:
+        _increment(METRICS_CACHE_MISSES_KEY)
+        logger.debug(f"Metrics cache miss for key {cache_key}")
+    else:
+        _increment(METRICS_CACHE_HITS_KEY)
+        logger.debug(f"Metrics cache hit for key {cache_key}")
+    return results
+
+def set_cached_metrics(cache_key: str, results: list[dict]) -> None:
+    cache.set(cache_key, results, timeout=get_metrics_cache_timeout())
+
+def get_metrics_cache_stats() -> dict:
+    hits = cache.get(METRICS_CACHE_HITS_KEY, 0)
+    misses = cache.get(METRICS_CACHE_MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / lookups if lookups else 0.0
+    }
+
+def reset_metrics_cache_stats() -> None:
+    cache.delete_many([METRICS_CACHE_HITS_KEY, METRICS_CACHE_MISSES_KEY])
@@ -0,0 +1,180 @@
+from datetime import date, timedelta
+from math import isnan
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The engine values portfolios with float64 arrays instead of Decimal arithmetic.
+# Each cell is one rounded multiplication and each total is a sum over the assets
+# of a date, so the relative error against the Decimal path is bounded by
+# (n_assets + 1) * 2**-53. METRICS_TOLERANCE covers portfolios of several
+# thousand assets; totals match within it relatively and weights absolutely.
+METRICS_TOLERANCE = 1e-12
+
+DAILY = 'daily'
+WEEKLY = 'weekly'
+MONTHLY = 'monthly'
+METRICS_RESOLUTIONS = (DAILY, WEEKLY, MONTHLY)
+MIN_RESOLUTION_POINTS = 3
+
+UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def build_date_asset_matrix(rows: list[tuple], asset_ids: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    logger.debug(f"Building date x asset matrix from {len(rows)} rows for {len(asset_ids)} assets")
+    column_by_asset = {asset_id: column for column, asset_id in enumerate(asset_ids)}
+    count = len(rows)
+
+    ordinals = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=count)
+    columns = np.fromiter((column_by_asset[row[1]] for row in rows), dtype=np.int64, count=count)
+    values = np.fromiter((row[2] for row in rows), dtype=np.float64, count=count)
+
+    date_ordinals, row_indexes = np.unique(ordinals, return_inverse=True)
+    matrix = np.full((len(date_ordinals), len(asset_ids)), np.nan)
+    matrix[row_indexes, columns] = values
+    return date_ordinals, matrix
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    row_indexes = np.where(np.isnan(matrix), 0, np.arange(len(matrix))[:, np.newaxis])
+    np.maximum.accumulate(row_indexes, axis=0, out=row_indexes)
+    return matrix[row_indexes, np.arange(matrix.shape[1])]
+
+
+def align_as_of(event_ordinals: np.ndarray, events: np.ndarray, date_ordinals: np.ndarray) -> np.ndarray:
+    # As-of join: every date takes the last event at or before it, per column.
+    filled = forward_fill(events)
+    positions = np.searchsorted(event_ordinals, date_ordinals, side='right') - 1
+    aligned = np.full((len(date_ordinals), events.shape[1]), np.nan)
+    in_force = positions >= 0
+    aligned[in_force] = filled[positions[in_force]]
+    return aligned
+
+
+def fill_price_grid(
+    price_ordinals: np.ndarray,
+    prices: np.ndarray,
+    grid_ordinals: np.ndarray,
+    staleness_days: int
+) -> np.ndarray:
+    # Every grid date takes the last price of each asset, unless that price is
+    # more than staleness_days old. The date each price was observed on is
+    # carried along with it, so the age check is one comparison per cell.
+    observed = np.where(np.isnan(prices), np.nan, price_ordinals[:, np.newaxis].astype(np.float64))
+    grid = align_as_of(price_ordinals, prices, grid_ordinals)
+    ages = grid_ordinals[:, np.newaxis] - align_as_of(price_ordinals, observed, grid_ordinals)
+    grid[~(ages <= staleness_days)] = np.nan
+    return grid
+
+
+def compute_values_and_weights(prices: np.ndarray, quantities: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    values = prices * quantities
+    totals = np.nansum(values, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = values / totals[:, np.newaxis]
+    return totals, weights
+
+
+def value_holdings(
+    date_ordinals: np.ndarray,
+    prices: np.ndarray,
+    holding_rows: list[tuple],
+    asset_ids: list[int]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Values the holdings in force on every price date and drops the dates on
+    # which none of the held assets has a price.
+    holding_ordinals, holding_quantities = build_date_asset_matrix(holding_rows, asset_ids)
+    quantities = align_as_of(holding_ordinals, holding_quantities, date_ordinals)
+    quantities[quantities <= 0] = np.nan
+
+    totals, weights = compute_values_and_weights(prices, quantities)
+    valued = ~np.isnan(weights).all(axis=1)
+    return date_ordinals[valued], totals[valued], weights[valued]
+
+
+def held_ranges(holding_rows: list[tuple], end_date: date) -> list[tuple[int, date, date]]:
+    # The ranges of dates over which each asset has a positive position, read the
+    # way value_holdings reads the rows: a row applies until the next one of its asset.
+    ranges = []
+    opened = {}
+    for row_date, asset_id, quantity in holding_rows:
+        if quantity > 0:
+            opened.setdefault(asset_id, row_date)
+        elif asset_id in opened:
+            ranges.append((asset_id, opened.pop(asset_id), row_date - timedelta(days=1)))
+    ranges.extend((asset_id, first_date, end_date) for asset_id, first_date in opened.items())
+    return ranges
+
+
+def period_end_indexes(date_ordinals: np.ndarray, resolution: str) -> np.ndarray:
+    if resolution == WEEKLY:
+        # Ordinal 1 is a Monday, so this groups dates into Monday to Sunday weeks.
+        periods = (date_ordinals - 1) // 7
+    else:
+        days = (date_ordinals - UNIX_EPOCH_ORDINAL).astype('datetime64[D]')
+        periods = days.astype('datetime64[M]').astype(np.int64)
+    if len(periods) == 0:
+        return np.arange(0)
+    return np.flatnonzero(np.append(periods[1:] != periods[:-1], True))
+
+
+def lttb_indexes(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and, from
+    # each bucket in between, the point that forms the largest triangle with the
+    # point kept before it and the average of the next bucket.
+    count = len(x)
+    if threshold >= count:
+        return np.arange(count)
+
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    indexes = np.empty(threshold, dtype=np.int64)
+    indexes[0], indexes[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x, next_y = x[stop:edges[bucket + 2]].mean(), y[stop:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indexes[bucket + 1] = previous
+    return indexes
+
+
+def parse_resolution(value: str) -> str | int:
+    if value in METRICS_RESOLUTIONS:
+        return value
+    if value.isdigit() and int(value) >= MIN_RESOLUTION_POINTS:
+        return int(value)
+    error_msg = f"Resolution must be one of {', '.join(METRICS_RESOLUTIONS)} or a number of points of at least {MIN_RESOLUTION_POINTS}"
+    logger.error(error_msg)
+    raise ValueError(error_msg)
+
+
+def downsample_indexes(date_ordinals: np.ndarray, totals: np.ndarray, resolution: str | int) -> np.ndarray:
+    logger.debug(f"Downsampling {len(date_ordinals)} dates to resolution {resolution}")
+    if isinstance(resolution, int):
+        return lttb_indexes(date_ordinals.astype(np.float64), totals, resolution)
+    if resolution == DAILY:
+        return np.arange(len(date_ordinals))
+    return period_end_indexes(date_ordinals, resolution)
+
+
+def build_metrics_rows(date_ordinals: np.ndarray, totals: np.ndarray, weights: np.ndarray, asset_names: list[str]) -> list[dict]:
+    results = []
+    for ordinal, total_value, row_weights in zip(date_ordinals.tolist(), totals.tolist(), weights.tolist()):
+        results.append({
+            "date": date.fromordinal(ordinal),
+            "total_value": total_value,
+            "weights": {
+                name: weight
+                for name, weight in zip(asset_names, row_weights)
+                if not isnan(weight)
+            }
+        })
+    return results
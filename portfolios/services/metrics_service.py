@@ -1,60 +1,232 @@
-from datetime import date
-from collections import defaultdict
-from portfolios.selectors.holding_selector import get_holdings_by_date, get_first_portfolio_holding
-from portfolios.selectors.price_selector import get_prices_by_date_range
-from portfolios.selectors.portfolio_selector import get_portfolio_by_id
-from portfolios.selectors.asset_selector import get_asset_by_id
+from datetime import date, timedelta
+from typing import Callable, Iterator
+import numpy as np
+from portfolios.models import Portfolio, PortfolioValuation
+from portfolios.selectors.holding_selector import (
+    get_holding_rows_until,
+    get_holding_rows_for_portfolios_until,
+    get_first_portfolio_holding,
+    get_portfolio_asset_ids
+)
+from portfolios.selectors.portfolio_selector import get_portfolio_by_id, get_portfolios_by_ids
+from portfolios.selectors.asset_selector import get_asset_names_by_ids
+from portfolios.selectors.valuation_selector import count_portfolio_valuations, get_portfolio_valuations, get_valuation_dates
+from portfolios.services.metrics_engine import (
+    DAILY,
+    value_holdings,
+    downsample_indexes,
+    build_metrics_rows
+)
+from portfolios.services.price_grid_service import build_price_grid, get_valued_dates_page
+from portfolios.services.metrics_cache_service import get_metrics_cache_key, get_cached_metrics, set_cached_metrics
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_portfolio_metrics(portfolio_id: int, start_date: date, end_date: date) -> list[dict]:
-    logger.debug(f"Getting portfolio metrics for portfolio {portfolio_id} from {start_date} to {end_date}")
+METRICS_STREAM_CHUNK_DAYS = 90
+
+def compute_portfolio_series(
+    portfolio: Portfolio,
+    start_date: date,
+    end_date: date,
+    holding_rows: list[tuple] = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[int]]:
+    logger.debug(f"Computing series for portfolio '{portfolio.name}' from {start_date} to {end_date}")
+    if holding_rows is None:
+        holding_rows = get_holding_rows_until(portfolio, end_date)
+    asset_ids = list(dict.fromkeys(row[1] for row in holding_rows))
+    date_ordinals, prices = build_price_grid(asset_ids, start_date, end_date)
+    date_ordinals, totals, weights = value_holdings(date_ordinals, prices, holding_rows, asset_ids)
+    return date_ordinals, totals, weights, asset_ids
+
+def build_metrics_rows_from_valuations(valuations: list[PortfolioValuation]) -> list[dict]:
+    asset_ids = {int(asset_id) for valuation in valuations for asset_id in valuation.weights}
+    asset_names = get_asset_names_by_ids(list(asset_ids))
+    return [
+        {
+            "date": valuation.date,
+            "total_value": valuation.total_value,
+            "weights": {
+                asset_names[int(asset_id)]: weight
+                for asset_id, weight in valuation.weights.items()
+            }
+        }
+        for valuation in valuations
+    ]
+
+def get_portfolio_metrics(portfolio_id: int, start_date: date, end_date: date, resolution: str | int = DAILY) -> list[dict]:
+    logger.debug(f"Getting portfolio metrics for portfolio {portfolio_id} from {start_date} to {end_date} at resolution {resolution}")
     portfolio = get_portfolio_by_id(portfolio_id)
-    first_holding = get_first_portfolio_holding(portfolio)
-    reference_date = first_holding.date
+    return get_cached_portfolio_metrics(portfolio, start_date, end_date, resolution=resolution)
 
-    if start_date < reference_date:
-        error_msg = "Start date must be greater than or equal to reference date"
-        logger.error(error_msg)
-        raise ValueError(error_msg)
+def get_cached_portfolio_metrics(
+    portfolio: Portfolio,
+    start_date: date,
+    end_date: date,
+    compute: Callable[[Portfolio, date, date, str | int], list[dict]] = None,
+    resolution: str | int = DAILY
+) -> list[dict]:
+    cache_key = get_metrics_cache_key(portfolio, start_date, end_date, resolution)
+    results = get_cached_metrics(cache_key)
+    if results is None:
+        results = (compute or compute_portfolio_metrics)(portfolio, start_date, end_date, resolution)
+        set_cached_metrics(cache_key, results)
+    return results
+
+def get_portfolio_metrics_page(
+    portfolio_id: int,
+    start_date: date,
+    end_date: date,
+    offset: int,
+    limit: int,
+    resolution: str | int = DAILY
+) -> tuple[list[dict], int]:
+    logger.debug(f"Getting portfolio metrics page for portfolio {portfolio_id} from {start_date} to {end_date}, offset {offset}, limit {limit}")
+    portfolio = get_portfolio_by_id(portfolio_id)
+    if get_reference_date(portfolio, start_date) is None:
+        return [], 0
 
-    holdings = get_holdings_by_date(portfolio, reference_date)
-    quantities = {h.asset.id: h.quantity for h in holdings}
+    if resolution != DAILY:
+        # Downsampled series are already bounded by the number of points shown.
+        results = get_cached_portfolio_metrics(portfolio, start_date, end_date, read_portfolio_metrics, resolution)
+        stop = offset + limit if limit is not None else None
+        return results[offset:stop], len(results)
 
-    asset_ids = list(quantities.keys())
-    prices = get_prices_by_date_range(asset_ids, start_date, end_date)
+    # Metrics have one row per valued date: a grid date on which a held asset has
+    # a price. The page is turned into a date window and only that window is read
+    # or computed.
+    count = count_portfolio_valuations(portfolio, start_date, end_date)
+    if not count:
+        # Without valuations the valued dates are paged from the prices. Rows do
+        # not depend on earlier dates, so the window is computed on its own, with
+        # the holdings of the whole range so that it has the same grid dates.
+        holding_rows = get_holding_rows_until(portfolio, end_date)
+        page_dates, count = get_valued_dates_page(holding_rows, start_date, end_date, offset, limit)
+        if not page_dates:
+            return [], count
+        date_ordinals, totals, weights, asset_ids = compute_portfolio_series(portfolio, page_dates[0], page_dates[-1], holding_rows)
+        asset_names = get_asset_names_by_ids(asset_ids)
+        results = build_metrics_rows(date_ordinals, totals, weights, [asset_names[asset_id] for asset_id in asset_ids])
+        logger.info(f"Computed metrics page for portfolio {portfolio_id}: {len(results)} of {count} dates")
+        return results, count
 
-    prices_by_date = defaultdict(dict)
-    for price in prices:
-        prices_by_date[price.date][price.asset.id] = price.price
+    page_dates = get_valuation_dates(portfolio, start_date, end_date, offset, limit)
+    if not page_dates:
+        return [], count
 
-    results = []
+    results = get_cached_portfolio_metrics(portfolio, page_dates[0], page_dates[-1], read_portfolio_metrics)
+    logger.info(f"Read metrics page for portfolio {portfolio_id}: {len(results)} of {count} dates")
+    return results, count
 
-    for date, prices_on_date in sorted(prices_by_date.items()):
-        assets_value = {}
-        portfolio_value = 0
+def get_batch_portfolio_metrics(portfolio_ids: list[int], start_date: date, end_date: date) -> dict[int, list[dict]]:
+    logger.debug(f"Getting batch metrics for portfolios {portfolio_ids} from {start_date} to {end_date}")
+    portfolios = get_portfolios_by_ids(portfolio_ids)
 
-        for asset_id, price in prices_on_date.items():
-            quantity = quantities.get(asset_id)
-            if quantity is None:
-                continue
-            asset_value = quantity * price
-            assets_value[asset_id] = asset_value
-            portfolio_value += asset_value
+    results = {}
+    pending = []
+    for portfolio in portfolios:
+        cache_key = get_metrics_cache_key(portfolio, start_date, end_date)
+        cached_results = get_cached_metrics(cache_key)
+        if cached_results is None:
+            pending.append((portfolio, cache_key))
+        else:
+            results[portfolio.id] = cached_results
 
-        weights = {}
-        for asset_id, asset_value in assets_value.items():
-            asset = get_asset_by_id(asset_id)
-            weights[asset.name] = float(asset_value / portfolio_value)
+    if pending:
+        computed = compute_batch_portfolio_metrics([portfolio for portfolio, _ in pending], start_date, end_date)
+        for portfolio, cache_key in pending:
+            set_cached_metrics(cache_key, computed[portfolio.id])
+            results[portfolio.id] = computed[portfolio.id]
 
-        result = {
-            "date": date,
-            "total_value": float(portfolio_value),
-            "weights": weights
-        }
-        results.append(result)
-        logger.debug(f"Calculated metrics for date {date}, total value {portfolio_value}, weights length {len(weights)}")
+    logger.info(f"Completed batch metrics for {len(portfolios)} portfolios, {len(pending)} computed")
+    return {portfolio.id: results[portfolio.id] for portfolio in portfolios}
+
+def compute_batch_portfolio_metrics(portfolios: list[Portfolio], start_date: date, end_date: date) -> dict[int, list[dict]]:
+    holding_rows = {portfolio.id: [] for portfolio in portfolios}
+    for portfolio_id, *row in get_holding_rows_for_portfolios_until(list(holding_rows), end_date):
+        holding_rows[portfolio_id].append(tuple(row))
+
+    for portfolio in portfolios:
+        rows = holding_rows[portfolio.id]
+        if rows and start_date < rows[0][0]:
+            error_msg = f"Start date must be greater than or equal to reference date of portfolio {portfolio.id}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+    # Prices are read once for the union of held assets; each portfolio is then
+    # valued on its own columns of the shared matrix.
+    asset_ids = list(dict.fromkeys(row[1] for rows in holding_rows.values() for row in rows))
+    date_ordinals, prices = build_price_grid(asset_ids, start_date, end_date)
+    asset_names = get_asset_names_by_ids(asset_ids)
+    column_by_asset = {asset_id: column for column, asset_id in enumerate(asset_ids)}
 
-    logger.info(f"Completed metrics calculation for portfolio {portfolio_id}: {len(results)} dates processed")
+    results = {}
+    for portfolio in portfolios:
+        rows = holding_rows[portfolio.id]
+        portfolio_asset_ids = list(dict.fromkeys(row[1] for row in rows))
+        columns = [column_by_asset[asset_id] for asset_id in portfolio_asset_ids]
+        ordinals, totals, weights = value_holdings(date_ordinals, prices[:, columns], rows, portfolio_asset_ids)
+        results[portfolio.id] = build_metrics_rows(
+            ordinals, totals, weights, [asset_names[asset_id] for asset_id in portfolio_asset_ids]
+        )
     return results
+
+def get_reference_date(portfolio: Portfolio, start_date: date) -> date | None:
+    first_holding = get_first_portfolio_holding(portfolio)
+    if first_holding is None:
+        logger.warning(f"No holdings found for portfolio {portfolio.id}")
+        return None
+
+    if start_date < first_holding.date:
+        error_msg = "Start date must be greater than or equal to reference date"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    return first_holding.date
+
+def compute_portfolio_metrics(portfolio: Portfolio, start_date: date, end_date: date, resolution: str | int = DAILY) -> list[dict]:
+    if get_reference_date(portfolio, start_date) is None:
+        return []
+    return read_portfolio_metrics(portfolio, start_date, end_date, resolution)
+
+def read_portfolio_metrics(portfolio: Portfolio, start_date: date, end_date: date, resolution: str | int = DAILY) -> list[dict]:
+    # Points are selected before rows are built, so building and serializing the
+    # result scales with the number of points kept rather than with the range.
+    valuations = get_portfolio_valuations(portfolio, start_date, end_date)
+    if valuations:
+        if resolution != DAILY:
+            date_ordinals = np.fromiter((valuation.date.toordinal() for valuation in valuations), dtype=np.int64, count=len(valuations))
+            totals = np.fromiter((valuation.total_value for valuation in valuations), dtype=np.float64, count=len(valuations))
+            valuations = [valuations[index] for index in downsample_indexes(date_ordinals, totals, resolution).tolist()]
+        results = build_metrics_rows_from_valuations(valuations)
+        logger.info(f"Read materialized metrics for portfolio {portfolio.id}: {len(results)} dates")
+        return results
+
+    date_ordinals, totals, weights, asset_ids = compute_portfolio_series(portfolio, start_date, end_date)
+    indexes = downsample_indexes(date_ordinals, totals, resolution)
+    asset_names = get_asset_names_by_ids(asset_ids)
+    results = build_metrics_rows(
+        date_ordinals[indexes], totals[indexes], weights[indexes], [asset_names[asset_id] for asset_id in asset_ids]
+    )
+
+    logger.info(f"Completed metrics calculation for portfolio {portfolio.id}: {len(results)} dates processed")
+    return results
+
+def stream_portfolio_metrics(
+    portfolio_id: int,
+    start_date: date,
+    end_date: date,
+    chunk_days: int = METRICS_STREAM_CHUNK_DAYS
+) -> tuple[list[str], Iterator[dict]]:
+    logger.debug(f"Streaming portfolio metrics for portfolio {portfolio_id} from {start_date} to {end_date}")
+    portfolio = get_portfolio_by_id(portfolio_id)
+    if get_reference_date(portfolio, start_date) is None:
+        return [], iter([])
+    asset_names = get_asset_names_by_ids(get_portfolio_asset_ids(portfolio, end_date))
+    return sorted(asset_names.values()), iter_portfolio_metrics(portfolio, start_date, end_date, chunk_days)
+
+def iter_portfolio_metrics(portfolio: Portfolio, start_date: date, end_date: date, chunk_days: int) -> Iterator[dict]:
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        yield from compute_portfolio_metrics(portfolio, chunk_start, chunk_end)
+        chunk_start = chunk_end + timedelta(days=1)
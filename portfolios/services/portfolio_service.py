@@ -1,17 +1,26 @@
 from datetime import datetime
 from decimal import Decimal
-from django.db import transaction
 from portfolios.models import Portfolio
 from portfolios.selectors.portfolio_selector import get_portfolio_by_id
-from portfolios.selectors.asset_selector import get_asset_by_id
-from portfolios.selectors.holding_selector import get_asset_latest_holding_before_date
-from portfolios.selectors.price_selector import get_price_by_date
-from portfolios.services.holding_service import create_holding, update_holding
+from portfolios.selectors.asset_selector import get_asset_by_id, get_assets_by_ids
+from portfolios.selectors.holding_selector import get_current_holdings
+from portfolios.selectors.weight_selector import get_target_weights
+from portfolios.services.price_grid_service import get_cached_grid_prices, get_grid_price, get_grid_prices
+from portfolios.services.trade_service import record_trade, record_trades
 from portfolios.services.metrics_service import get_portfolio_metrics
+from portfolios.services.simulation_service import get_cached_positions, simulate_portfolio_metrics, simulate_trades
 import logging
 
 logger = logging.getLogger(__name__)
 
+BUY = 'buy'
+SELL = 'sell'
+TRADE_SIDES = (BUY, SELL)
+# Target quantities are rounded to the precision holdings are stored with, and
+# target weights may miss 1 by the rounding of their four decimals.
+QUANTITY_STEP = Decimal("0.01")
+TARGET_WEIGHTS_TOLERANCE = Decimal("0.001")
+
 def create_portfolio(name: str, initial_value: float = 0) -> Portfolio:
     logger.debug(f"Creating portfolio with name '{name}', initial_value {initial_value}")
     if Portfolio.objects.filter(name=name).exists():
@@ -41,28 +50,26 @@ def execute_buy_transaction(
     portfolio_id: int,
     asset_id: int,
     amount: Decimal,
-    date: datetime
+    date: datetime,
+    dry_run: bool = False
 ) -> dict:
-    logger.debug(f"Executing buy transaction for portfolio {portfolio_id}, asset {asset_id}, amount {amount} on {date}")
+    logger.debug(f"Executing buy transaction for portfolio {portfolio_id}, asset {asset_id}, amount {amount} on {date}, dry run {dry_run}")
     portfolio = get_portfolio_by_id(portfolio_id)
     asset = get_asset_by_id(asset_id)
-    
-    price = get_price_by_date(asset, date).price
-    quantity = amount / price
-
-    with transaction.atomic():
-        latest_holding = get_asset_latest_holding_before_date(portfolio, asset, date)
-        if not latest_holding:
-            holding = create_holding(portfolio, asset, date, quantity)
-            logger.info(f"Created new holding for buy transaction: {holding}")
-        else:
-            current_quantity = latest_holding.quantity
-            new_quantity = current_quantity + quantity
-            update_holding(latest_holding, {'quantity': new_quantity})
-            logger.info(f"Updated holding for buy transaction: {latest_holding}")
+
+    if dry_run:
+        price = get_cached_grid_prices([asset.id], date)[asset.id]
+        quantity = amount / price
+        simulate_trades(portfolio, date, [(asset, quantity, price)])
+    else:
+        price = get_grid_price(asset, date).price
+        quantity = amount / price
+        trade = record_trade(portfolio, asset, date, quantity, price)
+        logger.info(f"Recorded trade for buy transaction: {trade}")
 
     result = {
-        "message": "Purchase successful",
+        "message": "Purchase simulated" if dry_run else "Purchase successful",
+        "dry_run": dry_run,
         "portfolio_id": portfolio_id,
         "asset_id": asset_id,
         "quantity": quantity,
@@ -76,30 +83,26 @@ def execute_sell_transaction(
     portfolio_id: int,
     asset_id: int,
     amount: Decimal,
-    date: datetime
+    date: datetime,
+    dry_run: bool = False
 ) -> dict:
-    logger.debug(f"Executing sell transaction for portfolio {portfolio_id}, asset {asset_id}, amount {amount} on {date}")
+    logger.debug(f"Executing sell transaction for portfolio {portfolio_id}, asset {asset_id}, amount {amount} on {date}, dry run {dry_run}")
     portfolio = get_portfolio_by_id(portfolio_id)
     asset = get_asset_by_id(asset_id)
-    
-    price = get_price_by_date(asset, date).price
-    quantity = amount / price
-
-    with transaction.atomic():
-        latest_holding = get_asset_latest_holding_before_date(portfolio, asset, date)
-        current_quantity = latest_holding.quantity
 
-        if current_quantity < quantity or not latest_holding:
-            error_msg = f"Insufficient quantity. Available: {current_quantity}, Requested: {quantity}"
-            logger.error(error_msg)
-            raise ValueError(error_msg)
-
-        new_quantity = current_quantity - quantity
-        update_holding(latest_holding, {'quantity': new_quantity})
-        logger.info(f"Updated holding for sell transaction: {latest_holding}")
+    if dry_run:
+        price = get_cached_grid_prices([asset.id], date)[asset.id]
+        quantity = amount / price
+        simulate_trades(portfolio, date, [(asset, -quantity, price)])
+    else:
+        price = get_grid_price(asset, date).price
+        quantity = amount / price
+        trade = record_trade(portfolio, asset, date, -quantity, price)
+        logger.info(f"Recorded trade for sell transaction: {trade}")
 
     result = {
-        "message": "Sale successful",
+        "message": "Sale simulated" if dry_run else "Sale successful",
+        "dry_run": dry_run,
         "portfolio_id": portfolio_id,
         "asset_id": asset_id,
         "quantity": quantity,
@@ -109,6 +112,50 @@ def execute_sell_transaction(
     logger.info(f"Sell transaction completed: {result}")
     return result
 
+def execute_batch_trades(portfolio_id: int, orders: list[dict], date: datetime) -> dict:
+    logger.debug(f"Executing {len(orders)} trades for portfolio {portfolio_id} on {date}")
+    portfolio = get_portfolio_by_id(portfolio_id)
+    asset_ids = list(dict.fromkeys(order["asset_id"] for order in orders))
+    # Assets and prices are read in one query each for the whole batch.
+    assets = get_assets_by_ids(asset_ids)
+    prices = get_grid_prices(asset_ids, date)
+
+    trades = []
+    for order in orders:
+        if order["side"] not in TRADE_SIDES:
+            error_msg = f"Side must be one of {', '.join(TRADE_SIDES)}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        if order["amount"] <= 0:
+            error_msg = "Amounts must be positive"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        price = prices[order["asset_id"]].price
+        quantity = order["amount"] / price
+        trades.append((assets[order["asset_id"]], quantity if order["side"] == BUY else -quantity, price))
+
+    record_trades(portfolio, date, trades)
+
+    result = {
+        "message": "Trades successful",
+        "portfolio_id": portfolio_id,
+        "date": date,
+        "trades": [
+            {
+                "asset_id": order["asset_id"],
+                "side": order["side"],
+                "quantity": abs(quantity),
+                "price": price,
+                "total": order["amount"]
+            }
+            for order, (_, quantity, price) in zip(orders, trades)
+        ],
+        "total_bought": sum((order["amount"] for order in orders if order["side"] == BUY), Decimal(0)),
+        "total_sold": sum((order["amount"] for order in orders if order["side"] == SELL), Decimal(0))
+    }
+    logger.info(f"Batch of {len(trades)} trades completed for portfolio {portfolio_id} on {date}")
+    return result
+
 def rebalance_portfolio(
     portfolio_id: int,
     sell_asset_id: int,
@@ -116,9 +163,10 @@ def rebalance_portfolio(
     sell_amount: Decimal,
     buy_amount: Decimal,
     start_date: datetime,
-    end_date: datetime = None
+    end_date: datetime = None,
+    dry_run: bool = False
 ) -> dict:
-    logger.debug(f"Rebalancing portfolio {portfolio_id}: selling {sell_amount} of asset {sell_asset_id}, buying {buy_amount} of asset {buy_asset_id}")
+    logger.debug(f"Rebalancing portfolio {portfolio_id}: selling {sell_amount} of asset {sell_asset_id}, buying {buy_amount} of asset {buy_asset_id}, dry run {dry_run}")
     sell_asset = get_asset_by_id(sell_asset_id)
     buy_asset = get_asset_by_id(buy_asset_id)
     
@@ -127,20 +175,122 @@ def rebalance_portfolio(
         logger.error(error_msg)
         raise ValueError(error_msg)
     
-    sell_price = get_price_by_date(sell_asset, start_date).price
+    if dry_run:
+        prices = get_cached_grid_prices([sell_asset.id, buy_asset.id], start_date)
+        sell_price, buy_price = prices[sell_asset.id], prices[buy_asset.id]
+    else:
+        sell_price = get_grid_price(sell_asset, start_date).price
+        buy_price = get_grid_price(buy_asset, start_date).price
+
     sell_quantity = sell_amount / sell_price
-    sell_response = execute_sell_transaction(portfolio_id, sell_asset.id, sell_quantity, start_date)
+    sell_response = execute_sell_transaction(portfolio_id, sell_asset.id, sell_quantity, start_date, dry_run)
     
-    buy_price = get_price_by_date(buy_asset, start_date).price
     buy_quantity = buy_amount / buy_price
-    buy_response = execute_buy_transaction(portfolio_id, buy_asset.id, buy_quantity, start_date)
+    buy_response = execute_buy_transaction(portfolio_id, buy_asset.id, buy_quantity, start_date, dry_run)
     
-    metrics = get_portfolio_metrics(portfolio_id, start_date, end_date)
+    if dry_run:
+        # The metrics of a dry run value the positions the trades would leave.
+        metrics = simulate_portfolio_metrics(
+            get_portfolio_by_id(portfolio_id),
+            start_date,
+            end_date or start_date,
+            [
+                (start_date, sell_asset.id, -sell_response["quantity"]),
+                (start_date, buy_asset.id, buy_response["quantity"])
+            ]
+        )
+    else:
+        metrics = get_portfolio_metrics(portfolio_id, start_date, end_date or start_date)
     
     result = {
+        "dry_run": dry_run,
         "sell_transaction": sell_response,
         "buy_transaction": buy_response,
         "metrics": metrics
     }
     logger.info(f"Rebalancing completed: {result['buy_transaction'], result['sell_transaction'], len(result['metrics'])}")
     return result
+
+def rebalance_to_target_weights(
+    portfolio_id: int,
+    date: datetime,
+    target_weights: dict[int, Decimal] = None,
+    dry_run: bool = False
+) -> dict:
+    logger.debug(f"Rebalancing portfolio {portfolio_id} to target weights on {date}, dry run {dry_run}")
+    portfolio = get_portfolio_by_id(portfolio_id)
+    if target_weights is None:
+        target_weights = get_target_weights(portfolio, date)
+    if any(weight < 0 or weight > 1 for weight in target_weights.values()):
+        error_msg = "Target weights must be between 0 and 1"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    weights_sum = sum(target_weights.values(), Decimal(0))
+    if abs(weights_sum - 1) > TARGET_WEIGHTS_TOLERANCE:
+        error_msg = f"Target weights must sum to 1, got {weights_sum}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    # Held assets without a target are sold. Positions, assets and prices are read
+    # with one query each, whatever the number of assets.
+    if dry_run:
+        positions = {asset_id: position for asset_id, position in get_cached_positions(portfolio, date).items() if position > 0}
+    else:
+        positions = {holding.asset_id: holding.position for holding in get_current_holdings(portfolio, date)}
+    asset_ids = list(dict.fromkeys([*target_weights, *positions]))
+    assets = get_assets_by_ids(asset_ids)
+    if dry_run:
+        prices = get_cached_grid_prices(asset_ids, date)
+    else:
+        prices = {asset_id: price.price for asset_id, price in get_grid_prices(asset_ids, date).items()}
+
+    price_vector = [prices[asset_id] for asset_id in asset_ids]
+    quantities = [positions.get(asset_id, Decimal(0)) for asset_id in asset_ids]
+    total_value = sum((quantity * price for quantity, price in zip(quantities, price_vector)), Decimal(0))
+    if total_value <= 0:
+        error_msg = f"Portfolio {portfolio_id} has no holdings to rebalance on {date}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    target_quantities = [
+        (total_value * target_weights.get(asset_id, Decimal(0)) / weights_sum / price).quantize(QUANTITY_STEP)
+        for asset_id, price in zip(asset_ids, price_vector)
+    ]
+
+    trades = [
+        (assets[asset_id], target - quantity, price)
+        for asset_id, quantity, target, price in zip(asset_ids, quantities, target_quantities, price_vector)
+        if target != quantity
+    ]
+    # The orders are computed from positions read outside the trade transaction,
+    # so they are only applied if no other trade has been recorded since.
+    if dry_run:
+        simulate_trades(portfolio, date, trades)
+    elif trades:
+        record_trades(portfolio, date, trades, expected_version=portfolio.trade_version)
+
+    values = [quantity * price for quantity, price in zip(target_quantities, price_vector)]
+    post_trade_value = sum(values, Decimal(0))
+    result = {
+        "message": "Rebalance simulated" if dry_run else "Rebalance successful",
+        "dry_run": dry_run,
+        "portfolio_id": portfolio_id,
+        "date": date,
+        "total_value": post_trade_value,
+        "trades": [
+            {
+                "asset_id": asset.id,
+                "side": BUY if quantity > 0 else SELL,
+                "quantity": abs(quantity),
+                "price": price,
+                "total": abs(quantity) * price
+            }
+            for asset, quantity, price in trades
+        ],
+        "weights": [
+            {"asset_id": asset_id, "quantity": quantity, "weight": value / post_trade_value}
+            for asset_id, quantity, value in zip(asset_ids, target_quantities, values)
+            if quantity > 0
+        ]
+    }
+    logger.info(f"Rebalanced portfolio {portfolio_id} to target weights on {date} with {len(trades)} trades")
+    return result
@@ -0,0 +1,112 @@
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from portfolios.models import Asset, Price
+from portfolios.selectors.price_selector import (
+    get_price_by_date,
+    get_last_price_between,
+    get_last_prices_between,
+    count_valued_dates,
+    get_valued_dates
+)
+from portfolios.selectors.trading_day_selector import get_trading_calendar_bounds, get_trading_dates
+from portfolios.services.metrics_cache_service import get_metrics_cache_timeout, get_price_data_version
+from portfolios.services.metrics_engine import fill_price_grid, held_ranges
+from portfolios.services.price_store_service import load_price_matrix
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The price grid holds one row per grid date and one column per asset. Grid dates
+# are the trading days of the calendar between its first and last day, and the
+# dates with prices outside of them, so a calendar built for part of the history
+# never drops the rest of it; a missing price is filled with the asset's last price if that price
+# is at most PRICE_STALENESS_DAYS calendar days old.
+
+
+def get_price_staleness_days() -> int:
+    return getattr(settings, 'PRICE_STALENESS_DAYS', 0)
+
+def build_price_grid(
+    asset_ids: list[int],
+    start_date: date,
+    end_date: date,
+    staleness_days: int = None
+) -> tuple[np.ndarray, np.ndarray]:
+    if staleness_days is None:
+        staleness_days = get_price_staleness_days()
+    logger.debug(f"Building price grid for {len(asset_ids)} assets from {start_date} to {end_date}, staleness {staleness_days} days")
+
+    # Without filling, a grid date without prices is dropped by the valuation
+    # anyway, so the price dates are already the grid.
+    if not staleness_days:
+        return load_price_matrix(asset_ids, start_date, end_date)
+
+    # Prices up to staleness_days before the range can still fill its first dates.
+    lookback_date = date.fromordinal(max(1, start_date.toordinal() - staleness_days))
+    price_ordinals, prices = load_price_matrix(asset_ids, lookback_date, end_date)
+    grid_ordinals = price_ordinals[price_ordinals >= start_date.toordinal()]
+    calendar_bounds = get_trading_calendar_bounds()
+    if calendar_bounds is not None:
+        first_date, last_date = calendar_bounds
+        covered = (grid_ordinals >= first_date.toordinal()) & (grid_ordinals <= last_date.toordinal())
+        trading_dates = get_trading_dates(max(start_date, first_date), min(end_date, last_date))
+        trading_ordinals = np.fromiter((day.toordinal() for day in trading_dates), dtype=np.int64, count=len(trading_dates))
+        grid_ordinals = np.union1d(grid_ordinals[~covered], trading_ordinals)
+
+    grid = fill_price_grid(price_ordinals, prices, grid_ordinals, staleness_days)
+    logger.debug(f"Built price grid of {len(grid_ordinals)} dates x {len(asset_ids)} assets")
+    return grid_ordinals, grid
+
+def get_valued_dates_page(
+    holding_rows: list[tuple],
+    start_date: date,
+    end_date: date,
+    offset: int,
+    limit: int
+) -> tuple[list[date], int]:
+    # Pages over the dates a series of these holdings is valued on in the database,
+    # so a page costs its own dates rather than the whole range.
+    asset_ids = list(dict.fromkeys(row[1] for row in holding_rows))
+    ranges = held_ranges(holding_rows, end_date)
+    staleness_days = get_price_staleness_days()
+    calendar_bounds = get_trading_calendar_bounds() if staleness_days else None
+    count = count_valued_dates(asset_ids, ranges, start_date, end_date, staleness_days, calendar_bounds)
+    if offset >= count:
+        return [], count
+    return get_valued_dates(asset_ids, ranges, start_date, end_date, staleness_days, calendar_bounds, offset, limit), count
+
+def get_grid_price(asset: Asset, date: date) -> Price:
+    # Trades are priced like the grid: the last price at most PRICE_STALENESS_DAYS old.
+    staleness_days = get_price_staleness_days()
+    if not staleness_days:
+        return get_price_by_date(asset, date)
+    return get_last_price_between(asset, date - timedelta(days=staleness_days), date)
+
+def get_grid_prices(asset_ids: list[int], date: date) -> dict[int, Price]:
+    staleness_days = get_price_staleness_days()
+    prices = get_last_prices_between(asset_ids, date - timedelta(days=staleness_days), date)
+    missing_ids = [asset_id for asset_id in asset_ids if asset_id not in prices]
+    if missing_ids:
+        error_msg = f"Price not found for assets {missing_ids} on {date}"
+        logger.error(error_msg)
+        raise Price.DoesNotExist(error_msg)
+    return prices
+
+def get_cached_grid_prices(asset_ids: list[int], date: date) -> dict[int, Decimal]:
+    # Grid prices are cached per asset and date under the price data version, so
+    # simulations on the same date only read the prices no earlier one needed.
+    version = get_price_data_version()
+    staleness_days = get_price_staleness_days()
+    keys = {asset_id: f"grid-price:{version}:{staleness_days}:{asset_id}:{date}" for asset_id in asset_ids}
+    cached = cache.get_many(list(keys.values()))
+    prices = {asset_id: cached[key] for asset_id, key in keys.items() if key in cached}
+
+    missing_ids = [asset_id for asset_id in asset_ids if asset_id not in prices]
+    if missing_ids:
+        fetched = {asset_id: price.price for asset_id, price in get_grid_prices(missing_ids, date).items()}
+        cache.set_many({keys[asset_id]: price for asset_id, price in fetched.items()}, timeout=get_metrics_cache_timeout())
+        prices.update(fetched)
+    return prices
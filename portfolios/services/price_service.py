@@ -1,11 +1,28 @@
-from datetime import datetime, date
-from decimal import Decimal
-from portfolios.models import Price, Asset
+import time
+from datetime import datetime, date, timedelta
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from portfolios.models import Price, Asset, LatestPrice
+from portfolios.selectors.asset_selector import get_asset_ids_by_names
+from portfolios.selectors.holding_selector import get_portfolio_ids_holding_assets
+from portfolios.selectors.price_selector import get_existing_price_keys
+from portfolios.services.metrics_cache_service import bump_portfolio_data_versions, bump_price_data_version
+from portfolios.services.price_grid_service import get_price_staleness_days
+from portfolios.services.price_store_service import refresh_price_store
+from portfolios.services.valuation_service import refresh_valuations_for_assets
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_price(asset: Asset, date: datetime, price: Decimal) -> Price:
+PRICE_CONFLICT_IGNORE = 'ignore'
+PRICE_CONFLICT_UPDATE = 'update'
+PRICE_BATCH_SIZE = 1000
+PRICE_PRECISION = Decimal("0.01")
+MAX_PRICE = Decimal(10) ** (Price._meta.get_field('price').max_digits - 2)
+
+def create_price(asset: Asset, date: datetime, price: Decimal, propagate: bool = True) -> Price:
     logger.debug(f"Creating price for asset '{asset.name}' on {date}")
     if price <= 0:
         error_msg = "Price must be positive"
@@ -17,6 +34,134 @@ def create_price(asset: Asset, date: datetime, price: Decimal) -> Price:
         logger.warning(error_msg)
         raise ValueError(error_msg)
     
-    price_obj = Price.objects.create(asset=asset, date=date, price=price)
+    with transaction.atomic():
+        price_obj = Price.objects.create(asset=asset, date=date, price=price)
+        record_latest_price(price_obj)
     logger.info(f"Created price: {price_obj}")
+    if propagate:
+        propagate_price_changes([asset.id], date, date)
     return price_obj
+
+def parse_price_row(row: dict) -> tuple[str, date, Decimal]:
+    try:
+        asset_name, price_date, price = row['asset'], row['date'], row['price']
+    except (KeyError, TypeError):
+        raise ValueError("Row must have asset, date and price")
+
+    if not isinstance(price_date, date):
+        try:
+            price_date = date.fromisoformat(str(price_date))
+        except ValueError:
+            raise ValueError(f"Invalid date '{price_date}'")
+    if price_date > timezone.now().date():
+        raise ValueError("Price date cannot be in the future")
+
+    try:
+        price = Decimal(str(price)).quantize(PRICE_PRECISION)
+    except InvalidOperation:
+        raise ValueError(f"Invalid price '{price}'")
+    if not 0 < price < MAX_PRICE:
+        raise ValueError("Price must be positive and below the maximum price")
+    return str(asset_name), price_date, price
+
+def bulk_create_prices(
+    rows: list[dict],
+    on_conflict: str = PRICE_CONFLICT_IGNORE,
+    batch_size: int = PRICE_BATCH_SIZE
+) -> dict:
+    logger.debug(f"Bulk creating {len(rows)} prices, on conflict {on_conflict}")
+    started_at = time.perf_counter()
+    rejected = []
+
+    parsed_rows = {}
+    for index, row in enumerate(rows):
+        try:
+            parsed_rows[index] = parse_price_row(row)
+        except ValueError as e:
+            rejected.append({"index": index, "error": str(e)})
+
+    asset_ids = get_asset_ids_by_names(list({asset_name for asset_name, _, _ in parsed_rows.values()}))
+    existing_keys = set()
+    if on_conflict == PRICE_CONFLICT_IGNORE:
+        existing_keys = get_existing_price_keys(
+            list(asset_ids.values()),
+            list({price_date for _, price_date, _ in parsed_rows.values()})
+        )
+
+    prices = {}
+    for index, (asset_name, price_date, price) in parsed_rows.items():
+        asset_id = asset_ids.get(asset_name)
+        if asset_id is None:
+            rejected.append({"index": index, "error": f"Asset with name '{asset_name}' not found"})
+        elif (asset_id, price_date) in prices:
+            rejected.append({"index": index, "error": f"Duplicate price for asset {asset_name} on {price_date}"})
+        elif (asset_id, price_date) in existing_keys:
+            rejected.append({"index": index, "error": f"Price already exists for asset {asset_name} on {price_date}"})
+        else:
+            prices[(asset_id, price_date)] = Price(asset_id=asset_id, date=price_date, price=price)
+
+    written_asset_ids = list({asset_id for asset_id, _ in prices})
+    with transaction.atomic():
+        if on_conflict == PRICE_CONFLICT_UPDATE:
+            Price.objects.bulk_create(
+                prices.values(),
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['asset', 'date'],
+                update_fields=['price', 'updated_at']
+            )
+        else:
+            Price.objects.bulk_create(prices.values(), batch_size=batch_size, ignore_conflicts=True)
+        refresh_latest_prices(written_asset_ids)
+
+    if prices:
+        price_dates = [price_date for _, price_date in prices]
+        propagate_price_changes(written_asset_ids, min(price_dates), max(price_dates))
+
+    elapsed = time.perf_counter() - started_at
+    result = {
+        "received": len(rows),
+        "written": len(prices),
+        "rejected": sorted(rejected, key=lambda reject: reject["index"]),
+        "elapsed_seconds": elapsed,
+        "rows_per_second": len(rows) / elapsed if elapsed else 0.0
+    }
+    logger.info(f"Bulk created {result['written']} of {result['received']} prices, {len(rejected)} rejected, {result['rows_per_second']:.0f} rows/s")
+    return result
+
+def record_latest_price(price: Price) -> None:
+    logger.debug(f"Recording latest price candidate: {price}")
+    updated = LatestPrice.objects.filter(
+        asset_id=price.asset_id,
+        price__date__lte=price.date
+    ).update(price=price, updated_at=timezone.now())
+    if not updated:
+        LatestPrice.objects.get_or_create(asset_id=price.asset_id, defaults={'price': price})
+
+def refresh_latest_prices(asset_ids: list[int]) -> int:
+    logger.debug(f"Refreshing latest prices for assets {asset_ids}")
+    latest_price_id = Price.objects.filter(asset=OuterRef('asset')).order_by('-date').values('id')[:1]
+    rows = Price.objects.filter(
+        asset_id__in=asset_ids,
+        id=Subquery(latest_price_id)
+    ).values_list('asset_id', 'id')
+
+    with transaction.atomic():
+        LatestPrice.objects.filter(asset_id__in=asset_ids).delete()
+        latest_prices = LatestPrice.objects.bulk_create([
+            LatestPrice(asset_id=asset_id, price_id=price_id)
+            for asset_id, price_id in rows
+        ])
+    logger.info(f"Refreshed latest prices for {len(latest_prices)} assets")
+    return len(latest_prices)
+
+def propagate_price_changes(asset_ids: list[int], start_date: date, end_date: date = None) -> None:
+    logger.debug(f"Propagating price changes for assets {asset_ids} from {start_date} to {end_date}")
+    # A price also fills the grid dates up to PRICE_STALENESS_DAYS after it, so
+    # those valuations change with it.
+    if end_date is not None:
+        end_date += timedelta(days=get_price_staleness_days())
+    refresh_price_store(start_date, asset_ids)
+    bump_price_data_version()
+    bump_portfolio_data_versions(get_portfolio_ids_holding_assets(asset_ids))
+    refresh_valuations_for_assets(asset_ids, start_date, end_date)
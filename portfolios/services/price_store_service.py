@@ -0,0 +1,198 @@
+import fcntl
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+from django.conf import settings
+from portfolios.selectors.price_selector import get_price_rows_by_date_range, get_price_rows_since
+from portfolios.services.metrics_engine import build_date_asset_matrix
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The store is a list of segments, each a dense date x asset float64 matrix saved
+# as .npy files in its own directory and covering a range of dates after the
+# previous one. CURRENT lists the segments readers should map; it is swapped with
+# an atomic rename, so readers never see a partially written store. Segments are
+# never changed once written: a refresh keeps the segments before the refreshed
+# date, rewrites the one it falls in and appends the new dates as a segment.
+PRICE_STORE_POINTER = 'CURRENT'
+PRICE_STORE_LOCK = 'LOCK'
+PRICE_STORE_ARRAYS = ('dates', 'assets', 'prices')
+# Once appends leave more segments than this, the store is rebuilt as one.
+PRICE_STORE_MAX_SEGMENTS = 64
+
+_mapped_segments = {}
+
+
+def get_price_store_dir() -> Path | None:
+    store_dir = getattr(settings, 'PRICE_STORE_DIR', None)
+    return Path(store_dir) if store_dir else None
+
+@contextmanager
+def _lock_price_store(store_dir: Path) -> Iterator[None]:
+    # Writers read the current segments and publish new ones, so they take turns:
+    # otherwise the later rename would drop the segments of the other writer.
+    store_dir.mkdir(parents=True, exist_ok=True)
+    with open(store_dir / PRICE_STORE_LOCK, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _open_price_store(store_dir: Path) -> list[tuple[str, np.ndarray, np.ndarray, np.ndarray]] | None:
+    try:
+        segments = (store_dir / PRICE_STORE_POINTER).read_text().split()
+    except FileNotFoundError:
+        return None
+
+    for key in [key for key in _mapped_segments if key[0] == str(store_dir) and key[1] not in segments]:
+        del _mapped_segments[key]
+    opened = []
+    for segment in segments:
+        key = (str(store_dir), segment)
+        if key not in _mapped_segments:
+            _mapped_segments[key] = tuple(
+                np.load(store_dir / segment / f"{name}.npy", mmap_mode='r')
+                for name in PRICE_STORE_ARRAYS
+            )
+        opened.append((segment, *_mapped_segments[key]))
+    return opened
+
+def _write_segment(store_dir: Path, date_ordinals: np.ndarray, asset_ids: list[int], prices: np.ndarray) -> str:
+    segment = f"segment-{time.time_ns()}"
+    segment_dir = store_dir / segment
+    segment_dir.mkdir(parents=True)
+    np.save(segment_dir / 'dates.npy', np.asarray(date_ordinals, dtype=np.int64))
+    np.save(segment_dir / 'assets.npy', np.asarray(asset_ids, dtype=np.int64))
+    np.save(segment_dir / 'prices.npy', prices)
+    logger.debug(f"Wrote price store segment {segment}: {len(date_ordinals)} dates x {len(asset_ids)} assets")
+    return segment
+
+def _publish_price_store(store_dir: Path, segments: list[str]) -> None:
+    pointer = store_dir / f"{PRICE_STORE_POINTER}.tmp"
+    pointer.write_text("\n".join(segments))
+    os.replace(pointer, store_dir / PRICE_STORE_POINTER)
+    # Stores written before segments hold one build-* directory.
+    for old_dir in [*store_dir.glob('segment-*'), *store_dir.glob('build-*')]:
+        if old_dir.name not in segments:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info(f"Published price store with {len(segments)} segments")
+
+def _rebuild_price_store(store_dir: Path) -> int:
+    logger.debug(f"Rebuilding price store in {store_dir}")
+    rows = get_price_rows_since(date.min)
+    asset_ids = sorted({row[1] for row in rows})
+    date_ordinals, prices = build_date_asset_matrix(rows, asset_ids)
+    _publish_price_store(store_dir, [_write_segment(store_dir, date_ordinals, asset_ids, prices)])
+    return len(rows)
+
+def rebuild_price_store() -> int:
+    store_dir = get_price_store_dir()
+    if store_dir is None:
+        error_msg = "PRICE_STORE_DIR is not configured"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    with _lock_price_store(store_dir):
+        return _rebuild_price_store(store_dir)
+
+def _merge_stored_prices(stored_parts: list[tuple[np.ndarray, np.ndarray, np.ndarray]], rows: list[tuple], asset_ids: list[int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # The refreshed assets take their prices from rows; the other assets keep the
+    # stored ones, so they are not read from the database again.
+    refreshed = np.asarray(sorted(set(asset_ids)), dtype=np.int64)
+    row_assets = np.asarray(sorted({row[1] for row in rows}), dtype=np.int64)
+    row_dates, row_prices = build_date_asset_matrix(rows, row_assets.tolist())
+    others = [(dates, assets, assets[~np.isin(assets, refreshed)], prices) for dates, assets, prices in stored_parts]
+
+    date_ordinals = np.unique(np.concatenate([row_dates, *[dates for dates, _, _, _ in others]]))
+    merged_assets = np.unique(np.concatenate([row_assets, *[kept for _, _, kept, _ in others]]))
+    prices = np.full((len(date_ordinals), len(merged_assets)), np.nan)
+    for dates, assets, kept, stored_prices in others:
+        columns = np.isin(assets, kept)
+        prices[np.ix_(np.searchsorted(date_ordinals, dates), np.searchsorted(merged_assets, kept))] = stored_prices[:, columns]
+    prices[np.ix_(np.searchsorted(date_ordinals, row_dates), np.searchsorted(merged_assets, row_assets))] = row_prices
+
+    priced = ~np.isnan(prices).all(axis=1)
+    return date_ordinals[priced], merged_assets, prices[priced]
+
+def refresh_price_store(start_date: date, asset_ids: list[int] | None = None) -> int:
+    store_dir = get_price_store_dir()
+    if store_dir is None:
+        logger.debug("PRICE_STORE_DIR is not configured, skipping price store refresh")
+        return 0
+
+    with _lock_price_store(store_dir):
+        store = _open_price_store(store_dir)
+        if store is None:
+            return _rebuild_price_store(store_dir)
+
+        # Only the prices from start_date on are read from the database, and only
+        # those of asset_ids when given; earlier segments are kept as they are, and
+        # the one start_date falls in is cut at it. Appending a new day of prices
+        # copies nothing.
+        logger.debug(f"Refreshing price store from {start_date} for assets {asset_ids}")
+        start = start_date.toordinal()
+        segments, stored_parts = [], []
+        for segment, stored_dates, stored_assets, stored_prices in store:
+            if not len(stored_dates):
+                continue
+            kept = int(np.searchsorted(stored_dates, start))
+            if kept == len(stored_dates):
+                segments.append(segment)
+                continue
+            if kept:
+                segments.append(_write_segment(store_dir, stored_dates[:kept], stored_assets.tolist(), stored_prices[:kept]))
+            stored_parts.append((stored_dates[kept:], stored_assets, stored_prices[kept:]))
+
+        rows = get_price_rows_since(start_date, asset_ids)
+        if asset_ids is None:
+            new_assets = sorted({row[1] for row in rows})
+            new_dates, new_prices = build_date_asset_matrix(rows, new_assets)
+        else:
+            new_dates, new_assets, new_prices = _merge_stored_prices(stored_parts, rows, asset_ids)
+        if len(new_dates):
+            segments.append(_write_segment(store_dir, new_dates, list(new_assets), new_prices))
+        if len(segments) > PRICE_STORE_MAX_SEGMENTS:
+            return _rebuild_price_store(store_dir)
+        _publish_price_store(store_dir, segments)
+        return len(rows)
+
+def read_price_matrix(asset_ids: list[int], start_date: date, end_date: date) -> tuple[np.ndarray, np.ndarray] | None:
+    store_dir = get_price_store_dir()
+    store = _open_price_store(store_dir) if store_dir else None
+    if store is None:
+        return None
+
+    requested = np.asarray(asset_ids, dtype=np.int64)
+    date_parts, price_parts = [], []
+    for _, stored_dates, stored_assets, stored_prices in store:
+        start = int(np.searchsorted(stored_dates, start_date.toordinal(), side='left'))
+        stop = int(np.searchsorted(stored_dates, end_date.toordinal(), side='right'))
+        if start == stop:
+            continue
+        # A view on the mapped file: only the requested asset columns are copied.
+        rows = stored_prices[start:stop]
+        positions = np.minimum(np.searchsorted(stored_assets, requested), max(len(stored_assets) - 1, 0))
+        stored = stored_assets[positions] == requested if len(stored_assets) else np.zeros(len(requested), dtype=bool)
+        prices = np.full((len(rows), len(asset_ids)), np.nan)
+        prices[:, stored] = rows[:, positions[stored]]
+        date_parts.append(np.asarray(stored_dates[start:stop]))
+        price_parts.append(prices)
+
+    date_ordinals = np.concatenate(date_parts) if date_parts else np.zeros(0, dtype=np.int64)
+    prices = np.vstack(price_parts) if price_parts else np.full((0, len(asset_ids)), np.nan)
+    priced = ~np.isnan(prices).all(axis=1)
+    logger.debug(f"Read {int(priced.sum())} dates for {len(asset_ids)} assets from the price store")
+    return date_ordinals[priced], prices[priced]
+
+def load_price_matrix(asset_ids: list[int], start_date: date, end_date: date) -> tuple[np.ndarray, np.ndarray]:
+    stored = read_price_matrix(asset_ids, start_date, end_date)
+    if stored is not None:
+        return stored
+    return build_date_asset_matrix(get_price_rows_by_date_range(asset_ids, start_date, end_date), asset_ids)
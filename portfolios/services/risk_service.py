@@ -0,0 +1,139 @@
+from datetime import date
+from decimal import Decimal
+import numpy as np
+from django.core.cache import cache
+from portfolios.models import Portfolio
+from portfolios.selectors.portfolio_selector import get_portfolio_by_id
+from portfolios.selectors.trade_selector import get_trade_flows
+from portfolios.services.metrics_cache_service import get_metrics_cache_timeout, get_portfolio_data_version
+from portfolios.services.metrics_service import get_cached_portfolio_metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_VOLATILITY_WINDOWS = (21, 63)
+
+# Portfolios hold no cash, so a buy raises the total value and a sell lowers it
+# without any gain or loss. Returns are net of the trades in the ledger: the cost
+# of the trades that take effect on a date is taken out of its value before it is
+# compared with the previous one. Holdings set directly, without a trade, are not
+# flows and still count as a change in value.
+
+
+def compute_returns(totals: np.ndarray, flows: np.ndarray = None) -> np.ndarray:
+    returns = np.full(len(totals), np.nan)
+    values = totals[1:] if flows is None else totals[1:] - flows[1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = values / totals[:-1] - 1
+    return returns
+
+def align_flows(dates: list[date], flows: dict[date, Decimal]) -> np.ndarray:
+    # A trade on a date without a valuation takes effect on the next valued date.
+    # Trades up to the first date are already in its value and later ones are out
+    # of the range, so neither is a flow of the series.
+    aligned = np.zeros(len(dates))
+    if not dates or not flows:
+        return aligned
+    ordinals = np.fromiter((result_date.toordinal() for result_date in dates), dtype=np.int64, count=len(dates))
+    for flow_date, flow in flows.items():
+        index = int(np.searchsorted(ordinals, flow_date.toordinal()))
+        if 0 < index < len(dates):
+            aligned[index] += float(flow)
+    return aligned
+
+def get_cached_trade_flows(portfolio: Portfolio, start_date: date, end_date: date) -> dict[date, Decimal]:
+    # Cached under the portfolio data version, which every recorded trade bumps.
+    cache_key = f"portfolio-trade-flows:{portfolio.id}:{get_portfolio_data_version(portfolio)}:{start_date}:{end_date}"
+    flows = cache.get(cache_key)
+    if flows is None:
+        flows = get_trade_flows(portfolio, start_date, end_date)
+        cache.set(cache_key, flows, timeout=get_metrics_cache_timeout())
+    return flows
+
+def rolling_volatility(returns: np.ndarray, window: int, periods_per_year: int = TRADING_DAYS_PER_YEAR) -> np.ndarray:
+    # Sample standard deviation over the trailing window from running sums of the
+    # returns and their squares, so each window costs O(1) whatever its length.
+    volatility = np.full(len(returns), np.nan)
+    values = returns[1:]
+    if window < 2 or len(values) < window:
+        return volatility
+
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    squares = np.concatenate(([0.0], np.cumsum(values * values)))
+    window_sums = sums[window:] - sums[:-window]
+    window_squares = squares[window:] - squares[:-window]
+    variance = (window_squares - window_sums * window_sums / window) / (window - 1)
+    volatility[window:] = np.sqrt(np.maximum(variance, 0.0) * periods_per_year)
+    return volatility
+
+def compute_drawdowns(totals: np.ndarray) -> np.ndarray:
+    peaks = np.maximum.accumulate(totals)
+    return totals / peaks - 1
+
+def compute_sharpe_ratio(returns: np.ndarray, risk_free_rate: float, periods_per_year: int = TRADING_DAYS_PER_YEAR) -> float | None:
+    excess_returns = returns[1:] - risk_free_rate / periods_per_year
+    if len(excess_returns) < 2:
+        return None
+    deviation = excess_returns.std(ddof=1)
+    if deviation == 0:
+        return None
+    return float(excess_returns.mean() / deviation * np.sqrt(periods_per_year))
+
+def _optional(value: float) -> float | None:
+    return None if np.isnan(value) else float(value)
+
+def get_portfolio_risk(
+    portfolio_id: int,
+    start_date: date,
+    end_date: date,
+    windows: list[int] = DEFAULT_VOLATILITY_WINDOWS,
+    risk_free_rate: float = 0.0
+) -> dict:
+    logger.debug(f"Getting risk analytics for portfolio {portfolio_id} from {start_date} to {end_date} with windows {windows}")
+    # Built on the (cached) daily metrics series, so a risk report reads the same
+    # prices as get_portfolio_metrics and nothing more.
+    portfolio = get_portfolio_by_id(portfolio_id)
+    metrics = get_cached_portfolio_metrics(portfolio, start_date, end_date)
+    dates = [result["date"] for result in metrics]
+    totals = np.fromiter((result["total_value"] for result in metrics), dtype=np.float64, count=len(metrics))
+    flows = align_flows(dates, get_cached_trade_flows(portfolio, start_date, end_date))
+
+    returns = compute_returns(totals, flows)
+    # Total return and drawdowns follow the compounded returns rather than the
+    # values, so trades move neither of them.
+    growth = np.cumprod(1 + np.where(np.isfinite(returns), returns, 0.0)) if len(totals) else totals
+    drawdowns = compute_drawdowns(growth) if len(totals) else totals
+    volatility = {window: rolling_volatility(returns, window) for window in windows}
+
+    summary = {
+        "total_return": _optional(growth[-1] - 1) if len(totals) else None,
+        "volatility": _optional(np.sqrt(TRADING_DAYS_PER_YEAR) * returns[1:].std(ddof=1)) if len(totals) > 2 else None,
+        "max_drawdown": None,
+        "max_drawdown_peak_date": None,
+        "max_drawdown_trough_date": None,
+        "sharpe_ratio": compute_sharpe_ratio(returns, risk_free_rate)
+    }
+    if len(totals):
+        trough = int(np.argmin(drawdowns))
+        peak = int(np.argmax(growth[:trough + 1]))
+        summary.update({
+            "max_drawdown": float(drawdowns[trough]),
+            "max_drawdown_peak_date": dates[peak],
+            "max_drawdown_trough_date": dates[trough]
+        })
+
+    series = [
+        {
+            "date": result_date,
+            "total_value": total_value,
+            "daily_return": _optional(daily_return),
+            "drawdown": drawdown,
+            "volatility": {str(window): _optional(volatility[window][index]) for window in windows}
+        }
+        for index, (result_date, total_value, daily_return, drawdown) in enumerate(
+            zip(dates, totals.tolist(), returns.tolist(), drawdowns.tolist())
+        )
+    ]
+    logger.info(f"Computed risk analytics for portfolio {portfolio_id}: {len(series)} dates")
+    return {"summary": summary, "series": series}
@@ -0,0 +1,66 @@
+from datetime import date
+from decimal import Decimal
+from django.core.cache import cache
+from portfolios.models import Asset, Portfolio
+from portfolios.selectors.asset_selector import get_asset_names_by_ids
+from portfolios.selectors.holding_selector import get_current_holdings, get_holding_rows_until, get_lowest_asset_positions
+from portfolios.services.metrics_cache_service import get_metrics_cache_timeout, get_portfolio_data_version
+from portfolios.services.metrics_engine import build_metrics_rows, value_holdings
+from portfolios.services.price_grid_service import build_price_grid
+from portfolios.services.trade_service import apply_position_changes, get_position_changes
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Simulations run against copies of positions and prices held in the cache and
+# never write or lock anything, so any number of them can run alongside trades.
+# Positions are cached under the portfolio data version, which every recorded
+# trade bumps, so a simulation never sees positions older than the last trade.
+
+
+def get_cached_positions(portfolio: Portfolio, date: date) -> dict[int, Decimal]:
+    cache_key = f"portfolio-positions:{portfolio.id}:{get_portfolio_data_version(portfolio)}:{date}"
+    positions = cache.get(cache_key)
+    if positions is None:
+        positions = {holding.asset_id: holding.position for holding in get_current_holdings(portfolio, date)}
+        cache.set(cache_key, positions, timeout=get_metrics_cache_timeout())
+    return positions
+
+def simulate_trades(portfolio: Portfolio, date: date, orders: list[tuple[Asset, Decimal, Decimal]]) -> dict[int, Decimal]:
+    logger.debug(f"Simulating {len(orders)} trades in portfolio '{portfolio.name}' on {date}")
+    changes = get_position_changes(orders)
+    # Validated like recorded trades, against the lowest position from the trade date on.
+    apply_position_changes(get_lowest_asset_positions(portfolio, list(changes), date), changes, orders)
+    positions = apply_position_changes(get_cached_positions(portfolio, date), changes, orders)
+    logger.info(f"Simulated {len(orders)} trades in portfolio '{portfolio.name}' on {date}")
+    return positions
+
+def _apply_trades_to_holding_rows(rows: list[tuple], trades: list[tuple[date, int, Decimal]]) -> list[tuple]:
+    # Holding rows are positions after each event, so a trade adds to every row of
+    # its asset from its date on and starts a row on its date if there is none.
+    positions = {(row_date, asset_id): quantity for row_date, asset_id, quantity in rows}
+    for trade_date, asset_id, quantity in trades:
+        if (trade_date, asset_id) not in positions:
+            earlier = [(row_date, position) for (row_date, row_asset_id), position in positions.items()
+                       if row_asset_id == asset_id and row_date < trade_date]
+            positions[(trade_date, asset_id)] = max(earlier)[1] if earlier else Decimal(0)
+        for key in positions:
+            if key[1] == asset_id and key[0] >= trade_date:
+                positions[key] += quantity
+    return sorted((row_date, asset_id, quantity) for (row_date, asset_id), quantity in positions.items())
+
+def simulate_portfolio_metrics(
+    portfolio: Portfolio,
+    start_date: date,
+    end_date: date,
+    trades: list[tuple[date, int, Decimal]]
+) -> list[dict]:
+    logger.debug(f"Simulating metrics for portfolio '{portfolio.name}' from {start_date} to {end_date} with {len(trades)} trades")
+    holding_rows = _apply_trades_to_holding_rows(get_holding_rows_until(portfolio, end_date), trades)
+    asset_ids = list(dict.fromkeys(row[1] for row in holding_rows))
+    date_ordinals, prices = build_price_grid(asset_ids, start_date, end_date)
+    date_ordinals, totals, weights = value_holdings(date_ordinals, prices, holding_rows, asset_ids)
+    asset_names = get_asset_names_by_ids(asset_ids)
+    results = build_metrics_rows(date_ordinals, totals, weights, [asset_names[asset_id] for asset_id in asset_ids])
+    logger.info(f"Simulated metrics for portfolio {portfolio.id}: {len(results)} dates")
+    return results
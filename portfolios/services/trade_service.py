@@ -0,0 +1,157 @@
+import random
+import time
+from collections import defaultdict
+from decimal import Decimal
+from datetime import date
+from typing import Callable, TypeVar
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+from portfolios.models import Holding, Portfolio, Asset, Trade
+from portfolios.selectors.holding_selector import get_asset_positions, get_holding_rows_until, get_lowest_asset_positions
+from portfolios.selectors.portfolio_selector import get_portfolio_trade_versions
+from portfolios.selectors.trade_selector import get_asset_ids_traded_since_snapshot
+from portfolios.services.holding_service import propagate_holding_changes
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+TRADE_RETRY_DELAY = 0.05
+
+def record_trade(portfolio: Portfolio, asset: Asset, date: date, quantity: Decimal, price: Decimal) -> Trade:
+    return record_trades(portfolio, date, [(asset, quantity, price)])[0]
+
+def record_trades(
+    portfolio: Portfolio,
+    date: date,
+    orders: list[tuple[Asset, Decimal, Decimal]],
+    expected_version: int = None
+) -> list[Trade]:
+    logger.debug(f"Recording {len(orders)} trades in portfolio '{portfolio.name}' on {date}")
+    changes = get_position_changes(orders)
+
+    def apply_trades() -> list[Trade]:
+        # Positions are read after the portfolio is locked, so a concurrent trade is
+        # either already counted or waits for this one to commit. Orders are checked
+        # against the lowest position from their date on, so a backdated sell cannot
+        # take a later position below zero.
+        trade_version = _lock_portfolio(portfolio, expected_version)
+        positions = get_asset_positions(portfolio, list(changes), date)
+        apply_position_changes(get_lowest_asset_positions(portfolio, list(changes), date), changes, orders)
+
+        # Trades are only inserted: positions are the latest snapshot plus the trades
+        # it does not include, which the trade version tells apart. A position without
+        # a snapshot is opened with an empty one, so every trade has a snapshot at or
+        # before it.
+        _write_snapshots(portfolio, date, {
+            asset_id: Decimal(0) for asset_id in changes if asset_id not in positions
+        }, 0)
+        return Trade.objects.bulk_create([
+            Trade(portfolio=portfolio, asset=asset, date=date, quantity=quantity, price=price, trade_version=trade_version)
+            for asset, quantity, price in orders
+        ])
+
+    trades = run_with_retry(apply_trades, f"trades in portfolio '{portfolio.name}'")
+    logger.info(f"Recorded {len(trades)} trades in portfolio '{portfolio.name}' on {date}")
+    # Valuations are rebuilt from the positions, so a retried refresh is harmless.
+    run_with_retry(lambda: propagate_holding_changes(portfolio, date), f"valuations of portfolio '{portfolio.name}'")
+    return trades
+
+def get_trade_max_attempts() -> int:
+    return getattr(settings, 'TRADE_MAX_ATTEMPTS', 5)
+
+def get_position_changes(orders: list[tuple[Asset, Decimal, Decimal]]) -> dict[int, Decimal]:
+    changes = defaultdict(Decimal)
+    for asset, quantity, _ in orders:
+        changes[asset.id] += quantity
+    return changes
+
+def apply_position_changes(
+    positions: dict[int, Decimal],
+    changes: dict[int, Decimal],
+    orders: list[tuple[Asset, Decimal, Decimal]]
+) -> dict[int, Decimal]:
+    # Orders are validated together on their net change per asset, so a batch
+    # either applies completely or not at all.
+    assets = {asset.id: asset for asset, _, _ in orders}
+    errors = []
+    for asset_id, change in changes.items():
+        available = positions.get(asset_id, Decimal(0))
+        if available + change < 0:
+            errors.append(f"Insufficient quantity of asset '{assets[asset_id].name}'. Available: {available}, Requested: {-change}")
+    if errors:
+        error_msg = "; ".join(errors)
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    new_positions = dict(positions)
+    for asset_id, change in changes.items():
+        new_positions[asset_id] = new_positions.get(asset_id, Decimal(0)) + change
+    return new_positions
+
+def _lock_portfolio(portfolio: Portfolio, expected_version: int = None) -> int:
+    # An update rather than select_for_update: it locks the row on every backend,
+    # and on SQLite, which ignores FOR UPDATE, it takes the write lock up front.
+    # Orders computed from positions read earlier pass the version they were read
+    # at, and are rejected if another trade has been recorded since. Returns the
+    # new version, which the trades and snapshots written under the lock record.
+    portfolios = Portfolio.objects.filter(pk=portfolio.pk)
+    if expected_version is not None:
+        portfolios = portfolios.filter(trade_version=expected_version)
+    if not portfolios.update(trade_version=F('trade_version') + 1):
+        error_msg = f"Positions of portfolio '{portfolio.name}' changed while the orders were computed, please retry"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    return get_portfolio_trade_versions([portfolio.id])[portfolio.id]
+
+def _write_snapshots(portfolio: Portfolio, date: date, positions: dict[int, Decimal], trade_version: int) -> None:
+    # Holdings are only written here, as new snapshots; existing ones never change.
+    Holding.objects.bulk_create([
+        Holding(portfolio=portfolio, asset_id=asset_id, date=date, quantity=quantity, trade_version=trade_version)
+        for asset_id, quantity in positions.items()
+    ])
+
+def run_with_retry(operation: Callable[[], T], description: str, max_attempts: int = None) -> T:
+    # Lock contention surfaces as OperationalError (a deadlock, or a busy or locked
+    # SQLite database) and rolls the transaction back, so the operation can run
+    # again. Inside an outer transaction the rollback is not ours to retry.
+    max_attempts = max_attempts or get_trade_max_attempts()
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with transaction.atomic():
+                return operation()
+        except OperationalError as e:
+            if transaction.get_connection().in_atomic_block:
+                raise
+            if attempt == max_attempts:
+                error_msg = f"Could not apply {description} after {max_attempts} attempts: {e}"
+                logger.error(error_msg)
+                raise ValueError(error_msg) from e
+            logger.warning(f"Retrying {description} after lock contention, attempt {attempt}: {e}")
+            time.sleep(TRADE_RETRY_DELAY * attempt * (1 + random.random()))
+
+def snapshot_holdings(portfolio: Portfolio, date: date) -> int:
+    logger.debug(f"Snapshotting holdings of portfolio '{portfolio.name}' on {date}")
+    asset_ids = set(get_asset_ids_traded_since_snapshot(portfolio, date))
+    if not asset_ids:
+        return 0
+
+    def write_snapshots() -> None:
+        # Locked like trades, so no trade lands between reading and writing positions,
+        # and the snapshots include every trade recorded so far.
+        trade_version = _lock_portfolio(portfolio)
+        positions = {asset_id: quantity for _, asset_id, quantity in get_holding_rows_until(portfolio, date)}
+        _write_snapshots(portfolio, date, {asset_id: positions[asset_id] for asset_id in asset_ids}, trade_version)
+
+    # A snapshot does not change any position, so nothing is propagated.
+    run_with_retry(write_snapshots, f"snapshots of portfolio '{portfolio.name}'")
+    logger.info(f"Snapshotted {len(asset_ids)} holdings of portfolio '{portfolio.name}' on {date}")
+    return len(asset_ids)
+
+def snapshot_all_holdings(date: date) -> int:
+    logger.debug(f"Snapshotting holdings of all portfolios on {date}")
+    snapshots = sum(snapshot_holdings(portfolio, date) for portfolio in Portfolio.objects.all())
+    logger.info(f"Snapshotted {snapshots} holdings on {date}")
+    return snapshots
@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+from django.db import transaction
+from portfolios.models import Portfolio, TradingDay
+from portfolios.selectors.trading_day_selector import get_trading_calendar_bounds
+from portfolios.services.metrics_cache_service import bump_portfolio_data_versions
+from portfolios.services.valuation_service import refresh_materialized_valuations
+import logging
+
+logger = logging.getLogger(__name__)
+
+def build_trading_calendar(start_date: date, end_date: date, holidays: list[date] = ()) -> int:
+    logger.debug(f"Building trading calendar from {start_date} to {end_date} with {len(holidays)} holidays")
+    if start_date > end_date:
+        error_msg = "Start date must be before or equal to end date"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+
+    excluded = set(holidays)
+    dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    trading_dates = [day for day in dates if day.weekday() < 5 and day not in excluded]
+
+    # The calendar gives the grid dates between its first and last day, so a range
+    # built apart from the existing calendar also changes the days in between.
+    refresh_start, refresh_end = start_date, end_date
+    calendar_bounds = get_trading_calendar_bounds()
+    if calendar_bounds is not None:
+        refresh_start, refresh_end = min(start_date, calendar_bounds[1]), max(end_date, calendar_bounds[0])
+
+    with transaction.atomic():
+        TradingDay.objects.filter(date__range=(start_date, end_date)).exclude(date__in=trading_dates).delete()
+        TradingDay.objects.bulk_create([TradingDay(date=day) for day in trading_dates], ignore_conflicts=True)
+    # Cached metrics and materialized valuations were computed on the previous
+    # grid dates, which only change within the refreshed range.
+    bump_portfolio_data_versions(list(Portfolio.objects.values_list('id', flat=True)))
+    refresh_materialized_valuations(refresh_start, refresh_end)
+    logger.info(f"Built trading calendar from {start_date} to {end_date}: {len(trading_dates)} trading days")
+    return len(trading_dates)
@@ -0,0 +1,247 @@
+import time
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+from typing import BinaryIO, Iterator
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from portfolios.models import Asset, Portfolio, Price, Weight, Holding
+from portfolios.selectors.holding_selector import get_holding_rows_until
+from portfolios.selectors.portfolio_selector import get_portfolio_trade_versions
+from portfolios.services.holding_service import propagate_holding_changes
+from portfolios.services.metrics_cache_service import bump_portfolio_data_versions
+from portfolios.services.price_service import propagate_price_changes, refresh_latest_prices
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARQUET = 'parquet'
+ARROW = 'arrow'
+TRANSFER_FORMATS = (PARQUET, ARROW)
+TRANSFER_CHUNK_SIZE = 100_000
+TRANSFER_CONFLICT_IGNORE = 'ignore'
+TRANSFER_CONFLICT_UPDATE = 'update'
+
+# Rows reference assets and portfolios by name so that files can be moved
+# between databases whose ids differ. The last column holds the value.
+TRANSFER_TABLES = {
+    'prices': (Price, ('asset', 'date', 'price')),
+    'weights': (Weight, ('portfolio', 'asset', 'date', 'weight')),
+    'holdings': (Holding, ('portfolio', 'asset', 'date', 'quantity')),
+}
+NAME_COLUMNS = ('portfolio', 'asset')
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        # A missing dependency of the server, not an error in the request.
+        error_msg = "Parquet and Arrow transfers require pyarrow, which is not installed on the server"
+        logger.error(error_msg)
+        raise ImproperlyConfigured(error_msg)
+    return pyarrow
+
+def _get_table(table: str) -> tuple[type, tuple[str, ...]]:
+    if table not in TRANSFER_TABLES:
+        error_msg = f"Unknown table '{table}'. Expected one of {', '.join(TRANSFER_TABLES)}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    return TRANSFER_TABLES[table]
+
+def _get_format(file_format: str) -> str:
+    if file_format not in TRANSFER_FORMATS:
+        error_msg = f"Unknown format '{file_format}'. Expected one of {', '.join(TRANSFER_FORMATS)}"
+        logger.error(error_msg)
+        raise ValueError(error_msg)
+    return file_format
+
+def _get_schema(pa, model: type, columns: tuple[str, ...]):
+    fields = []
+    for column in columns:
+        if column in NAME_COLUMNS:
+            fields.append(pa.field(column, pa.string(), nullable=False))
+        elif column == 'date':
+            fields.append(pa.field(column, pa.date32(), nullable=False))
+        else:
+            model_field = model._meta.get_field(column)
+            fields.append(pa.field(column, pa.decimal128(model_field.max_digits, model_field.decimal_places), nullable=False))
+    return pa.schema(fields)
+
+def _chunks(rows: Iterator[tuple], chunk_size: int) -> Iterator[list[tuple]]:
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+def _get_holding_export_rows() -> Iterator[tuple]:
+    # Holdings are snapshots and trades after them, so the ledger is replayed and
+    # the position at the close of each snapshot or trade date is exported as a
+    # snapshot. Imported holdings then give the same positions without the trades.
+    asset_names = dict(Asset.objects.values_list('id', 'name'))
+    for portfolio in Portfolio.objects.order_by('id'):
+        for row_date, asset_id, quantity in get_holding_rows_until(portfolio, date.max):
+            yield portfolio.name, asset_names[asset_id], row_date, quantity
+
+def _get_export_rows(table: str, model: type, columns: tuple[str, ...], chunk_size: int) -> Iterator[tuple]:
+    if table == 'holdings':
+        return _get_holding_export_rows()
+    lookups = [f"{column}__name" if column in NAME_COLUMNS else column for column in columns]
+    return model.objects.order_by('date', 'id').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+def export_table(table: str, file_format: str, destination: BinaryIO | str, chunk_size: int = TRANSFER_CHUNK_SIZE) -> int:
+    logger.debug(f"Exporting {table} as {file_format}")
+    pa = _import_pyarrow()
+    model, columns = _get_table(table)
+    schema = _get_schema(pa, model, columns)
+    rows = _get_export_rows(table, model, columns, chunk_size)
+
+    if _get_format(file_format) == PARQUET:
+        writer = pa.parquet.ParquetWriter(destination, schema)
+    else:
+        writer = pa.ipc.new_file(destination, schema)
+
+    exported = 0
+    with writer:
+        for chunk in _chunks(rows, chunk_size):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            exported += len(chunk)
+
+    logger.info(f"Exported {exported} {table} rows as {file_format}")
+    return exported
+
+def _read_batches(pa, file_format: str, source: BinaryIO | str, columns: tuple[str, ...], chunk_size: int) -> Iterator:
+    if _get_format(file_format) == PARQUET:
+        yield from pa.parquet.ParquetFile(source).iter_batches(batch_size=chunk_size, columns=list(columns))
+        return
+
+    reader = pa.ipc.open_file(source)
+    for index in range(reader.num_record_batches):
+        batch = reader.get_batch(index).select(list(columns))
+        for offset in range(0, batch.num_rows, chunk_size):
+            yield batch.slice(offset, chunk_size)
+
+def _resolve_asset_ids(names: set[str], asset_ids: dict[str, int]) -> None:
+    missing_names = names - asset_ids.keys()
+    if not missing_names:
+        return
+    # Assets are only a name, so the ones the target database lacks are created.
+    Asset.objects.bulk_create([Asset(name=name) for name in missing_names], ignore_conflicts=True)
+    asset_ids.update(Asset.objects.filter(name__in=missing_names).values_list('name', 'id'))
+
+def _resolve_portfolio_ids(names: set[str], portfolio_ids: dict[str, int | None]) -> None:
+    missing_names = names - portfolio_ids.keys()
+    if not missing_names:
+        return
+    portfolio_ids.update(dict.fromkeys(missing_names))
+    portfolio_ids.update(Portfolio.objects.filter(name__in=missing_names).values_list('name', 'id'))
+
+def _is_valid_value(table: str, value: Decimal | None) -> bool:
+    if value is None:
+        return False
+    if table == 'prices':
+        return value > 0
+    if table == 'weights':
+        return 0 < value <= 1
+    return value >= 0
+
+def _get_existing_keys(model: type, key_fields: list[str], objects: dict[tuple, object]) -> set[tuple]:
+    if not objects:
+        return set()
+    lookups = [f"{field}_id" if field in NAME_COLUMNS else field for field in key_fields]
+    filters = {
+        f"{lookup}__in": list({key[position] for key in objects})
+        for position, lookup in enumerate(lookups)
+    }
+    return set(model.objects.filter(**filters).values_list(*lookups)) & objects.keys()
+
+def import_table(
+    table: str,
+    file_format: str,
+    source: BinaryIO | str,
+    on_conflict: str = TRANSFER_CONFLICT_IGNORE,
+    chunk_size: int = TRANSFER_CHUNK_SIZE
+) -> dict:
+    logger.debug(f"Importing {table} from {file_format}, on conflict {on_conflict}")
+    started_at = time.perf_counter()
+    pa = _import_pyarrow()
+    model, columns = _get_table(table)
+    value_column = columns[-1]
+    key_fields = [column for column in columns if column != value_column]
+    # Imported holdings are set directly, so they include every trade up to their
+    # date recorded so far.
+    version_fields = ['trade_version'] if table == 'holdings' else []
+    conflict_options = (
+        {'update_conflicts': True, 'unique_fields': key_fields, 'update_fields': [value_column, *version_fields, 'updated_at']}
+        if on_conflict == TRANSFER_CONFLICT_UPDATE
+        else {'ignore_conflicts': True}
+    )
+
+    asset_ids, portfolio_ids, trade_versions = {}, {}, {}
+    start_dates = defaultdict(lambda: date.max)
+    received = written = rejected = 0
+    with transaction.atomic():
+        for batch in _read_batches(pa, file_format, source, columns, chunk_size):
+            data = batch.to_pydict()
+            received += batch.num_rows
+            _resolve_asset_ids(set(data['asset']) - {None}, asset_ids)
+            if 'portfolio' in data:
+                _resolve_portfolio_ids(set(data['portfolio']) - {None}, portfolio_ids)
+            if version_fields:
+                missing_ids = set(portfolio_ids.values()) - trade_versions.keys() - {None}
+                trade_versions.update(get_portfolio_trade_versions(list(missing_ids)))
+
+            objects = {}
+            for row in zip(*(data[column] for column in columns)):
+                values = dict(zip(columns, row))
+                fields = {
+                    'asset_id': asset_ids.get(values['asset']),
+                    'date': values['date'],
+                    value_column: values[value_column]
+                }
+                if 'portfolio' in values:
+                    fields['portfolio_id'] = portfolio_ids.get(values['portfolio'])
+                if None in fields.values() or not _is_valid_value(table, fields[value_column]):
+                    rejected += 1
+                    continue
+                key = tuple(fields[f"{column}_id" if column in NAME_COLUMNS else column] for column in key_fields)
+                if version_fields:
+                    fields['trade_version'] = trade_versions[fields['portfolio_id']]
+                objects[key] = model(**fields)
+
+            if on_conflict != TRANSFER_CONFLICT_UPDATE:
+                # Rows already in the table are skipped, so they are neither
+                # written nor propagated.
+                for key in _get_existing_keys(model, key_fields, objects):
+                    del objects[key]
+            model.objects.bulk_create(objects.values(), batch_size=chunk_size, **conflict_options)
+            written += len(objects)
+            for obj in objects.values():
+                owner_id = obj.asset_id if table == 'prices' else obj.portfolio_id
+                start_dates[owner_id] = min(start_dates[owner_id], obj.date)
+
+    _propagate_import(table, start_dates)
+    elapsed = time.perf_counter() - started_at
+    result = {
+        "received": received,
+        "written": written,
+        "rejected": rejected,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": received / elapsed if elapsed else 0.0
+    }
+    logger.info(f"Imported {written} of {received} {table} rows, {rejected} rejected, {result['rows_per_second']:.0f} rows/s")
+    return result
+
+def _propagate_import(table: str, start_dates: dict[int, date]) -> None:
+    if not start_dates:
+        return
+    if table == 'prices':
+        refresh_latest_prices(list(start_dates))
+        propagate_price_changes(list(start_dates), min(start_dates.values()))
+    elif table == 'holdings':
+        for portfolio in Portfolio.objects.filter(id__in=list(start_dates)):
+            propagate_holding_changes(portfolio, start_dates[portfolio.id])
+    else:
+        bump_portfolio_data_versions(list(start_dates))
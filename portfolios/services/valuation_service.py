@@ -0,0 +1,71 @@
+from datetime import date
+from math import isnan
+from django.db import transaction
+from portfolios.models import Portfolio, PortfolioValuation
+from portfolios.selectors.holding_selector import get_first_portfolio_holding
+from portfolios.selectors.portfolio_selector import get_portfolio_by_id
+from portfolios.selectors.valuation_selector import (
+    has_portfolio_valuations,
+    get_materialized_portfolio_ids,
+    get_materialized_portfolio_ids_holding_assets
+)
+from portfolios.services.metrics_service import compute_portfolio_series
+import logging
+
+logger = logging.getLogger(__name__)
+
+def refresh_portfolio_valuations(portfolio: Portfolio, start_date: date, end_date: date = None) -> int:
+    logger.debug(f"Refreshing valuations for portfolio '{portfolio.name}' from {start_date} to {end_date}")
+    first_holding = get_first_portfolio_holding(portfolio)
+    if first_holding is None:
+        PortfolioValuation.objects.filter(portfolio=portfolio).delete()
+        logger.info(f"Cleared valuations for portfolio '{portfolio.name}' without holdings")
+        return 0
+
+    # A portfolio is either not materialized at all or materialized over its whole
+    # history, so the first refresh always covers every date since the first holding.
+    if not has_portfolio_valuations(portfolio):
+        start_date, end_date = first_holding.date, None
+
+    start_date = max(start_date, first_holding.date)
+    end_date = end_date or date.max
+
+    date_ordinals, totals, weights, asset_ids = compute_portfolio_series(portfolio, start_date, end_date)
+    valuations = [
+        PortfolioValuation(
+            portfolio=portfolio,
+            date=date.fromordinal(ordinal),
+            total_value=total_value,
+            weights={
+                str(asset_id): weight
+                for asset_id, weight in zip(asset_ids, row_weights)
+                if not isnan(weight)
+            }
+        )
+        for ordinal, total_value, row_weights in zip(date_ordinals.tolist(), totals.tolist(), weights.tolist())
+    ]
+
+    with transaction.atomic():
+        PortfolioValuation.objects.filter(portfolio=portfolio, date__range=(start_date, end_date)).delete()
+        PortfolioValuation.objects.bulk_create(valuations)
+
+    logger.info(f"Refreshed {len(valuations)} valuations for portfolio '{portfolio.name}' from {start_date}")
+    return len(valuations)
+
+def refresh_valuations_for_assets(asset_ids: list[int], start_date: date, end_date: date = None) -> int:
+    logger.debug(f"Refreshing valuations for assets {asset_ids} from {start_date} to {end_date}")
+    refreshed = 0
+    for portfolio_id in get_materialized_portfolio_ids_holding_assets(asset_ids):
+        portfolio = get_portfolio_by_id(portfolio_id)
+        refreshed += refresh_portfolio_valuations(portfolio, start_date, end_date)
+    logger.info(f"Refreshed {refreshed} valuations for assets {asset_ids}")
+    return refreshed
+
+def refresh_materialized_valuations(start_date: date, end_date: date = None) -> int:
+    logger.debug(f"Refreshing valuations of all materialized portfolios from {start_date} to {end_date}")
+    refreshed = 0
+    for portfolio_id in get_materialized_portfolio_ids():
+        portfolio = get_portfolio_by_id(portfolio_id)
+        refreshed += refresh_portfolio_valuations(portfolio, start_date, end_date)
+    logger.info(f"Refreshed {refreshed} valuations of materialized portfolios")
+    return refreshed
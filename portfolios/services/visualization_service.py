@@ -4,6 +4,7 @@ from portfolios.services.metrics_service import get_portfolio_metrics
 from collections import defaultdict
 from datetime import date
 from portfolios.models import Portfolio
+from portfolios.services.metrics_engine import DAILY
 import logging
 
 logger = logging.getLogger(__name__)
@@ -146,9 +147,9 @@ def create_metrics_plot(formatted_data: dict) -> go.Figure:
     logger.info("Created metrics plot successfully")
     return fig
 
-def get_portfolio_metrics_plot(portfolio_id: int, start_date: date, end_date: date) -> str:
-    logger.debug(f"Getting portfolio metrics plot for portfolio {portfolio_id} from {start_date} to {end_date}")
-    metrics = get_portfolio_metrics(portfolio_id, start_date, end_date)
+def get_portfolio_metrics_plot(portfolio_id: int, start_date: date, end_date: date, resolution: str | int = DAILY) -> str:
+    logger.debug(f"Getting portfolio metrics plot for portfolio {portfolio_id} from {start_date} to {end_date} at resolution {resolution}")
+    metrics = get_portfolio_metrics(portfolio_id, start_date, end_date, resolution)
     formatted_data = format_metrics_for_plotting(metrics)
     fig = create_metrics_plot(formatted_data)
     logger.info(f"Generated portfolio metrics plot for portfolio {portfolio_id}")
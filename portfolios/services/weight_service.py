@@ -3,11 +3,12 @@ from django.db import transaction
 from django.db.models import Q
 from portfolios.models import Weight, Portfolio, Asset
 from datetime import datetime, date
+from portfolios.services.metrics_cache_service import bump_portfolio_data_versions
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_weight(portfolio: Portfolio, asset: Asset, date: date, weight: float) -> Weight:
+def create_weight(portfolio: Portfolio, asset: Asset, date: date, weight: float, propagate: bool = True) -> Weight:
     logger.debug(f"Creating weight for portfolio '{portfolio.name}', asset '{asset.name}' on {date}")
     if not 0 <= weight <= 1:
         error_msg = "Weight must be between 0 and 1"
@@ -21,4 +22,6 @@ def create_weight(portfolio: Portfolio, asset: Asset, date: date, weight: float)
     
     weight_obj = Weight.objects.create(portfolio=portfolio, asset=asset, date=date, weight=weight)
     logger.info(f"Created weight: {weight_obj}")
+    if propagate:
+        bump_portfolio_data_versions([portfolio.id])
     return weight_obj
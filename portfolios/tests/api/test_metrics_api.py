@@ -1,8 +1,11 @@
+import json
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
-from portfolios.tests.factories import PortfolioFactory
-from datetime import datetime, timedelta
+from portfolios.tests.factories import PortfolioFactory, AssetFactory, PriceFactory, HoldingFactory
+from datetime import date, datetime, timedelta
+
+METRICS_QUERY_BUDGET = 8
 
 
 class MetricsAPITests(APITestCase):
@@ -39,3 +42,173 @@ class MetricsAPITests(APITestCase):
             }
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_portfolio_metrics_query_budget(self):
+        portfolio = PortfolioFactory()
+        reference_date = date(2022, 2, 15)
+        for index in range(5):
+            asset = AssetFactory()
+            HoldingFactory(portfolio=portfolio, asset=asset, date=reference_date, quantity=10 + index)
+            for day in range(60):
+                PriceFactory(asset=asset, date=reference_date + timedelta(days=day), price=100 + day)
+
+        url = reverse('portfolio-metrics', args=[portfolio.id])
+        for days in (3, 60):
+            with self.assertNumQueries(METRICS_QUERY_BUDGET):
+                response = self.client.get(
+                    url,
+                    {
+                        'start_date': reference_date,
+                        'end_date': reference_date + timedelta(days=days - 1)
+                    }
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['count'], days)
+
+    def test_get_portfolio_metrics_page(self):
+        portfolio = PortfolioFactory()
+        asset = AssetFactory()
+        reference_date = date(2022, 2, 15)
+        HoldingFactory(portfolio=portfolio, asset=asset, date=reference_date, quantity=10)
+        for day in range(30):
+            PriceFactory(asset=asset, date=reference_date + timedelta(days=day), price=100 + day)
+
+        response = self.client.get(
+            reverse('portfolio-metrics', args=[portfolio.id]),
+            {
+                'start_date': reference_date,
+                'end_date': reference_date + timedelta(days=29),
+                'offset': 10,
+                'limit': 5
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 30)
+        self.assertEqual(
+            [result['date'] for result in response.data['results']],
+            [(reference_date + timedelta(days=day)).isoformat() for day in range(10, 15)]
+        )
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_get_portfolio_metrics_at_resolution(self):
+        portfolio = PortfolioFactory()
+        asset = AssetFactory()
+        reference_date = date(2022, 1, 3)
+        HoldingFactory(portfolio=portfolio, asset=asset, date=reference_date, quantity=10)
+        for day in range(60):
+            PriceFactory(asset=asset, date=reference_date + timedelta(days=day), price=100 + day)
+
+        url = reverse('portfolio-metrics', args=[portfolio.id])
+        params = {'start_date': reference_date, 'end_date': reference_date + timedelta(days=59)}
+        response = self.client.get(url, {**params, 'resolution': 'monthly'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'][0]['date'], '2022-01-31')
+
+        response = self.client.get(url, {**params, 'resolution': '20'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 20)
+
+        for resolution in ('hourly', '2'):
+            response = self.client.get(url, {**params, 'resolution': resolution})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_portfolio_risk(self):
+        asset = AssetFactory()
+        reference_date = date(2022, 2, 15)
+        HoldingFactory(portfolio=self.portfolio, asset=asset, date=reference_date, quantity=10)
+        for day, price in enumerate([100, 110, 99, 120]):
+            PriceFactory(asset=asset, date=reference_date + timedelta(days=day), price=price)
+
+        response = self.client.get(
+            reverse('portfolio-risk', args=[self.portfolio.id]),
+            {
+                'start_date': reference_date,
+                'end_date': reference_date + timedelta(days=3),
+                'windows': [2]
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(response.data['summary']['max_drawdown'], -0.1)
+        self.assertEqual(len(response.data['series']), 4)
+        self.assertIn('2', response.data['series'][3]['volatility'])
+
+    def test_get_portfolio_risk_not_found(self):
+        response = self.client.get(
+            reverse('portfolio-risk', args=[999999]),
+            {'start_date': self.start_date, 'end_date': self.end_date}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_batch_portfolio_metrics(self):
+        other_portfolio = PortfolioFactory()
+        asset = AssetFactory()
+        reference_date = date(2022, 2, 15)
+        for portfolio in (self.portfolio, other_portfolio):
+            HoldingFactory(portfolio=portfolio, asset=asset, date=reference_date, quantity=10)
+        PriceFactory(asset=asset, date=reference_date, price=100)
+
+        response = self.client.get(
+            reverse('portfolio-batch-metrics'),
+            {
+                'portfolio_ids': [self.portfolio.id, other_portfolio.id],
+                'start_date': reference_date,
+                'end_date': reference_date
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['portfolio_id'] for result in response.data['results']],
+            [self.portfolio.id, other_portfolio.id]
+        )
+        self.assertEqual(response.data['results'][1]['metrics'][0]['total_value'], '1000.00')
+
+    def test_get_batch_portfolio_metrics_unknown_portfolio(self):
+        response = self.client.get(
+            reverse('portfolio-batch-metrics'),
+            {
+                'portfolio_ids': [self.portfolio.id, 999999],
+                'start_date': self.start_date,
+                'end_date': self.end_date
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stream_portfolio_metrics(self):
+        portfolio = PortfolioFactory()
+        asset = AssetFactory(name="Streamed Asset")
+        reference_date = date(2022, 2, 15)
+        HoldingFactory(portfolio=portfolio, asset=asset, date=reference_date, quantity=10)
+        for day in range(200):
+            PriceFactory(asset=asset, date=reference_date + timedelta(days=day), price=100)
+
+        url = reverse('portfolio-metrics', args=[portfolio.id])
+        params = {
+            'start_date': reference_date,
+            'end_date': reference_date + timedelta(days=199)
+        }
+
+        response = self.client.get(url, {**params, 'stream': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 200)
+        self.assertEqual(rows[0], {'date': '2022-02-15', 'total_value': 1000.0, 'weights': {'Streamed Asset': 1.0}})
+
+        response = self.client.get(url, {**params, 'stream': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'date,total_value,Streamed Asset')
+        self.assertEqual(lines[1], '2022-02-15,1000.0,1.0')
+        self.assertEqual(len(lines), 201)
+
+    def test_stream_portfolio_metrics_before_reference_date(self):
+        portfolio = PortfolioFactory()
+        HoldingFactory(portfolio=portfolio, date=date(2022, 2, 15))
+        response = self.client.get(
+            reverse('portfolio-metrics', args=[portfolio.id]),
+            {'start_date': date(2022, 2, 1), 'end_date': date(2022, 3, 1), 'stream': 'ndjson'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
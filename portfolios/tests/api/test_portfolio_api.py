@@ -1,8 +1,9 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
-from portfolios.tests.factories import PortfolioFactory, AssetFactory, HoldingFactory
-from datetime import datetime
+from portfolios.models import Trade
+from portfolios.tests.factories import PortfolioFactory, AssetFactory, HoldingFactory, PriceFactory
+from datetime import date, datetime
 
 
 class PortfolioAPITests(APITestCase):
@@ -72,3 +73,98 @@ class PortfolioAPITests(APITestCase):
         }
         response = self.client.post(self.rebalance_url, data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PortfolioHoldingsAPITests(APITestCase):
+    def setUp(self):
+        self.portfolio = PortfolioFactory()
+        self.asset = AssetFactory()
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=date(2022, 2, 15), quantity=10)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=date(2022, 3, 15), quantity=12)
+        self.holdings_url = reverse('portfolio-holdings', args=[self.portfolio.id])
+
+    def test_get_portfolio_holdings_returns_current_positions(self):
+        response = self.client.get(self.holdings_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['quantity'], '12.0000')
+        self.assertEqual(response.data['results'][0]['date'], '2022-03-15')
+
+    def test_get_portfolio_holdings_as_of(self):
+        response = self.client.get(self.holdings_url, {'as_of': '2022-03-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['quantity'], '10.0000')
+
+        response = self.client.get(self.holdings_url, {'as_of': '2022-02-01'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_get_portfolio_holdings_invalid_as_of(self):
+        response = self.client.get(self.holdings_url, {'as_of': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PortfolioTargetRebalanceAPITests(APITestCase):
+    def setUp(self):
+        self.portfolio = PortfolioFactory()
+        self.asset = AssetFactory()
+        self.other_asset = AssetFactory()
+        PriceFactory(asset=self.asset, date=date(2022, 3, 15), price=100)
+        PriceFactory(asset=self.other_asset, date=date(2022, 3, 15), price=50)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=date(2022, 2, 15), quantity=10)
+        self.url = reverse('portfolio-rebalance-targets', args=[self.portfolio.id])
+
+    def test_rebalance_to_target_weights(self):
+        response = self.client.post(
+            self.url,
+            {
+                'date': '2022-03-15',
+                'weights': [
+                    {'asset_id': self.asset.id, 'weight': '0.25'},
+                    {'asset_id': self.other_asset.id, 'weight': '0.75'}
+                ]
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_value'], '1000.00')
+        self.assertEqual(
+            [(trade['side'], trade['quantity']) for trade in response.data['trades']],
+            [('sell', '7.5000'), ('buy', '15.0000')]
+        )
+        self.assertEqual([weight['weight'] for weight in response.data['weights']], ['0.250000', '0.750000'])
+        self.assertEqual(Trade.objects.count(), 2)
+
+    def test_rebalance_without_stored_weights(self):
+        response = self.client.post(self.url, {'date': '2022-03-15'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebalance_invalid_weights(self):
+        response = self.client.post(
+            self.url,
+            {'weights': [{'asset_id': self.asset.id, 'weight': '0.5'}, {'asset_id': self.asset.id, 'weight': '0.5'}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebalance_unknown_asset(self):
+        response = self.client.post(
+            self.url,
+            {'date': '2022-03-15', 'weights': [{'asset_id': 999, 'weight': '1'}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebalance_dry_run(self):
+        response = self.client.post(
+            self.url,
+            {
+                'date': '2022-03-15',
+                'weights': [{'asset_id': self.other_asset.id, 'weight': '1'}],
+                'dry_run': True
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['dry_run'])
+        self.assertEqual(len(response.data['trades']), 2)
+        self.assertFalse(Trade.objects.exists())
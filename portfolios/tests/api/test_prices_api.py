@@ -0,0 +1,40 @@
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.urls import reverse
+from django.utils import timezone
+from portfolios.models import Price
+from portfolios.tests.factories import AssetFactory
+
+
+class PricesAPITests(APITestCase):
+    def setUp(self):
+        self.asset = AssetFactory(name="Bulk Asset")
+        self.url = reverse('bulk-prices')
+        self.date = timezone.now().date()
+
+    def test_bulk_create_prices(self):
+        response = self.client.post(
+            self.url,
+            {
+                'prices': [
+                    {'asset': self.asset.name, 'date': self.date.isoformat(), 'price': '10.50'},
+                    {'asset': 'Unknown Asset', 'date': self.date.isoformat(), 'price': '10.50'}
+                ]
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['written'], 1)
+        self.assertEqual(response.data['rejected'][0]['index'], 1)
+        self.assertTrue(Price.objects.filter(asset=self.asset, date=self.date).exists())
+
+    def test_bulk_create_prices_invalid_conflict_mode(self):
+        response = self.client.post(
+            self.url,
+            {
+                'prices': [{'asset': self.asset.name, 'date': self.date.isoformat(), 'price': '10.50'}],
+                'on_conflict': 'replace'
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
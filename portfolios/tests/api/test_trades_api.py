@@ -0,0 +1,65 @@
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.urls import reverse
+from django.utils import timezone
+from portfolios.models import Trade
+from portfolios.tests.factories import PortfolioFactory, AssetFactory, PriceFactory, HoldingFactory
+
+
+class TradesAPITests(APITestCase):
+    def setUp(self):
+        self.portfolio = PortfolioFactory()
+        self.asset = AssetFactory(name="Sold Asset")
+        self.other_asset = AssetFactory(name="Bought Asset")
+        self.date = timezone.now().date()
+        PriceFactory(asset=self.asset, date=self.date, price=100)
+        PriceFactory(asset=self.other_asset, date=self.date, price=50)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.date - timezone.timedelta(days=1), quantity=10)
+        self.url = reverse('portfolio-trades', args=[self.portfolio.id])
+
+    def test_execute_batch_trades(self):
+        response = self.client.post(
+            self.url,
+            {
+                'date': self.date.isoformat(),
+                'orders': [
+                    {'asset_id': self.asset.id, 'side': 'sell', 'amount': '500.00'},
+                    {'asset_id': self.other_asset.id, 'side': 'buy', 'amount': '500.00'}
+                ]
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['trades']), 2)
+        self.assertEqual(response.data['trades'][1]['quantity'], '10.0000')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_execute_batch_trades_insufficient_quantity(self):
+        response = self.client.post(
+            self.url,
+            {'orders': [{'asset_id': self.asset.id, 'side': 'sell', 'amount': '5000.00'}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Trade.objects.exists())
+
+    def test_execute_batch_trades_invalid_orders(self):
+        response = self.client.post(self.url, {'orders': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            self.url,
+            {'orders': [{'asset_id': self.asset.id, 'side': 'hold', 'amount': '1.00'}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_execute_batch_trades_unknown_asset(self):
+        response = self.client.post(
+            self.url,
+            {'orders': [{'asset_id': 999, 'side': 'buy', 'amount': '1.00'}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,46 @@
+import importlib.util
+import sys
+from unittest import mock, skipUnless
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.urls import reverse
+from datetime import date
+from portfolios.models import Price
+from portfolios.tests.factories import AssetFactory, PriceFactory
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+@skipUnless(HAS_PYARROW, "pyarrow is not installed")
+class TransferAPITests(APITestCase):
+    def setUp(self):
+        self.asset = AssetFactory(name="Exported Asset")
+        PriceFactory(asset=self.asset, date=date(2022, 2, 15), price=10.50)
+
+    def test_export_and_import_prices(self):
+        response = self.client.get(reverse('data-export', args=['prices']), {'file_format': 'arrow'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b''.join(response.streaming_content)
+
+        Price.objects.all().delete()
+        response = self.client.post(
+            reverse('data-import', args=['prices']),
+            {'file': SimpleUploadedFile('prices.arrow', content), 'file_format': 'arrow'},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['written'], 1)
+        self.assertTrue(Price.objects.filter(asset=self.asset, date=date(2022, 2, 15)).exists())
+
+    def test_export_unknown_table(self):
+        response = self.client.get(reverse('data-export', args=['portfolios']))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TransferWithoutPyarrowAPITests(APITestCase):
+    def test_export_without_pyarrow_is_a_server_error(self):
+        with mock.patch.dict(sys.modules, {'pyarrow': None, 'pyarrow.ipc': None, 'pyarrow.parquet': None}):
+            response = self.client.get(reverse('data-export', args=['prices']), {'file_format': 'arrow'})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn('pyarrow', response.data['error'])
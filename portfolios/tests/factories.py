@@ -4,6 +4,7 @@ from portfolios.models import (
     Portfolio,
     Asset,
     Price,
+    LatestPrice,
     Weight,
     Holding
 )
@@ -31,6 +32,13 @@ class PriceFactory(factory.django.DjangoModelFactory):
     date = factory.LazyFunction(timezone.now)
     price = factory.Faker('pydecimal', left_digits=5, right_digits=2, positive=True)
 
+class LatestPriceFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = LatestPrice
+
+    price = factory.SubFactory(PriceFactory)
+    asset = factory.SelfAttribute('price.asset')
+
 class WeightFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = Weight
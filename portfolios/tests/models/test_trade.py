@@ -0,0 +1,45 @@
+from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from datetime import timedelta
+from portfolios.models import Portfolio, Asset, Trade
+
+class TradeTests(TestCase):
+    def setUp(self):
+        self.portfolio = Portfolio.objects.create(name="Test Portfolio")
+        self.asset = Asset.objects.create(name="Test Asset")
+
+    def test_trade_date_cannot_be_in_future(self):
+        trade = Trade(
+            portfolio=self.portfolio,
+            asset=self.asset,
+            date=timezone.now().date() + timedelta(days=1),
+            quantity=10,
+            price=100
+        )
+        with self.assertRaises(ValidationError) as context:
+            trade.full_clean()
+        self.assertIn("Trade date cannot be in the future", str(context.exception))
+
+    def test_trade_quantity_cannot_be_zero(self):
+        trade = Trade(
+            portfolio=self.portfolio,
+            asset=self.asset,
+            date=timezone.now().date(),
+            quantity=0,
+            price=100
+        )
+        with self.assertRaises(ValidationError):
+            trade.full_clean()
+
+    def test_trade_cannot_be_changed(self):
+        trade = Trade.objects.create(
+            portfolio=self.portfolio,
+            asset=self.asset,
+            date=timezone.now().date(),
+            quantity=-10,
+            price=100
+        )
+        trade.price = 101
+        with self.assertRaises(ValueError):
+            trade.save()
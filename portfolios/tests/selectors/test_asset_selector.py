@@ -2,7 +2,8 @@ from django.test import TestCase
 from django.core.exceptions import ObjectDoesNotExist
 from portfolios.selectors.asset_selector import (
     get_asset_by_id,
-    get_asset_by_name
+    get_asset_by_name,
+    get_asset_names_by_ids
 )
 from portfolios.tests.factories import AssetFactory
 
@@ -26,3 +27,8 @@ class AssetSelectorTests(TestCase):
     def test_get_asset_by_name_not_found(self):
         with self.assertRaises(ObjectDoesNotExist):
             get_asset_by_name("Non Existent Asset")
+
+    def test_get_asset_names_by_ids(self):
+        other_asset = AssetFactory(name="Other Asset")
+        asset_names = get_asset_names_by_ids([self.asset.id, other_asset.id, 999])
+        self.assertEqual(asset_names, {self.asset.id: "Test Asset", other_asset.id: "Other Asset"})
@@ -1,5 +1,7 @@
 from django.test import TestCase
 from django.utils import timezone
+from decimal import Decimal
+from portfolios.models import Trade
 from portfolios.selectors.holding_selector import (
     get_holdings_by_date,
     get_asset_latest_holding_before_date,
@@ -75,8 +77,25 @@ class HoldingSelectorTests(TestCase):
         self.assertIsNone(holding)
 
     def test_get_latest_portfolio_holdings(self):
-        holdings = get_latest_portfolio_holdings(self.portfolio)
-        self.assertEqual(len(holdings), 3)
-        self.assertIn(self.holding1, holdings)
-        self.assertIn(self.holding2, holdings)
-        self.assertIn(self.holding3, holdings)
+        other_asset = AssetFactory(name="Other Asset")
+        other_holding = HoldingFactory(portfolio=self.portfolio, asset=other_asset, date=self.date1, quantity=5)
+        HoldingFactory(portfolio=self.portfolio, asset=other_asset, date=self.date2, quantity=0)
+
+        holdings = list(get_latest_portfolio_holdings(self.portfolio))
+        self.assertEqual(holdings, [self.holding3])
+        self.assertEqual(holdings[0].position, Decimal("110.50"))
+
+        holdings = list(get_latest_portfolio_holdings(self.portfolio, as_of=self.date1))
+        self.assertEqual(holdings, [other_holding, self.holding1])
+
+    def test_get_latest_portfolio_holdings_adds_later_trades(self):
+        self.holding3.delete()
+        Trade.objects.create(portfolio=self.portfolio, asset=self.asset, date=self.date3, quantity=3, price=10)
+
+        with self.assertNumQueries(1):
+            holdings = list(get_latest_portfolio_holdings(self.portfolio, as_of=self.date2))
+        self.assertEqual(holdings, [self.holding2])
+        self.assertEqual(holdings[0].position, Decimal("105.50"))
+
+        holdings = list(get_latest_portfolio_holdings(self.portfolio))
+        self.assertEqual(holdings[0].position, Decimal("108.50"))
@@ -1,16 +1,19 @@
 from django.test import TestCase
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
+from datetime import timedelta
 from portfolios.selectors.portfolio_selector import (
     get_portfolio_by_id,
     get_portfolio_by_name,
-    get_portfolio_assets
+    get_portfolio_assets,
+    count_portfolio_assets
 )
 from portfolios.tests.factories import (
     PortfolioFactory,
     AssetFactory,
     HoldingFactory,
-    PriceFactory
+    PriceFactory,
+    LatestPriceFactory
 )
 
 
@@ -32,6 +35,7 @@ class PortfolioSelectorTests(TestCase):
             date=self.date,
             price=10.00
         )
+        LatestPriceFactory(price=self.price)
 
     def test_get_portfolio_by_id(self):
         portfolio = get_portfolio_by_id(self.portfolio.id)
@@ -77,3 +81,26 @@ class PortfolioSelectorTests(TestCase):
         assets_data, latest_date = get_portfolio_assets(portfolio.id)
         self.assertEqual(len(assets_data), 0)
         self.assertIsNone(latest_date)
+
+    def test_get_portfolio_assets_uses_current_positions(self):
+        other_asset = AssetFactory(name="Sold Asset")
+        for day in range(1, 20):
+            HoldingFactory(
+                portfolio=self.portfolio,
+                asset=self.asset,
+                date=self.date - timedelta(days=day),
+                quantity=day
+            )
+            PriceFactory(asset=self.asset, date=self.date - timedelta(days=day), price=day)
+        HoldingFactory(portfolio=self.portfolio, asset=other_asset, date=self.date - timedelta(days=5), quantity=10)
+        HoldingFactory(portfolio=self.portfolio, asset=other_asset, date=self.date, quantity=0)
+        LatestPriceFactory(price=PriceFactory(asset=other_asset, date=self.date, price=5.00))
+
+        with self.assertNumQueries(2):
+            assets_data, latest_date = get_portfolio_assets(self.portfolio.id)
+
+        self.assertEqual(len(assets_data), 1)
+        self.assertEqual(assets_data[0]["quantity"], self.holding.quantity)
+        self.assertEqual(assets_data[0]["price"], self.price.price)
+        self.assertEqual(latest_date, self.date)
+        self.assertEqual(count_portfolio_assets(self.portfolio.id), 1)
@@ -4,11 +4,13 @@ from django.core.exceptions import ObjectDoesNotExist
 from portfolios.selectors.price_selector import (
     get_prices_by_date_range,
     get_latest_price,
+    get_latest_prices,
     get_price_by_date
 )
 from portfolios.tests.factories import (
     AssetFactory,
-    PriceFactory
+    PriceFactory,
+    LatestPriceFactory
 )
 
 
@@ -34,6 +36,7 @@ class PriceSelectorTests(TestCase):
             date=self.date3,
             price=110.50
         )
+        LatestPriceFactory(price=self.price3)
 
     def test_get_price_by_date(self):
         price = get_price_by_date(self.asset.id, self.date1)
@@ -55,6 +58,16 @@ class PriceSelectorTests(TestCase):
         with self.assertRaises(ObjectDoesNotExist):
             get_latest_price(asset)
 
+    def test_get_latest_prices(self):
+        other_asset = AssetFactory(name="Other Asset")
+        other_price = PriceFactory(asset=other_asset, date=self.date1, price=50.00)
+        LatestPriceFactory(price=other_price)
+        asset_without_price = AssetFactory(name="Asset Without Price")
+
+        with self.assertNumQueries(1):
+            prices = get_latest_prices([self.asset.id, other_asset.id, asset_without_price.id])
+        self.assertEqual(prices, {self.asset.id: self.price3, other_asset.id: other_price})
+
     def test_get_prices_by_date_range(self):
         prices = get_prices_by_date_range(
             [self.asset.id],
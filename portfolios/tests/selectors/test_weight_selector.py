@@ -1,8 +1,11 @@
+from decimal import Decimal
 from django.test import TestCase
 from django.utils import timezone
+from portfolios.models import Weight
 from portfolios.selectors.weight_selector import (
     get_portfolio_weights_by_date,
-    get_latest_portfolio_weights
+    get_latest_portfolio_weights,
+    get_target_weights
 )
 from portfolios.tests.factories import (
     PortfolioFactory,
@@ -56,3 +59,19 @@ class WeightSelectorTests(TestCase):
         self.assertIn(self.weight1, weights)
         self.assertIn(self.weight2, weights)
         self.assertIn(self.weight3, weights)
+
+    def test_get_target_weights(self):
+        other_asset = AssetFactory(name="Other Asset")
+        WeightFactory(portfolio=self.portfolio, asset=other_asset, date=self.date2, weight=0.4)
+
+        self.assertEqual(get_target_weights(self.portfolio, self.date2), {
+            self.asset.id: Decimal("0.6"),
+            other_asset.id: Decimal("0.4"),
+        })
+        self.assertEqual(get_target_weights(self.portfolio, self.date3 + timezone.timedelta(days=5)), {
+            self.asset.id: Decimal("0.7"),
+        })
+
+    def test_get_target_weights_not_found(self):
+        with self.assertRaises(Weight.DoesNotExist):
+            get_target_weights(self.portfolio, self.date1 - timezone.timedelta(days=1))
@@ -0,0 +1,77 @@
+from django.test import TestCase
+from datetime import date
+from portfolios.services.backtest_service import run_backtests
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory,
+    WeightFactory
+)
+
+
+class BacktestServiceTests(TestCase):
+    def setUp(self):
+        self.portfolio = PortfolioFactory(name="Test Portfolio", initial_value=1000)
+        self.asset = AssetFactory(name="Flat Asset")
+        self.other_asset = AssetFactory(name="Rising Asset")
+        self.dates = [date(2022, 1, 30), date(2022, 1, 31), date(2022, 2, 1), date(2022, 2, 2)]
+        for day, other_price in zip(self.dates, (10, 20, 20, 20)):
+            PriceFactory(asset=self.asset, date=day, price=100)
+            PriceFactory(asset=self.other_asset, date=day, price=other_price)
+        for asset in (self.asset, self.other_asset):
+            WeightFactory(portfolio=self.portfolio, asset=asset, date=date(2022, 1, 1), weight=0.5)
+
+    def test_monthly_backtest(self):
+        result = run_backtests([self.portfolio.id], ['monthly'], self.dates[0], self.dates[-1], workers=1)[0]
+
+        self.assertEqual([point["total_value"] for point in result["series"]], [1000, 1500, 1500, 1500])
+        self.assertEqual(result["final_value"], 1500)
+        self.assertAlmostEqual(result["total_return"], 0.5)
+        # February rebalances 500 back from the rising asset, a sixth of the value traded each way
+        self.assertAlmostEqual(result["turnover"], 1 / 6)
+        self.assertEqual(result["rebalances"], 2)
+        self.assertEqual(
+            [(trade["date"], trade["asset_id"], trade["side"]) for trade in result["trades"][2:]],
+            [(self.dates[2], self.asset.id, "buy"), (self.dates[2], self.other_asset.id, "sell")]
+        )
+        self.assertAlmostEqual(result["trades"][2]["quantity"], 2.5)
+        self.assertAlmostEqual(result["trades"][3]["quantity"], 12.5)
+
+    def test_quarterly_and_drift_backtests(self):
+        quarterly, drift = run_backtests(
+            [self.portfolio.id], ['quarterly', 'drift'], self.dates[0], self.dates[-1], drift_threshold=0.1, workers=1
+        )
+
+        self.assertEqual(quarterly["rebalances"], 1)
+        self.assertEqual(quarterly["turnover"], 0)
+        # Weights drift to a third and two thirds on the second date
+        self.assertEqual(drift["rebalances"], 2)
+        self.assertEqual(drift["trades"][2]["date"], self.dates[1])
+        self.assertAlmostEqual(drift["turnover"], 1 / 6)
+
+    def test_backtest_follows_weight_history(self):
+        WeightFactory(portfolio=self.portfolio, asset=self.asset, date=date(2022, 1, 31), weight=1)
+
+        result = run_backtests([self.portfolio.id], ['monthly'], self.dates[0], self.dates[-1], workers=1)[0]
+
+        # The asset dropped from the targets is sold completely on the next rebalance
+        self.assertEqual(result["trades"][-1]["asset_id"], self.other_asset.id)
+        self.assertAlmostEqual(result["trades"][-1]["quantity"], 50)
+        self.assertEqual(result["final_value"], 1500)
+
+    def test_parallel_backtests_match_serial(self):
+        other_portfolio = PortfolioFactory(name="Other Portfolio", initial_value=500)
+        WeightFactory(portfolio=other_portfolio, asset=self.other_asset, date=date(2022, 1, 1), weight=1)
+        arguments = ([self.portfolio.id, other_portfolio.id], ['monthly', 'quarterly', 'drift'], self.dates[0], self.dates[-1])
+
+        parallel = run_backtests(*arguments, workers=2)
+
+        self.assertEqual(parallel, run_backtests(*arguments, workers=1))
+        self.assertEqual([result["portfolio_id"] for result in parallel], [self.portfolio.id] * 3 + [other_portfolio.id] * 3)
+        self.assertEqual(parallel[-1]["final_value"], 1000)
+
+    def test_backtest_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            run_backtests([self.portfolio.id], ['weekly'], self.dates[0], self.dates[-1])
+        with self.assertRaises(ValueError):
+            run_backtests([PortfolioFactory(name="No Weights").id], ['monthly'], self.dates[0], self.dates[-1])
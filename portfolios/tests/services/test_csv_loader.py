@@ -0,0 +1,102 @@
+import gzip
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase
+from portfolios.management.utils import csv_loader
+from portfolios.management.utils.csv_loader import get_checkpoint_path, load_prices_from_csv
+from portfolios.models import Asset, LatestPrice, Price
+from portfolios.tests.factories import AssetFactory, PriceFactory
+
+CSV_ROWS = """asset,date,price
+EEUU,2022-02-15,100
+EEUU,2022-02-16,101.456
+Europa,2022-02-15,50
+Europa,2022-02-16,-1
+Europa,not a date,51
+Europa,2022-02-17,52.25
+"""
+
+
+class CsvLoaderTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.file_path = os.path.join(self.directory.name, 'prices.csv')
+        with open(self.file_path, 'w') as csv_file:
+            csv_file.write(CSV_ROWS)
+
+    def test_load_prices_from_csv(self):
+        existing_price = PriceFactory(asset=AssetFactory(name="EEUU"), date=date(2022, 2, 15), price=99)
+
+        result = load_prices_from_csv(self.file_path, chunk_size=2)
+
+        self.assertEqual(result["received"], 6)
+        self.assertEqual(result["written"], 3)
+        self.assertEqual(result["rejected"], 2)
+        self.assertEqual(result["resumed_rows"], 0)
+        self.assertEqual(Asset.objects.count(), 2)
+        self.assertEqual(Price.objects.count(), 4)
+        existing_price.refresh_from_db()
+        self.assertEqual(existing_price.price, Decimal("99"))
+        self.assertEqual(Price.objects.get(asset__name="EEUU", date=date(2022, 2, 16)).price, Decimal("101.46"))
+        self.assertEqual(LatestPrice.objects.get(asset__name="Europa").price.date, date(2022, 2, 17))
+        self.assertFalse(os.path.exists(get_checkpoint_path(self.file_path)))
+
+    def test_load_prices_from_gzip_csv(self):
+        gzip_path = f"{self.file_path}.gz"
+        with gzip.open(gzip_path, 'wt') as gzip_file:
+            gzip_file.write(CSV_ROWS)
+
+        result = load_prices_from_csv(gzip_path)
+
+        self.assertEqual(result["received"], 6)
+        self.assertEqual(Price.objects.count(), 4)
+
+    def test_load_prices_from_csv_resumes_after_interruption(self):
+        load_chunk = csv_loader._load_chunk
+        calls = []
+
+        def interrupted_load_chunk(chunk, asset_ids):
+            calls.append(len(chunk))
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return load_chunk(chunk, asset_ids)
+
+        with mock.patch.object(csv_loader, '_load_chunk', interrupted_load_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                load_prices_from_csv(self.file_path, chunk_size=2)
+        self.assertTrue(os.path.exists(get_checkpoint_path(self.file_path)))
+        self.assertEqual(Price.objects.count(), 2)
+        self.assertFalse(LatestPrice.objects.exists())
+
+        result = load_prices_from_csv(self.file_path, chunk_size=2)
+
+        self.assertEqual(result["resumed_rows"], 2)
+        self.assertEqual(result["received"], 6)
+        self.assertEqual(result["written"], 4)
+        self.assertEqual(result["rejected"], 2)
+        self.assertEqual(Price.objects.count(), 4)
+        self.assertEqual(LatestPrice.objects.get(asset__name="EEUU").price.date, date(2022, 2, 16))
+
+    def test_load_prices_from_csv_again_writes_nothing(self):
+        load_prices_from_csv(self.file_path)
+
+        result = load_prices_from_csv(self.file_path)
+
+        self.assertEqual(result["received"], 6)
+        self.assertEqual(result["written"], 0)
+        self.assertEqual(Price.objects.count(), 4)
+
+    def test_load_prices_from_csv_rejects_checkpoint_of_another_file(self):
+        with open(get_checkpoint_path(self.file_path), 'w') as checkpoint_file:
+            checkpoint_file.write('{"rows": 2, "written": 2, "rejected": 0, "start_dates": {}, "file_size": 1}')
+
+        with self.assertRaises(ValueError):
+            load_prices_from_csv(self.file_path)
+
+        result = load_prices_from_csv(self.file_path, restart=True)
+        self.assertEqual(result["resumed_rows"], 0)
+        self.assertEqual(Price.objects.count(), 4)
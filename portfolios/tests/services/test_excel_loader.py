@@ -0,0 +1,58 @@
+import os
+import tempfile
+import pandas as pd
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from portfolios.management.utils.excel_loader import load_data_from_excel
+from portfolios.models import Asset, LatestPrice, Portfolio, Price, Weight
+from portfolios.tests.factories import AssetFactory, PriceFactory
+
+
+class ExcelLoaderTests(TestCase):
+    def setUp(self):
+        handle, self.file_path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(handle)
+        self.addCleanup(os.remove, self.file_path)
+        weights = pd.DataFrame({
+            'date': ['15/02/2022', '15/02/2022'],
+            'asset': ['EEUU', 'Europa'],
+            'Portfolio 1 ': [0.6, 0.4],
+            'Portfolio 2': [1.0, None],
+        })
+        prices = pd.DataFrame({
+            'date': pd.to_datetime(['2022-02-15', '2022-02-16', '2022-02-17']),
+            'EEUU': [100.0, 101.5, 'error'],
+            'Europa': [50.0, -1.0, 52.25],
+        })
+        with pd.ExcelWriter(self.file_path) as writer:
+            weights.to_excel(writer, sheet_name='weights', index=False)
+            prices.to_excel(writer, sheet_name='prices', index=False)
+
+    def test_load_data_from_excel(self):
+        existing_price = PriceFactory(asset=AssetFactory(name="EEUU"), date=date(2022, 2, 15), price=99)
+
+        results = load_data_from_excel(self.file_path, batch_size=2)
+
+        self.assertEqual(results["prices"]["received"], 6)
+        self.assertEqual(results["prices"]["written"], 3)
+        self.assertEqual(results["prices"]["rejected"], 2)
+        self.assertEqual(results["weights"]["written"], 3)
+        self.assertEqual(set(Portfolio.objects.values_list('name', flat=True)), {"portfolio 1", "portfolio 2"})
+        self.assertEqual(Asset.objects.count(), 2)
+        # Existing prices are kept
+        existing_price.refresh_from_db()
+        self.assertEqual(existing_price.price, Decimal("99"))
+        self.assertEqual(Price.objects.get(asset__name="Europa", date=date(2022, 2, 17)).price, Decimal("52.25"))
+        self.assertEqual(Weight.objects.get(portfolio__name="portfolio 1", asset__name="Europa").weight, Decimal("0.4"))
+        self.assertEqual(LatestPrice.objects.get(asset__name="EEUU").price.date, date(2022, 2, 16))
+
+    def test_load_data_from_excel_again_writes_nothing(self):
+        load_data_from_excel(self.file_path)
+
+        results = load_data_from_excel(self.file_path)
+
+        self.assertEqual(results["prices"]["written"], 0)
+        self.assertEqual(results["weights"]["written"], 0)
+        self.assertEqual(Price.objects.count(), 4)
+        self.assertEqual(Weight.objects.count(), 3)
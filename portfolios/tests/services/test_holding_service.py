@@ -1,10 +1,13 @@
 from django.test import TestCase
 from django.utils import timezone
+from decimal import Decimal
+from portfolios.selectors.holding_selector import get_current_holdings
 from portfolios.services.holding_service import (
     create_holding,
     update_holding,
     create_initial_holdings
 )
+from portfolios.services.trade_service import record_trade
 from portfolios.tests.factories import (
     PortfolioFactory,
     AssetFactory,
@@ -36,6 +39,16 @@ class HoldingServiceTests(TestCase):
         self.assertEqual(holding.asset, self.asset)
         self.assertEqual(holding.quantity, 100.50)
 
+    def test_create_holding_includes_recorded_trades(self):
+        previous_date = self.date - timezone.timedelta(days=1)
+        record_trade(self.portfolio, self.asset, previous_date - timezone.timedelta(days=1), Decimal("5"), Decimal("100"))
+        record_trade(self.portfolio, self.asset, self.date, Decimal("3"), Decimal("100"))
+
+        # The holding sets the position on its date, so only later trades add to it
+        create_holding(self.portfolio, self.asset, previous_date, Decimal("20"))
+        self.assertEqual(get_current_holdings(self.portfolio, previous_date).get().position, Decimal("20"))
+        self.assertEqual(get_current_holdings(self.portfolio).get().position, Decimal("23"))
+
     def test_create_holding_duplicate(self):
         HoldingFactory(
             portfolio=self.portfolio,
@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from portfolios.services.metrics_service import get_portfolio_metrics
+from portfolios.services.metrics_cache_service import (
+    get_portfolio_data_version,
+    get_metrics_cache_stats,
+    reset_metrics_cache_stats
+)
+from portfolios.services.price_service import create_price
+from portfolios.services.weight_service import create_weight
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory,
+    HoldingFactory
+)
+
+
+class MetricsCacheServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_metrics_cache_stats()
+        self.portfolio = PortfolioFactory(name="Test Portfolio")
+        self.asset = AssetFactory(name="Test Asset")
+        self.start_date = date(2022, 2, 15)
+        self.end_date = date(2022, 2, 17)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.start_date, quantity=100)
+        for day in range(2):
+            PriceFactory(asset=self.asset, date=self.start_date + timedelta(days=day), price=10)
+
+    def test_repeated_metrics_are_served_from_cache(self):
+        metrics = get_portfolio_metrics(self.portfolio.id, self.start_date, self.end_date)
+        with self.assertNumQueries(1):
+            cached_metrics = get_portfolio_metrics(self.portfolio.id, self.start_date, self.end_date)
+
+        self.assertEqual(cached_metrics, metrics)
+        self.assertEqual(get_metrics_cache_stats(), {"hits": 1, "misses": 1, "hit_ratio": 0.5})
+
+    def test_price_write_invalidates_cached_metrics(self):
+        metrics = get_portfolio_metrics(self.portfolio.id, self.start_date, self.end_date)
+        self.assertEqual(len(metrics), 2)
+
+        create_price(self.asset, self.end_date, Decimal("12.00"))
+        metrics = get_portfolio_metrics(self.portfolio.id, self.start_date, self.end_date)
+
+        self.assertEqual(len(metrics), 3)
+        self.assertEqual(metrics[2]["total_value"], 1200.0)
+        self.assertEqual(get_metrics_cache_stats()["misses"], 2)
+
+    def test_weight_write_bumps_data_version(self):
+        version = get_portfolio_data_version(self.portfolio)
+        create_weight(self.portfolio, self.asset, self.start_date, 0.5)
+        self.assertNotEqual(get_portfolio_data_version(self.portfolio), version)
@@ -1,6 +1,19 @@
-from django.test import TestCase
-from datetime import date
-from portfolios.services.metrics_service import get_portfolio_metrics
+from django.test import TestCase, override_settings
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from portfolios.services import metrics_service
+from portfolios.services.metrics_service import (
+    get_portfolio_metrics,
+    get_portfolio_metrics_page,
+    get_batch_portfolio_metrics,
+    compute_portfolio_metrics
+)
+from portfolios.services.metrics_engine import METRICS_TOLERANCE
+from portfolios.services.portfolio_service import execute_buy_transaction, execute_sell_transaction
+from portfolios.services.price_grid_service import build_price_grid
+from portfolios.services.trading_calendar_service import build_trading_calendar
+from portfolios.services.valuation_service import refresh_portfolio_valuations
 from portfolios.tests.factories import (
     PortfolioFactory,
     AssetFactory,
@@ -56,6 +69,61 @@ class MetricsServiceTests(TestCase):
         self.assertEqual(float(metrics[2]["total_value"]), 1200.00)
         self.assertEqual(metrics[2]["weights"][self.asset.name], 1.0)
 
+    def test_get_portfolio_metrics_page_counts_valued_dates(self):
+        portfolio = PortfolioFactory(name="Sold Out Portfolio")
+        other_asset = AssetFactory(name="Other Asset")
+        for day in range(3, 6):
+            PriceFactory(asset=self.asset, date=self.start_date + timedelta(days=day), price=13)
+        for day in range(6):
+            PriceFactory(asset=other_asset, date=self.start_date + timedelta(days=day), price=20)
+        HoldingFactory(portfolio=portfolio, asset=self.asset, date=self.start_date, quantity=10)
+        HoldingFactory(portfolio=portfolio, asset=self.asset, date=self.start_date + timedelta(days=2), quantity=0)
+        HoldingFactory(portfolio=portfolio, asset=other_asset, date=self.start_date + timedelta(days=4), quantity=5)
+        end_date = self.start_date + timedelta(days=5)
+
+        # Nothing is held on the third and fourth days, so they are not valued
+        for materialize in (False, True):
+            if materialize:
+                refresh_portfolio_valuations(portfolio, self.start_date)
+            results, count = get_portfolio_metrics_page(portfolio.id, self.start_date, end_date, 1, 2)
+            self.assertEqual(count, 4)
+            self.assertEqual([row["date"] for row in results], [self.start_date + timedelta(days=day) for day in (1, 4)])
+
+    def test_get_portfolio_metrics_page_computes_only_the_page(self):
+        for day in range(3, 10):
+            PriceFactory(asset=self.asset, date=self.start_date + timedelta(days=day), price=13)
+
+        with mock.patch.object(metrics_service, 'build_price_grid', wraps=build_price_grid) as grid:
+            results, count = get_portfolio_metrics_page(self.portfolio.id, self.start_date, self.start_date + timedelta(days=9), 4, 3)
+        self.assertEqual(count, 10)
+        self.assertEqual([row["date"] for row in results], [self.start_date + timedelta(days=day) for day in (4, 5, 6)])
+        grid.assert_called_once_with([self.asset.id], self.start_date + timedelta(days=4), self.start_date + timedelta(days=6))
+
+    @override_settings(PRICE_STALENESS_DAYS=2)
+    def test_get_portfolio_metrics_pages_match_series(self):
+        # Prices are missing on some days, the calendar covers the middle two weeks
+        # and the portfolio is out of the market for a few days
+        portfolio = PortfolioFactory(name="Paged Portfolio")
+        other_asset = AssetFactory(name="Other Paged Asset")
+        for day in (3, 4, 8, 9, 10, 11, 15, 16, 17, 20):
+            PriceFactory(asset=self.asset, date=self.start_date + timedelta(days=day), price=10 + day)
+        for day in (0, 5, 6, 12, 18, 19):
+            PriceFactory(asset=other_asset, date=self.start_date + timedelta(days=day), price=30 + day)
+        HoldingFactory(portfolio=portfolio, asset=self.asset, date=self.start_date, quantity=10)
+        HoldingFactory(portfolio=portfolio, asset=self.asset, date=self.start_date + timedelta(days=13), quantity=0)
+        HoldingFactory(portfolio=portfolio, asset=self.asset, date=self.start_date + timedelta(days=16), quantity=4)
+        HoldingFactory(portfolio=portfolio, asset=other_asset, date=self.start_date + timedelta(days=18), quantity=5)
+        build_trading_calendar(self.start_date + timedelta(days=6), self.start_date + timedelta(days=19))
+        end_date = self.start_date + timedelta(days=21)
+
+        expected = compute_portfolio_metrics(portfolio, self.start_date, end_date)
+        pages = []
+        for offset in range(0, len(expected) + 3, 3):
+            results, count = get_portfolio_metrics_page(portfolio.id, self.start_date, end_date, offset, 3)
+            self.assertEqual(count, len(expected))
+            pages.extend(results)
+        self.assertEqual(pages, expected)
+
     def test_get_portfolio_metrics_invalid_date(self):
         with self.assertRaises(ValueError):
             get_portfolio_metrics(
@@ -88,3 +156,110 @@ class MetricsServiceTests(TestCase):
             end_date=self.end_date
         )
         self.assertEqual(len(metrics), 0)
+
+    def test_get_portfolio_metrics_matches_decimal_path(self):
+        portfolio = PortfolioFactory(name="Multi Asset Portfolio")
+        quantities = {}
+        prices = {}
+        for index in range(5):
+            asset = AssetFactory(name=f"Multi Asset {index}")
+            quantities[asset.name] = Decimal("1234.56") * (index + 1)
+            HoldingFactory(
+                portfolio=portfolio,
+                asset=asset,
+                date=self.reference_date,
+                quantity=quantities[asset.name]
+            )
+            for day in range(10):
+                if (day + index) % 4 == 3:
+                    continue
+                price = Decimal("97.13") + Decimal(day * 7 + index) / Decimal("3")
+                price = price.quantize(Decimal("0.01"))
+                PriceFactory(asset=asset, date=self.reference_date + timedelta(days=day), price=price)
+                prices.setdefault(self.reference_date + timedelta(days=day), {})[asset.name] = price
+
+        metrics = get_portfolio_metrics(
+            portfolio_id=portfolio.id,
+            start_date=self.reference_date,
+            end_date=self.reference_date + timedelta(days=9)
+        )
+
+        self.assertEqual([m["date"] for m in metrics], sorted(prices))
+        for result in metrics:
+            values = {name: quantities[name] * price for name, price in prices[result["date"]].items()}
+            total_value = sum(values.values())
+            self.assertLessEqual(
+                abs(result["total_value"] - float(total_value)),
+                METRICS_TOLERANCE * float(total_value)
+            )
+            self.assertEqual(set(result["weights"]), set(values))
+            for name, value in values.items():
+                self.assertAlmostEqual(result["weights"][name], float(value / total_value), delta=METRICS_TOLERANCE)
+
+    def test_get_portfolio_metrics_uses_holdings_in_force(self):
+        other_asset = AssetFactory(name="Other Asset")
+        for day in range(3):
+            PriceFactory(asset=other_asset, date=self.start_date + timedelta(days=day), price=5.00)
+
+        execute_buy_transaction(self.portfolio.id, other_asset.id, Decimal("500.00"), date(2022, 2, 16))
+        execute_sell_transaction(self.portfolio.id, self.asset.id, Decimal("600.00"), self.end_date)
+
+        metrics = get_portfolio_metrics(
+            portfolio_id=self.portfolio.id,
+            start_date=self.start_date,
+            end_date=self.end_date
+        )
+
+        self.assertEqual(metrics[0]["total_value"], 1000.0)
+        self.assertEqual(metrics[0]["weights"], {self.asset.name: 1.0})
+        self.assertEqual(metrics[1]["total_value"], 1600.0)
+        self.assertEqual(metrics[1]["weights"][other_asset.name], 500 / 1600)
+        self.assertEqual(metrics[2]["total_value"], 1100.0)
+        self.assertEqual(metrics[2]["weights"][self.asset.name], 600 / 1100)
+
+    def test_get_batch_portfolio_metrics_matches_single_portfolio(self):
+        other_portfolio = PortfolioFactory(name="Other Portfolio")
+        other_asset = AssetFactory(name="Other Asset")
+        HoldingFactory(portfolio=other_portfolio, asset=self.asset, date=self.reference_date, quantity=10.00)
+        HoldingFactory(portfolio=other_portfolio, asset=other_asset, date=self.reference_date, quantity=20.00)
+        for day in range(3):
+            PriceFactory(asset=other_asset, date=self.start_date + timedelta(days=day), price=5.00)
+
+        portfolio_ids = [self.portfolio.id, other_portfolio.id]
+        with self.assertNumQueries(4):
+            metrics = get_batch_portfolio_metrics(portfolio_ids, self.start_date, self.end_date)
+
+        self.assertEqual(list(metrics), portfolio_ids)
+        for portfolio in (self.portfolio, other_portfolio):
+            self.assertEqual(
+                metrics[portfolio.id],
+                compute_portfolio_metrics(portfolio, self.start_date, self.end_date)
+            )
+        self.assertEqual(metrics[other_portfolio.id][0]["total_value"], 200.0)
+
+    def test_get_batch_portfolio_metrics_invalid_date(self):
+        with self.assertRaises(ValueError):
+            get_batch_portfolio_metrics([self.portfolio.id], date(2022, 2, 14), self.end_date)
+
+    def test_get_portfolio_metrics_at_resolution(self):
+        portfolio = PortfolioFactory(name="Long Portfolio")
+        asset = AssetFactory(name="Long Asset")
+        reference_date = date(2022, 1, 3)
+        HoldingFactory(portfolio=portfolio, asset=asset, date=reference_date, quantity=1.00)
+        for day in range(90):
+            PriceFactory(asset=asset, date=reference_date + timedelta(days=day), price=100 + day % 7)
+        end_date = reference_date + timedelta(days=89)
+
+        weekly = get_portfolio_metrics(portfolio.id, reference_date, end_date, "weekly")
+        self.assertEqual(len(weekly), 13)
+        self.assertTrue(all(result["date"].weekday() == 6 for result in weekly[:-1]))
+        self.assertEqual(weekly[-1]["date"], end_date)
+
+        monthly = get_portfolio_metrics(portfolio.id, reference_date, end_date, "monthly")
+        self.assertEqual([result["date"] for result in monthly], [date(2022, 1, 31), date(2022, 2, 28), date(2022, 3, 31), date(2022, 4, 2)])
+        self.assertEqual(monthly[0]["total_value"], 100 + (date(2022, 1, 31) - reference_date).days % 7)
+
+        points = get_portfolio_metrics(portfolio.id, reference_date, end_date, 10)
+        self.assertEqual(len(points), 10)
+        self.assertEqual(points[0]["date"], reference_date)
+        self.assertEqual(points[-1]["date"], end_date)
@@ -1,19 +1,28 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
+from portfolios.models import Asset, Holding, Price, Trade, Weight
+from portfolios.selectors.holding_selector import get_current_holdings
+from portfolios.services.trade_service import record_trades
 from portfolios.services.portfolio_service import (
     create_portfolio,
     update_portfolio,
     execute_buy_transaction,
     execute_sell_transaction,
-    rebalance_portfolio
+    execute_batch_trades,
+    rebalance_portfolio,
+    rebalance_to_target_weights
 )
 from portfolios.tests.factories import (
     PortfolioFactory,
     AssetFactory,
     PriceFactory,
-    HoldingFactory
+    HoldingFactory,
+    WeightFactory
 )
 
 
@@ -148,3 +157,173 @@ class PortfolioServiceTests(TestCase):
                 buy_amount=Decimal("1000.00"),
                 start_date=self.date
             )
+
+    def test_execute_batch_trades(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date - timezone.timedelta(days=1), quantity=20)
+        orders = [
+            {"asset_id": self.asset1.id, "side": "sell", "amount": Decimal("1000")},
+            {"asset_id": self.asset2.id, "side": "buy", "amount": Decimal("500")},
+            {"asset_id": self.asset2.id, "side": "buy", "amount": Decimal("500")},
+        ]
+
+        result = execute_batch_trades(self.portfolio.id, orders, self.date)
+
+        self.assertEqual(result["total_sold"], Decimal("1000"))
+        self.assertEqual(result["total_bought"], Decimal("1000"))
+        self.assertEqual([trade["quantity"] for trade in result["trades"]], [Decimal("10"), Decimal("10"), Decimal("10")])
+        self.assertEqual(Trade.objects.filter(portfolio=self.portfolio).count(), 3)
+        self.assertEqual(Holding.objects.get(asset=self.asset2, date=self.date).quantity, Decimal("0"))
+        self.assertEqual(get_current_holdings(self.portfolio).get(asset=self.asset2).position, Decimal("20"))
+
+    def test_execute_batch_trades_queries_do_not_grow_with_orders(self):
+        assets = [AssetFactory() for _ in range(6)]
+        for asset in assets:
+            PriceFactory(asset=asset, date=self.date, price=10)
+            HoldingFactory(portfolio=self.portfolio, asset=asset, date=self.date - timezone.timedelta(days=1), quantity=10)
+
+        query_counts = []
+        for batch in (assets[:1], assets[1:]):
+            orders = [{"asset_id": asset.id, "side": "buy", "amount": Decimal("100")} for asset in batch]
+            with CaptureQueriesContext(connection) as queries:
+                execute_batch_trades(self.portfolio.id, orders, self.date)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_execute_batch_trades_insufficient_quantity_applies_nothing(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date, quantity=5)
+        orders = [
+            {"asset_id": self.asset2.id, "side": "buy", "amount": Decimal("500")},
+            {"asset_id": self.asset1.id, "side": "sell", "amount": Decimal("300")},
+            {"asset_id": self.asset1.id, "side": "sell", "amount": Decimal("300")},
+        ]
+        with self.assertRaises(ValueError) as context:
+            execute_batch_trades(self.portfolio.id, orders, self.date)
+        self.assertIn("Test Asset 1", str(context.exception))
+        self.assertFalse(Trade.objects.exists())
+        self.assertFalse(Holding.objects.filter(asset=self.asset2).exists())
+
+    def test_execute_batch_trades_missing_price_or_asset(self):
+        asset = AssetFactory(name="No Price Asset")
+        with self.assertRaises(Price.DoesNotExist):
+            execute_batch_trades(self.portfolio.id, [{"asset_id": asset.id, "side": "buy", "amount": Decimal("1")}], self.date)
+        with self.assertRaises(Asset.DoesNotExist):
+            execute_batch_trades(self.portfolio.id, [{"asset_id": 999, "side": "buy", "amount": Decimal("1")}], self.date)
+        self.assertFalse(Trade.objects.exists())
+
+    def test_rebalance_to_target_weights(self):
+        asset3 = AssetFactory(name="Test Asset 3")
+        PriceFactory(asset=asset3, date=self.date, price=20)
+        previous_date = self.date - timezone.timedelta(days=1)
+        # 3000 in asset 1, 1000 in asset 2 and 0 in asset 3
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=previous_date, quantity=30)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset2, date=previous_date, quantity=20)
+
+        result = rebalance_to_target_weights(self.portfolio.id, self.date, {
+            self.asset1.id: Decimal("0.5"),
+            asset3.id: Decimal("0.5"),
+        })
+
+        self.assertEqual(result["total_value"], Decimal("4000"))
+        self.assertEqual(
+            {(trade["asset_id"], trade["side"], trade["quantity"]) for trade in result["trades"]},
+            {(self.asset1.id, "sell", Decimal("10")), (self.asset2.id, "sell", Decimal("20")), (asset3.id, "buy", Decimal("100"))}
+        )
+        self.assertEqual(
+            {weight["asset_id"]: weight["weight"] for weight in result["weights"]},
+            {self.asset1.id: Decimal("0.5"), asset3.id: Decimal("0.5")}
+        )
+        self.assertEqual(Trade.objects.filter(portfolio=self.portfolio).count(), 3)
+        positions = {holding.asset_id: holding.position for holding in get_current_holdings(self.portfolio)}
+        self.assertEqual(positions, {self.asset1.id: Decimal("20"), asset3.id: Decimal("100")})
+
+    def test_rebalance_to_stored_target_weights(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date - timezone.timedelta(days=1), quantity=10)
+        WeightFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date - timezone.timedelta(days=2), weight=0.6)
+        WeightFactory(portfolio=self.portfolio, asset=self.asset2, date=self.date - timezone.timedelta(days=2), weight=0.4)
+
+        result = rebalance_to_target_weights(self.portfolio.id, self.date)
+
+        self.assertEqual([weight["weight"] for weight in result["weights"]], [Decimal("0.6"), Decimal("0.4")])
+        # Rebalancing again to the same targets does not trade
+        result = rebalance_to_target_weights(self.portfolio.id, self.date)
+        self.assertEqual(result["trades"], [])
+        self.assertEqual(Trade.objects.count(), 2)
+
+    def test_rebalance_to_target_weights_queries_do_not_grow_with_assets(self):
+        query_counts = []
+        for count in (2, 6):
+            portfolio = PortfolioFactory()
+            assets = [AssetFactory() for _ in range(count)]
+            for asset in assets:
+                PriceFactory(asset=asset, date=self.date, price=10)
+                HoldingFactory(portfolio=portfolio, asset=asset, date=self.date - timezone.timedelta(days=1), quantity=10)
+            targets = {asset.id: Decimal(index + 1) / Decimal(count * (count + 1) / 2) for index, asset in enumerate(assets)}
+            with CaptureQueriesContext(connection) as queries:
+                rebalance_to_target_weights(portfolio.id, self.date, targets)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_rebalance_to_target_weights_invalid_targets(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date, quantity=10)
+        with self.assertRaises(ValueError):
+            rebalance_to_target_weights(self.portfolio.id, self.date, {self.asset1.id: Decimal("0.5")})
+        with self.assertRaises(ValueError):
+            rebalance_to_target_weights(self.portfolio.id, self.date, {self.asset1.id: Decimal("1.5"), self.asset2.id: Decimal("-0.5")})
+        with self.assertRaises(Weight.DoesNotExist):
+            rebalance_to_target_weights(self.portfolio.id, self.date)
+        with self.assertRaises(ValueError):
+            rebalance_to_target_weights(PortfolioFactory().id, self.date, {self.asset1.id: Decimal("1")})
+        self.assertFalse(Trade.objects.exists())
+
+    def test_record_trades_rejects_stale_version(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date, quantity=10)
+        version = self.portfolio.trade_version
+        record_trades(self.portfolio, self.date, [(self.asset1, Decimal("-1"), Decimal("100"))], expected_version=version)
+
+        with self.assertRaises(ValueError):
+            record_trades(self.portfolio, self.date, [(self.asset1, Decimal("-1"), Decimal("100"))], expected_version=version)
+        self.assertEqual(Trade.objects.count(), 1)
+
+    def test_dry_run_buy_and_sell_do_not_trade(self):
+        cache.clear()
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date, quantity=10)
+
+        result = execute_sell_transaction(self.portfolio.id, self.asset1.id, Decimal("500"), self.date, dry_run=True)
+        self.assertTrue(result["dry_run"])
+        self.assertEqual(result["quantity"], Decimal("5"))
+        result = execute_buy_transaction(self.portfolio.id, self.asset2.id, Decimal("500"), self.date, dry_run=True)
+        self.assertEqual(result["message"], "Purchase simulated")
+        with self.assertRaises(ValueError):
+            execute_sell_transaction(self.portfolio.id, self.asset1.id, Decimal("1100"), self.date, dry_run=True)
+        self.assertFalse(Trade.objects.exists())
+
+    def test_dry_run_rebalance_to_target_weights_matches_rebalance(self):
+        cache.clear()
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date - timezone.timedelta(days=1), quantity=10)
+        targets = {self.asset1.id: Decimal("0.4"), self.asset2.id: Decimal("0.6")}
+
+        simulated = rebalance_to_target_weights(self.portfolio.id, self.date, targets, dry_run=True)
+        self.assertFalse(Trade.objects.exists())
+        result = rebalance_to_target_weights(self.portfolio.id, self.date, targets)
+
+        self.assertEqual(simulated["message"], "Rebalance simulated")
+        self.assertEqual(simulated["trades"], result["trades"])
+        self.assertEqual(simulated["weights"], result["weights"])
+
+    def test_dry_run_rebalance_portfolio_values_simulated_positions(self):
+        cache.clear()
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.date, quantity=1000)
+
+        result = rebalance_portfolio(
+            portfolio_id=self.portfolio.id,
+            sell_asset_id=self.asset1.id,
+            buy_asset_id=self.asset2.id,
+            sell_amount=Decimal("50000.00"),
+            buy_amount=Decimal("50000.00"),
+            start_date=self.date,
+            dry_run=True
+        )
+
+        self.assertTrue(result["dry_run"])
+        self.assertFalse(Trade.objects.exists())
+        self.assertEqual(set(result["metrics"][0]["weights"]), {"Test Asset 1", "Test Asset 2"})
@@ -0,0 +1,126 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+from portfolios.models import Price
+from portfolios.services.metrics_service import compute_portfolio_metrics
+from portfolios.services.portfolio_service import execute_buy_transaction
+from portfolios.services.price_grid_service import (
+    build_price_grid,
+    get_grid_price,
+    get_cached_grid_prices
+)
+from portfolios.services.price_service import propagate_price_changes
+from portfolios.services.trading_calendar_service import build_trading_calendar
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory,
+    HoldingFactory
+)
+
+
+class PriceGridServiceTests(TestCase):
+    def setUp(self):
+        # Monday 2022-02-14 to Sunday 2022-02-27
+        self.reference_date = date(2022, 2, 14)
+        self.asset = AssetFactory(name="Grid Asset")
+        self.other_asset = AssetFactory(name="Other Grid Asset")
+        for day in (0, 1, 2, 3, 4, 7, 8):
+            PriceFactory(asset=self.asset, date=self.reference_date + timedelta(days=day), price=100 + day)
+        for day in (0, 4):
+            PriceFactory(asset=self.other_asset, date=self.reference_date + timedelta(days=day), price=50 + day)
+        self.asset_ids = [self.asset.id, self.other_asset.id]
+
+    def test_build_price_grid_without_staleness_keeps_price_dates(self):
+        ordinals, grid = build_price_grid(self.asset_ids, self.reference_date, self.reference_date + timedelta(days=8), 0)
+        self.assertEqual(len(ordinals), 7)
+        self.assertTrue(np.isnan(grid[1, 1]))
+
+    def test_build_price_grid_fills_calendar_dates(self):
+        build_trading_calendar(self.reference_date, self.reference_date + timedelta(days=13))
+        ordinals, grid = build_price_grid(self.asset_ids, self.reference_date, self.reference_date + timedelta(days=13), 3)
+
+        self.assertEqual([date.fromordinal(ordinal).weekday() for ordinal in ordinals.tolist()], [0, 1, 2, 3, 4] * 2)
+        # The other asset is filled for three days after each price
+        self.assertEqual(grid[:, 1].tolist()[:5], [50, 50, 50, 50, 54])
+        # Monday's price of Friday is three days old, Tuesday's is stale
+        self.assertEqual(grid[5, 1], 54)
+        self.assertTrue(np.isnan(grid[6, 1]))
+        # The last price of the asset is on the second Tuesday and lasts until Friday
+        self.assertEqual(grid[6:, 0].tolist(), [108, 108, 108, 108])
+
+    def test_build_price_grid_uses_price_dates_outside_calendar(self):
+        # The calendar covers the first week only; the second week keeps its price dates
+        build_trading_calendar(self.reference_date, self.reference_date + timedelta(days=6))
+        ordinals, grid = build_price_grid(self.asset_ids, self.reference_date, self.reference_date + timedelta(days=8), 3)
+
+        self.assertEqual(
+            [date.fromordinal(ordinal) for ordinal in ordinals.tolist()],
+            [self.reference_date + timedelta(days=day) for day in (0, 1, 2, 3, 4, 7, 8)]
+        )
+        self.assertEqual(grid[5].tolist(), [107, 54])
+
+    @override_settings(PRICE_STALENESS_DAYS=3)
+    def test_metrics_keep_dates_after_calendar(self):
+        build_trading_calendar(self.reference_date, self.reference_date + timedelta(days=4))
+        portfolio = PortfolioFactory()
+        HoldingFactory(portfolio=portfolio, asset=self.asset, date=self.reference_date, quantity=1)
+
+        results = compute_portfolio_metrics(portfolio, self.reference_date, self.reference_date + timedelta(days=13))
+        self.assertEqual(len(results), 7)
+        self.assertEqual(results[-1]["date"], self.reference_date + timedelta(days=8))
+
+    def test_build_price_grid_fills_from_before_range(self):
+        start_date = self.reference_date + timedelta(days=1)
+        ordinals, grid = build_price_grid(self.asset_ids, start_date, start_date + timedelta(days=1), 2)
+        self.assertEqual(date.fromordinal(int(ordinals[0])), start_date)
+        self.assertEqual(grid[0].tolist(), [101, 50])
+
+    @override_settings(PRICE_STALENESS_DAYS=3)
+    def test_metrics_share_filled_grid(self):
+        build_trading_calendar(self.reference_date, self.reference_date + timedelta(days=13))
+        portfolio = PortfolioFactory()
+        HoldingFactory(portfolio=portfolio, asset=self.asset, date=self.reference_date, quantity=1)
+        HoldingFactory(portfolio=portfolio, asset=self.other_asset, date=self.reference_date, quantity=2)
+
+        results = compute_portfolio_metrics(portfolio, self.reference_date, self.reference_date + timedelta(days=16))
+        self.assertEqual(len(results), 10)
+        self.assertEqual(results[1]["total_value"], 101 + 2 * 50)
+        self.assertEqual(set(results[1]["weights"]), {"Grid Asset", "Other Grid Asset"})
+        self.assertEqual(results[-1]["date"], self.reference_date + timedelta(days=11))
+        self.assertEqual(results[-1]["weights"], {"Grid Asset": 1.0})
+
+    @override_settings(PRICE_STALENESS_DAYS=3)
+    def test_get_grid_price(self):
+        monday = self.reference_date + timedelta(days=7)
+        self.assertEqual(get_grid_price(self.other_asset, monday).price, Decimal('54'))
+        with self.assertRaises(Price.DoesNotExist):
+            get_grid_price(self.other_asset, monday + timedelta(days=1))
+
+    @override_settings(PRICE_STALENESS_DAYS=3)
+    def test_trade_priced_from_grid(self):
+        portfolio = PortfolioFactory()
+        result = execute_buy_transaction(
+            portfolio.id, self.other_asset.id, Decimal('108'), self.reference_date + timedelta(days=6)
+        )
+        self.assertEqual(result["price"], Decimal('54'))
+        self.assertEqual(result["quantity"], Decimal('2'))
+
+    def test_get_grid_price_without_staleness(self):
+        with self.assertRaises(Price.DoesNotExist):
+            get_grid_price(self.other_asset, self.reference_date + timedelta(days=1))
+
+    def test_cached_grid_prices_follow_price_changes(self):
+        cache.clear()
+        day = self.reference_date + timedelta(days=4)
+        self.assertEqual(get_cached_grid_prices(self.asset_ids, day), {self.asset.id: Decimal("104"), self.other_asset.id: Decimal("54")})
+        with self.assertNumQueries(0):
+            get_cached_grid_prices(self.asset_ids, day)
+
+        Price.objects.filter(asset=self.asset, date=day).update(price=110)
+        propagate_price_changes([self.asset.id], day)
+        self.assertEqual(get_cached_grid_prices([self.asset.id], day), {self.asset.id: Decimal("110")})
+        with self.assertRaises(Price.DoesNotExist):
+            get_cached_grid_prices(self.asset_ids, self.reference_date + timedelta(days=5))
@@ -1,7 +1,8 @@
 from django.test import TestCase
 from django.utils import timezone
 from decimal import Decimal
-from portfolios.services.price_service import create_price
+from portfolios.models import LatestPrice, Price
+from portfolios.services.price_service import create_price, refresh_latest_prices, bulk_create_prices
 from portfolios.tests.factories import AssetFactory, PriceFactory
 
 class PriceServiceTests(TestCase):
@@ -23,3 +24,59 @@ class PriceServiceTests(TestCase):
     def test_create_price_invalid_value(self):
         with self.assertRaises(ValueError):
             create_price(self.asset, self.date, Decimal("-100.00"))
+
+    def test_create_price_records_latest_price(self):
+        price = create_price(self.asset, self.date, Decimal("100.00"))
+        create_price(self.asset, self.date - timezone.timedelta(days=1), Decimal("90.00"))
+        self.assertEqual(LatestPrice.objects.get(asset=self.asset).price, price)
+
+        newer_price = create_price(self.asset, self.date + timezone.timedelta(days=1), Decimal("110.00"))
+        self.assertEqual(LatestPrice.objects.get(asset=self.asset).price, newer_price)
+
+    def test_refresh_latest_prices(self):
+        other_asset = AssetFactory(name="Other Asset")
+        Price.objects.bulk_create([
+            Price(asset=self.asset, date=self.date - timezone.timedelta(days=day), price=Decimal(100 + day))
+            for day in range(3)
+        ] + [Price(asset=other_asset, date=self.date, price=Decimal("50.00"))])
+
+        self.assertEqual(refresh_latest_prices([self.asset.id, other_asset.id]), 2)
+        self.assertEqual(LatestPrice.objects.get(asset=self.asset).price.date, self.date)
+        self.assertEqual(LatestPrice.objects.get(asset=other_asset).price.price, Decimal("50.00"))
+
+    def test_bulk_create_prices(self):
+        other_asset = AssetFactory(name="Other Asset")
+        PriceFactory(asset=self.asset, date=self.date, price=100.00)
+        rows = [
+            {"asset": self.asset.name, "date": self.date.isoformat(), "price": "120.00"},
+            {"asset": self.asset.name, "date": (self.date - timezone.timedelta(days=1)).isoformat(), "price": "99.50"},
+            {"asset": other_asset.name, "date": self.date.isoformat(), "price": 50},
+            {"asset": "Unknown Asset", "date": self.date.isoformat(), "price": "10.00"},
+            {"asset": other_asset.name, "date": "not a date", "price": "10.00"},
+            {"asset": other_asset.name, "date": self.date.isoformat(), "price": "-1"},
+            {"asset": other_asset.name, "date": self.date.isoformat(), "price": "51.00"},
+            {"asset": other_asset.name}
+        ]
+
+        result = bulk_create_prices(rows)
+
+        self.assertEqual(result["received"], 8)
+        self.assertEqual(result["written"], 2)
+        self.assertEqual([reject["index"] for reject in result["rejected"]], [0, 3, 4, 5, 6, 7])
+        self.assertGreater(result["rows_per_second"], 0)
+        self.assertEqual(Price.objects.get(asset=self.asset, date=self.date).price, Decimal("100.00"))
+        self.assertEqual(LatestPrice.objects.get(asset=other_asset).price.price, Decimal("50.00"))
+
+    def test_bulk_create_prices_updates_on_conflict(self):
+        PriceFactory(asset=self.asset, date=self.date, price=100.00)
+        rows = [
+            {"asset": self.asset.name, "date": self.date.isoformat(), "price": "120.00"},
+            {"asset": self.asset.name, "date": (self.date - timezone.timedelta(days=1)).isoformat(), "price": "99.50"}
+        ]
+
+        result = bulk_create_prices(rows, on_conflict="update")
+
+        self.assertEqual(result["written"], 2)
+        self.assertEqual(result["rejected"], [])
+        self.assertEqual(Price.objects.filter(asset=self.asset).count(), 2)
+        self.assertEqual(LatestPrice.objects.get(asset=self.asset).price.price, Decimal("120.00"))
@@ -0,0 +1,170 @@
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+from django.test import TestCase, override_settings
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+from portfolios.services.metrics_service import compute_portfolio_metrics
+from portfolios.services.price_service import create_price
+from portfolios.services import price_store_service
+from portfolios.services.price_store_service import (
+    PRICE_STORE_POINTER,
+    _lock_price_store,
+    rebuild_price_store,
+    refresh_price_store,
+    read_price_matrix,
+    load_price_matrix
+)
+from portfolios.models import Price
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory,
+    HoldingFactory
+)
+
+
+class PriceStoreServiceTests(TestCase):
+    def setUp(self):
+        self.store_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.store_dir.cleanup)
+        self.reference_date = date(2022, 2, 15)
+        self.asset = AssetFactory(name="Stored Asset")
+        self.other_asset = AssetFactory(name="Other Stored Asset")
+        for day in range(10):
+            PriceFactory(asset=self.asset, date=self.reference_date + timedelta(days=day), price=100 + day)
+            if day % 2 == 0:
+                PriceFactory(asset=self.other_asset, date=self.reference_date + timedelta(days=day), price=50 + day)
+        self.asset_ids = [self.other_asset.id, self.asset.id]
+
+    def test_read_price_matrix_without_store(self):
+        self.assertIsNone(read_price_matrix(self.asset_ids, self.reference_date, self.reference_date))
+
+    def test_read_price_matrix_matches_database(self):
+        start_date = self.reference_date + timedelta(days=2)
+        end_date = self.reference_date + timedelta(days=6)
+        expected_dates, expected_prices = load_price_matrix(self.asset_ids, start_date, end_date)
+
+        with override_settings(PRICE_STORE_DIR=self.store_dir.name):
+            self.assertEqual(rebuild_price_store(), 15)
+            with self.assertNumQueries(0):
+                dates, prices = read_price_matrix(self.asset_ids, start_date, end_date)
+
+        np.testing.assert_array_equal(dates, expected_dates)
+        np.testing.assert_array_equal(prices, expected_prices)
+
+    def test_price_writes_refresh_store(self):
+        portfolio = PortfolioFactory()
+        HoldingFactory(portfolio=portfolio, asset=self.asset, date=self.reference_date, quantity=10)
+        end_date = self.reference_date + timedelta(days=10)
+
+        with override_settings(PRICE_STORE_DIR=self.store_dir.name):
+            rebuild_price_store()
+            create_price(self.asset, end_date, Decimal("120.00"))
+            dates, prices = read_price_matrix([self.asset.id], end_date, end_date)
+            stored_metrics = compute_portfolio_metrics(portfolio, self.reference_date, end_date)
+
+        self.assertEqual(date.fromordinal(int(dates[0])), end_date)
+        self.assertEqual(prices[0, 0], 120.0)
+        self.assertEqual(stored_metrics, compute_portfolio_metrics(portfolio, self.reference_date, end_date))
+        self.assertEqual(stored_metrics[-1]["total_value"], 1200.0)
+
+    def _get_segments(self) -> list[str]:
+        return (Path(self.store_dir.name) / PRICE_STORE_POINTER).read_text().split()
+
+    def test_refresh_appends_new_dates_as_segment(self):
+        new_date = self.reference_date + timedelta(days=10)
+        with override_settings(PRICE_STORE_DIR=self.store_dir.name):
+            rebuild_price_store()
+            [first_segment] = self._get_segments()
+            PriceFactory(asset=self.other_asset, date=new_date, price=70)
+
+            self.assertEqual(refresh_price_store(new_date), 1)
+            dates, prices = read_price_matrix(self.asset_ids, self.reference_date, new_date)
+
+        # The stored dates are kept as they were, not copied into a new segment
+        self.assertEqual(self._get_segments()[0], first_segment)
+        self.assertEqual(len(self._get_segments()), 2)
+        expected_dates, expected_prices = load_price_matrix(self.asset_ids, self.reference_date, new_date)
+        np.testing.assert_array_equal(dates, expected_dates)
+        np.testing.assert_array_equal(prices, expected_prices)
+
+    def test_refresh_from_stored_date_matches_database(self):
+        changed_date = self.reference_date + timedelta(days=4)
+        end_date = self.reference_date + timedelta(days=9)
+        with override_settings(PRICE_STORE_DIR=self.store_dir.name):
+            rebuild_price_store()
+            PriceFactory(asset=self.other_asset, date=changed_date + timedelta(days=1), price=80)
+            refresh_price_store(changed_date)
+            dates, prices = read_price_matrix(self.asset_ids, self.reference_date, end_date)
+
+        self.assertEqual(len(self._get_segments()), 2)
+        self.assertEqual(len(list(Path(self.store_dir.name).glob('segment-*'))), 2)
+        expected_dates, expected_prices = load_price_matrix(self.asset_ids, self.reference_date, end_date)
+        np.testing.assert_array_equal(dates, expected_dates)
+        np.testing.assert_array_equal(prices, expected_prices)
+
+    def test_refresh_without_store_dir(self):
+        with override_settings(PRICE_STORE_DIR=None):
+            self.assertEqual(refresh_price_store(self.reference_date), 0)
+            create_price(self.asset, self.reference_date + timedelta(days=10), Decimal("120.00"))
+
+    def test_refresh_reads_only_given_assets(self):
+        changed_date = self.reference_date + timedelta(days=4)
+        end_date = self.reference_date + timedelta(days=9)
+        with override_settings(PRICE_STORE_DIR=self.store_dir.name):
+            rebuild_price_store()
+            Price.objects.filter(asset=self.asset, date__gte=changed_date).update(price=200)
+            # Not refreshed, so the store keeps its old prices
+            Price.objects.filter(asset=self.other_asset).update(price=1)
+
+            with self.assertNumQueries(1):
+                self.assertEqual(refresh_price_store(changed_date, [self.asset.id]), 6)
+            dates, prices = read_price_matrix(self.asset_ids, self.reference_date, end_date)
+
+        self.assertEqual(len(dates), 10)
+        np.testing.assert_array_equal(prices[4:, 1], np.full(6, 200.0))
+        np.testing.assert_array_equal(prices[:4, 1], [100.0, 101.0, 102.0, 103.0])
+        np.testing.assert_array_equal(prices[::2, 0], [50.0, 52.0, 54.0, 56.0, 58.0])
+
+    def test_price_writes_on_one_date_keep_each_other(self):
+        new_date = self.reference_date + timedelta(days=10)
+        with override_settings(PRICE_STORE_DIR=self.store_dir.name):
+            rebuild_price_store()
+            create_price(self.asset, new_date, Decimal("120.00"))
+            create_price(self.other_asset, new_date, Decimal("70.00"))
+            dates, prices = read_price_matrix(self.asset_ids, self.reference_date, new_date)
+
+        expected_dates, expected_prices = load_price_matrix(self.asset_ids, self.reference_date, new_date)
+        np.testing.assert_array_equal(dates, expected_dates)
+        np.testing.assert_array_equal(prices, expected_prices)
+        np.testing.assert_array_equal(prices[-1], [70.0, 120.0])
+
+    def test_refresh_compacts_segments(self):
+        with override_settings(PRICE_STORE_DIR=self.store_dir.name), \
+                mock.patch.object(price_store_service, 'PRICE_STORE_MAX_SEGMENTS', 2):
+            rebuild_price_store()
+            for day in (10, 11):
+                PriceFactory(asset=self.asset, date=self.reference_date + timedelta(days=day), price=120)
+                refresh_price_store(self.reference_date + timedelta(days=day))
+
+            self.assertEqual(len(self._get_segments()), 1)
+            dates, _ = read_price_matrix(self.asset_ids, self.reference_date, self.reference_date + timedelta(days=11))
+        self.assertEqual(len(dates), 12)
+
+    def test_writers_take_turns(self):
+        store_dir = Path(self.store_dir.name)
+        acquired = threading.Event()
+
+        def write():
+            with _lock_price_store(store_dir):
+                acquired.set()
+
+        with _lock_price_store(store_dir):
+            writer = threading.Thread(target=write)
+            writer.start()
+            self.assertFalse(acquired.wait(0.2))
+        writer.join()
+        self.assertTrue(acquired.is_set())
@@ -0,0 +1,102 @@
+from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+import numpy as np
+from portfolios.services.risk_service import (
+    TRADING_DAYS_PER_YEAR,
+    compute_returns,
+    rolling_volatility,
+    compute_drawdowns,
+    align_flows,
+    get_portfolio_risk
+)
+from portfolios.services.trade_service import record_trade
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory,
+    HoldingFactory
+)
+
+
+class RiskServiceTests(TestCase):
+    def setUp(self):
+        self.portfolio = PortfolioFactory(name="Risk Portfolio")
+        self.asset = AssetFactory(name="Risk Asset")
+        self.reference_date = date(2022, 2, 15)
+        self.prices = [100.00, 110.00, 99.00, 104.50, 121.00, 96.80]
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.reference_date, quantity=10.00)
+        for day, price in enumerate(self.prices):
+            PriceFactory(asset=self.asset, date=self.reference_date + timedelta(days=day), price=price)
+        self.end_date = self.reference_date + timedelta(days=len(self.prices) - 1)
+
+    def test_rolling_volatility_matches_window_std(self):
+        returns = compute_returns(np.array([100.0, 103.0, 101.0, 106.0, 104.0, 108.0, 107.0]))
+        volatility = rolling_volatility(returns, 3)
+
+        self.assertTrue(np.isnan(volatility[:3]).all())
+        for index in range(3, len(returns)):
+            expected = returns[index - 2:index + 1].std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+            self.assertAlmostEqual(volatility[index], expected)
+
+    def test_compute_drawdowns(self):
+        drawdowns = compute_drawdowns(np.array([100.0, 120.0, 90.0, 130.0, 117.0]))
+        np.testing.assert_allclose(drawdowns, [0.0, 0.0, -0.25, 0.0, -0.1])
+
+    def test_get_portfolio_risk(self):
+        risk = get_portfolio_risk(self.portfolio.id, self.reference_date, self.end_date, windows=[2])
+        summary = risk["summary"]
+        series = risk["series"]
+
+        self.assertEqual(len(series), len(self.prices))
+        self.assertIsNone(series[0]["daily_return"])
+        self.assertAlmostEqual(series[1]["daily_return"], 0.1)
+        self.assertIsNone(series[1]["volatility"]["2"])
+        self.assertIsNotNone(series[2]["volatility"]["2"])
+        self.assertAlmostEqual(summary["total_return"], 96.80 / 100.00 - 1)
+        self.assertAlmostEqual(summary["max_drawdown"], 96.80 / 121.00 - 1)
+        self.assertEqual(summary["max_drawdown_peak_date"], self.reference_date + timedelta(days=4))
+        self.assertEqual(summary["max_drawdown_trough_date"], self.end_date)
+
+        returns = np.array(self.prices[1:]) / np.array(self.prices[:-1]) - 1
+        sharpe_ratio = returns.mean() / returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+        self.assertAlmostEqual(summary["sharpe_ratio"], sharpe_ratio)
+
+    def test_align_flows_to_next_valued_date(self):
+        dates = [self.reference_date, self.reference_date + timedelta(days=3), self.reference_date + timedelta(days=4)]
+        flows = align_flows(dates, {
+            self.reference_date: Decimal("50.00"),
+            self.reference_date + timedelta(days=1): Decimal("100.00"),
+            self.reference_date + timedelta(days=3): Decimal("-20.00"),
+            self.reference_date + timedelta(days=9): Decimal("30.00")
+        })
+        np.testing.assert_allclose(flows, [0.0, 80.0, 0.0])
+
+    def test_get_portfolio_risk_nets_out_trades(self):
+        record_trade(self.portfolio, self.asset, self.reference_date + timedelta(days=2), Decimal("5.00"), Decimal("99.00"))
+        record_trade(self.portfolio, self.asset, self.reference_date + timedelta(days=4), Decimal("-12.00"), Decimal("121.00"))
+        risk = get_portfolio_risk(self.portfolio.id, self.reference_date, self.end_date, windows=[2])
+        summary = risk["summary"]
+        series = risk["series"]
+
+        # Trades change the value but not the returns, which stay the price returns.
+        self.assertAlmostEqual(series[2]["total_value"], 15 * 99.00)
+        self.assertAlmostEqual(series[4]["total_value"], 3 * 121.00)
+        returns = np.array(self.prices[1:]) / np.array(self.prices[:-1]) - 1
+        for index, daily_return in enumerate(returns, start=1):
+            self.assertAlmostEqual(series[index]["daily_return"], daily_return)
+        self.assertAlmostEqual(summary["total_return"], 96.80 / 100.00 - 1)
+        self.assertAlmostEqual(summary["max_drawdown"], 96.80 / 121.00 - 1)
+        self.assertEqual(summary["max_drawdown_peak_date"], self.reference_date + timedelta(days=4))
+
+    def test_get_portfolio_risk_reuses_metrics_prices(self):
+        get_portfolio_risk(self.portfolio.id, self.reference_date, self.end_date)
+        with self.assertNumQueries(1):
+            get_portfolio_risk(self.portfolio.id, self.reference_date, self.end_date, windows=[3])
+
+    def test_get_portfolio_risk_no_holdings(self):
+        portfolio = PortfolioFactory(name="Empty Risk Portfolio")
+        risk = get_portfolio_risk(portfolio.id, self.reference_date, self.end_date)
+        self.assertEqual(risk["series"], [])
+        self.assertIsNone(risk["summary"]["max_drawdown"])
+        self.assertIsNone(risk["summary"]["sharpe_ratio"])
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from decimal import Decimal
+from portfolios.models import Holding, Trade
+from portfolios.services.metrics_service import compute_portfolio_metrics
+from portfolios.services.simulation_service import (
+    get_cached_positions,
+    simulate_trades,
+    simulate_portfolio_metrics
+)
+from portfolios.services.trade_service import record_trade
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory,
+    HoldingFactory
+)
+
+
+class SimulationServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.portfolio = PortfolioFactory(name="Test Portfolio")
+        self.asset = AssetFactory(name="Test Asset")
+        self.other_asset = AssetFactory(name="Other Asset")
+        self.date = timezone.now().date()
+        self.start_date = self.date - timezone.timedelta(days=4)
+        for day in range(5):
+            PriceFactory(asset=self.asset, date=self.start_date + timezone.timedelta(days=day), price=100 + day)
+            PriceFactory(asset=self.other_asset, date=self.start_date + timezone.timedelta(days=day), price=50 - day)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.start_date, quantity=10)
+
+    def test_simulate_trades_does_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            positions = simulate_trades(self.portfolio, self.date, [
+                (self.asset, Decimal("-4"), Decimal("104")),
+                (self.other_asset, Decimal("2"), Decimal("46")),
+            ])
+
+        self.assertEqual(positions, {self.asset.id: Decimal("6"), self.other_asset.id: Decimal("2")})
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries.captured_queries))
+        self.assertFalse(Trade.objects.exists())
+        self.portfolio.refresh_from_db()
+        self.assertEqual(self.portfolio.trade_version, 0)
+
+    def test_simulate_trades_insufficient_quantity(self):
+        with self.assertRaises(ValueError):
+            simulate_trades(self.portfolio, self.date, [(self.asset, Decimal("-11"), Decimal("104"))])
+
+    def test_simulate_trades_rejects_backdated_oversell(self):
+        record_trade(self.portfolio, self.asset, self.date, Decimal("-10"), Decimal("104"))
+
+        with self.assertRaises(ValueError):
+            simulate_trades(self.portfolio, self.start_date, [(self.asset, Decimal("-5"), Decimal("100"))])
+
+    def test_cached_positions_follow_recorded_trades(self):
+        self.assertEqual(get_cached_positions(self.portfolio, self.date), {self.asset.id: Decimal("10")})
+        with self.assertNumQueries(0):
+            get_cached_positions(self.portfolio, self.date)
+
+        record_trade(self.portfolio, self.asset, self.date, Decimal("-3"), Decimal("104"))
+        self.assertEqual(get_cached_positions(self.portfolio, self.date), {self.asset.id: Decimal("7")})
+
+    def test_simulated_metrics_match_recorded_trades(self):
+        trade_date = self.start_date + timezone.timedelta(days=2)
+        orders = [(self.asset, Decimal("-4")), (self.other_asset, Decimal("8"))]
+
+        simulated = simulate_portfolio_metrics(
+            self.portfolio, self.start_date, self.date,
+            [(trade_date, asset.id, quantity) for asset, quantity in orders]
+        )
+        self.assertEqual(Holding.objects.count(), 1)
+
+        for asset, quantity in orders:
+            record_trade(self.portfolio, asset, trade_date, quantity, Decimal("1"))
+        self.assertEqual(simulated, compute_portfolio_metrics(self.portfolio, self.start_date, self.date))
+        self.assertEqual(simulated[2]["weights"].keys(), {"Test Asset", "Other Asset"})
@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from django.db import OperationalError, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from decimal import Decimal
+from portfolios.models import Holding, Trade
+from portfolios.selectors.holding_selector import get_current_holdings, get_holding_rows_until
+from portfolios.services.trade_service import record_trade, snapshot_holdings, run_with_retry
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    HoldingFactory
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TradeServiceTests(TestCase):
+    def setUp(self):
+        self.portfolio = PortfolioFactory(name="Test Portfolio")
+        self.asset = AssetFactory(name="Test Asset")
+        self.date = timezone.now().date()
+        self.previous_date = self.date - timezone.timedelta(days=5)
+
+    def test_record_trade_appends_to_ledger(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.previous_date, quantity=10)
+
+        trade = record_trade(self.portfolio, self.asset, self.date, Decimal("5"), Decimal("100"))
+
+        self.assertEqual(trade.date, self.date)
+        self.assertEqual(trade.quantity, Decimal("5"))
+        self.assertEqual(trade.price, Decimal("100"))
+        # The snapshot is left as it was and no snapshot is written on the trade date
+        self.assertEqual(Holding.objects.get(asset=self.asset).quantity, Decimal("10"))
+        self.assertEqual(get_current_holdings(self.portfolio).get().position, Decimal("15"))
+
+    def test_record_trade_opens_position_with_snapshot(self):
+        record_trade(self.portfolio, self.asset, self.date, Decimal("5"), Decimal("100"))
+        record_trade(self.portfolio, self.asset, self.date, Decimal("3"), Decimal("100"))
+
+        # The position is opened with an empty snapshot that the trades add to
+        self.assertEqual(Trade.objects.count(), 2)
+        self.assertEqual(Holding.objects.get(asset=self.asset, date=self.date).quantity, Decimal("0"))
+        self.assertEqual(get_holding_rows_until(self.portfolio, self.date), [(self.date, self.asset.id, Decimal("8"))])
+        self.assertEqual(get_current_holdings(self.portfolio).get().position, Decimal("8"))
+
+    def test_record_trade_carries_backdated_trade_forward(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.previous_date, quantity=10)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.date, quantity=20)
+
+        trade_date = self.previous_date + timezone.timedelta(days=1)
+        record_trade(self.portfolio, self.asset, trade_date, Decimal("-4"), Decimal("100"))
+
+        # Snapshots are left as they were; the later one does not include the trade
+        self.assertEqual(list(Holding.objects.order_by('date').values_list('quantity', flat=True)), [Decimal("10"), Decimal("20")])
+        self.assertEqual(get_holding_rows_until(self.portfolio, self.date), [
+            (self.previous_date, self.asset.id, Decimal("10")),
+            (trade_date, self.asset.id, Decimal("6")),
+            (self.date, self.asset.id, Decimal("16"))
+        ])
+        self.assertEqual(get_current_holdings(self.portfolio).get().position, Decimal("16"))
+
+    def test_record_trade_after_snapshot_on_same_date(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.date, quantity=10)
+        record_trade(self.portfolio, self.asset, self.date, Decimal("-4"), Decimal("100"))
+        snapshot_holdings(self.portfolio, self.date + timezone.timedelta(days=1))
+
+        self.assertEqual(Holding.objects.get(date=self.date).quantity, Decimal("10"))
+        self.assertEqual(get_holding_rows_until(self.portfolio, self.date), [(self.date, self.asset.id, Decimal("6"))])
+        self.assertEqual(Holding.objects.get(date=self.date + timezone.timedelta(days=1)).quantity, Decimal("6"))
+        self.assertEqual(get_current_holdings(self.portfolio).get().position, Decimal("6"))
+
+    def test_record_trade_insufficient_quantity(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.previous_date, quantity=10)
+        record_trade(self.portfolio, self.asset, self.date, Decimal("-8"), Decimal("100"))
+
+        with self.assertRaises(ValueError):
+            record_trade(self.portfolio, self.asset, self.date, Decimal("-3"), Decimal("100"))
+        self.assertEqual(Trade.objects.count(), 1)
+
+    def test_record_trade_rejects_backdated_oversell(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.previous_date, quantity=10)
+        record_trade(self.portfolio, self.asset, self.date, Decimal("-10"), Decimal("100"))
+
+        # 10 are available on the backdated date, but none are left after the later sell
+        with self.assertRaises(ValueError):
+            record_trade(self.portfolio, self.asset, self.previous_date + timezone.timedelta(days=2), Decimal("-5"), Decimal("100"))
+        self.assertEqual(Trade.objects.count(), 1)
+        self.assertEqual(get_holding_rows_until(self.portfolio, self.date)[-1], (self.date, self.asset.id, Decimal("0")))
+
+    def test_trades_are_append_only(self):
+        trade = record_trade(self.portfolio, self.asset, self.date, Decimal("5"), Decimal("100"))
+        trade.quantity = Decimal("6")
+        with self.assertRaises(ValueError):
+            trade.save()
+
+    def test_holding_rows_replay_ledger(self):
+        middle_date = self.previous_date + timezone.timedelta(days=2)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.previous_date, quantity=10)
+        record_trade(self.portfolio, self.asset, middle_date, Decimal("5"), Decimal("100"))
+        record_trade(self.portfolio, self.asset, self.date, Decimal("-12"), Decimal("100"))
+
+        self.assertEqual(get_holding_rows_until(self.portfolio, self.date), [
+            (self.previous_date, self.asset.id, Decimal("10")),
+            (middle_date, self.asset.id, Decimal("15")),
+            (self.date, self.asset.id, Decimal("3")),
+        ])
+        self.assertEqual(get_holding_rows_until(self.portfolio, middle_date)[-1][2], Decimal("15"))
+
+    def test_snapshot_holdings_folds_ledger_tail(self):
+        other_asset = AssetFactory(name="Other Asset")
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.previous_date, quantity=10)
+        HoldingFactory(portfolio=self.portfolio, asset=other_asset, date=self.previous_date, quantity=7)
+        record_trade(self.portfolio, self.asset, self.previous_date + timezone.timedelta(days=1), Decimal("5"), Decimal("100"))
+        rows_before = get_holding_rows_until(self.portfolio, self.date)
+
+        self.assertEqual(snapshot_holdings(self.portfolio, self.date), 1)
+        self.assertEqual(Holding.objects.get(asset=self.asset, date=self.date).quantity, Decimal("15"))
+        self.assertFalse(Holding.objects.filter(asset=other_asset, date=self.date).exists())
+        self.assertEqual(snapshot_holdings(self.portfolio, self.date), 0)
+
+        # Positions are unchanged by the snapshot
+        rows_after = get_holding_rows_until(self.portfolio, self.date)
+        self.assertEqual(rows_after[:len(rows_before)], rows_before)
+        self.assertEqual(rows_after[-1], (self.date, self.asset.id, Decimal("15")))
+        self.assertEqual(get_current_holdings(self.portfolio).get(asset=self.asset).position, Decimal("15"))
+
+
+class TradeConcurrencyTests(TransactionTestCase):
+    workers = 8
+    sells_per_worker = 5
+
+    def setUp(self):
+        self.portfolio = PortfolioFactory(name="Test Portfolio")
+        self.asset = AssetFactory(name="Test Asset")
+        self.date = timezone.now().date()
+        self.previous_date = self.date - timezone.timedelta(days=5)
+
+    # The in-memory test database fails on a locked table instead of waiting, so
+    # workers lean on retries far more than against a server database.
+    @override_settings(TRADE_MAX_ATTEMPTS=50)
+    def test_parallel_sells_never_oversell(self):
+        # Half of the sells can be filled; every worker races to sell the same position.
+        available = self.workers * self.sells_per_worker // 2
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.previous_date, quantity=available)
+        filled, rejected = [], []
+        start = threading.Barrier(self.workers)
+
+        def sell():
+            try:
+                start.wait()
+                for _ in range(self.sells_per_worker):
+                    try:
+                        filled.append(record_trade(self.portfolio, self.asset, self.date, Decimal("-1"), Decimal("100")))
+                    except ValueError:
+                        rejected.append(1)
+            finally:
+                connections.close_all()
+
+        started_at = time.perf_counter()
+        threads = [threading.Thread(target=sell) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started_at
+        logger.info(f"{len(filled) + len(rejected)} sells by {self.workers} workers in {elapsed:.2f}s")
+
+        self.assertEqual(len(filled), available)
+        self.assertEqual(len(rejected), self.workers * self.sells_per_worker - available)
+        self.assertEqual(Trade.objects.count(), available)
+        self.assertEqual(Holding.objects.get(asset=self.asset).quantity, Decimal(available))
+        self.assertFalse(get_current_holdings(self.portfolio).exists())
+        self.portfolio.refresh_from_db()
+        # Rejected batches roll their version bump back with them
+        self.assertEqual(self.portfolio.trade_version, available)
+
+    def test_retry_is_left_to_outer_transaction(self):
+        attempts = []
+
+        def locked():
+            attempts.append(1)
+            raise OperationalError("database is locked")
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                run_with_retry(locked, "test operation")
+        self.assertEqual(len(attempts), 1)
+
+        with self.assertRaises(ValueError):
+            run_with_retry(locked, "test operation", max_attempts=2)
+        self.assertEqual(len(attempts), 3)
@@ -0,0 +1,63 @@
+from django.test import TestCase, override_settings
+from datetime import date, timedelta
+from portfolios.models import PortfolioValuation, TradingDay
+from portfolios.services.holding_service import create_holding
+from portfolios.services.trading_calendar_service import build_trading_calendar
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory
+)
+
+
+class TradingCalendarServiceTests(TestCase):
+    def setUp(self):
+        # Monday 2022-02-14 to Sunday 2022-02-27
+        self.reference_date = date(2022, 2, 14)
+        self.asset = AssetFactory(name="Calendar Asset")
+        for day in range(7):
+            PriceFactory(asset=self.asset, date=self.reference_date + timedelta(days=day), price=100 + day)
+
+    def test_build_trading_calendar(self):
+        holiday = self.reference_date + timedelta(days=2)
+        count = build_trading_calendar(self.reference_date, self.reference_date + timedelta(days=13), [holiday])
+        self.assertEqual(count, 9)
+        dates = list(TradingDay.objects.values_list('date', flat=True))
+        self.assertNotIn(holiday, dates)
+        self.assertTrue(all(day.weekday() < 5 for day in dates))
+
+        # Rebuilding with other holidays replaces the days of the range
+        build_trading_calendar(self.reference_date, self.reference_date + timedelta(days=13))
+        self.assertEqual(TradingDay.objects.count(), 10)
+
+    def test_build_trading_calendar_invalid_range(self):
+        with self.assertRaises(ValueError):
+            build_trading_calendar(self.reference_date, self.reference_date - timedelta(days=1))
+
+    @override_settings(PRICE_STALENESS_DAYS=3)
+    def test_build_trading_calendar_refreshes_materialized_valuations(self):
+        portfolio = PortfolioFactory(name="Calendar Portfolio")
+        create_holding(portfolio, self.asset, self.reference_date, 10)
+        self.assertEqual(PortfolioValuation.objects.filter(portfolio=portfolio).count(), 7)
+
+        build_trading_calendar(self.reference_date, self.reference_date + timedelta(days=13))
+
+        # The weekend is inside the calendar and no longer part of the grid, and
+        # the next trading days are filled with the price of Sunday
+        dates = list(PortfolioValuation.objects.filter(portfolio=portfolio).order_by('date').values_list('date', flat=True))
+        self.assertEqual(dates, [self.reference_date + timedelta(days=day) for day in (0, 1, 2, 3, 4, 7, 8, 9)])
+
+    @override_settings(PRICE_STALENESS_DAYS=3)
+    def test_build_trading_calendar_refreshes_days_between_ranges(self):
+        for day in range(7, 21):
+            PriceFactory(asset=self.asset, date=self.reference_date + timedelta(days=day), price=100 + day)
+        portfolio = PortfolioFactory(name="Calendar Gap Portfolio")
+        create_holding(portfolio, self.asset, self.reference_date, 10)
+        build_trading_calendar(self.reference_date, self.reference_date + timedelta(days=4))
+        self.assertEqual(PortfolioValuation.objects.filter(portfolio=portfolio).count(), 21)
+
+        build_trading_calendar(self.reference_date + timedelta(days=14), self.reference_date + timedelta(days=18))
+
+        # The second week is now inside the calendar without trading days
+        dates = list(PortfolioValuation.objects.filter(portfolio=portfolio).order_by('date').values_list('date', flat=True))
+        self.assertEqual(dates, [self.reference_date + timedelta(days=day) for day in (0, 1, 2, 3, 4, 14, 15, 16, 17, 18, 19, 20)])
@@ -0,0 +1,107 @@
+import importlib.util
+import io
+from unittest import skipUnless
+from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from portfolios.models import Asset, Price, Holding, LatestPrice, Trade
+from portfolios.selectors.holding_selector import get_current_holdings
+from portfolios.services.trade_service import record_trade
+from portfolios.services.transfer_service import export_table, import_table
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory,
+    HoldingFactory
+)
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+@skipUnless(HAS_PYARROW, "pyarrow is not installed")
+class TransferServiceTests(TestCase):
+    def setUp(self):
+        self.portfolio = PortfolioFactory(name="Transfer Portfolio")
+        self.asset = AssetFactory(name="Transfer Asset")
+        self.reference_date = date(2022, 2, 15)
+        for day in range(5):
+            PriceFactory(asset=self.asset, date=self.reference_date + timedelta(days=day), price=Decimal("100.25") + day)
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset, date=self.reference_date, quantity=Decimal("12.50"))
+
+    def _round_trip(self, table: str, file_format: str, model: type) -> tuple[list, dict]:
+        exported_file = io.BytesIO()
+        exported = export_table(table, file_format, exported_file, chunk_size=2)
+        rows = list(model.objects.order_by('date').values_list('asset__name', 'date'))
+        self.assertEqual(exported, len(rows))
+
+        model.objects.all().delete()
+        exported_file.seek(0)
+        result = import_table(table, file_format, exported_file, chunk_size=2)
+        self.assertEqual(list(model.objects.order_by('date').values_list('asset__name', 'date')), rows)
+        return rows, result
+
+    def test_prices_round_trip_parquet(self):
+        prices = list(Price.objects.order_by('date').values_list('price', flat=True))
+        _, result = self._round_trip('prices', 'parquet', Price)
+
+        self.assertEqual(result["written"], 5)
+        self.assertEqual(result["rejected"], 0)
+        self.assertEqual(list(Price.objects.order_by('date').values_list('price', flat=True)), prices)
+        self.assertEqual(LatestPrice.objects.get(asset=self.asset).price.date, self.reference_date + timedelta(days=4))
+
+    def test_holdings_round_trip_arrow(self):
+        _, result = self._round_trip('holdings', 'arrow', Holding)
+        self.assertEqual(result["written"], 1)
+        self.assertEqual(Holding.objects.get().quantity, Decimal("12.50"))
+
+    def test_holdings_round_trip_includes_trades_after_snapshot(self):
+        record_trade(self.portfolio, self.asset, self.reference_date + timedelta(days=2), Decimal("5"), Decimal("102.25"))
+        exported_file = io.BytesIO()
+        self.assertEqual(export_table('holdings', 'parquet', exported_file), 2)
+
+        Trade.objects.all().delete()
+        Holding.objects.all().delete()
+        exported_file.seek(0)
+        import_table('holdings', 'parquet', exported_file)
+
+        self.assertEqual(get_current_holdings(self.portfolio, self.reference_date + timedelta(days=1)).get().position, Decimal("12.50"))
+        self.assertEqual(get_current_holdings(self.portfolio).get().position, Decimal("17.50"))
+
+    def test_import_creates_assets_and_rejects_unknown_portfolios(self):
+        exported_file = io.BytesIO()
+        export_table('holdings', 'parquet', exported_file)
+        Holding.objects.all().delete()
+        self.portfolio.delete()
+        self.asset.delete()
+
+        exported_file.seek(0)
+        result = import_table('holdings', 'parquet', exported_file)
+
+        self.assertEqual(result["rejected"], 1)
+        self.assertEqual(result["written"], 0)
+        self.assertTrue(Asset.objects.filter(name="Transfer Asset").exists())
+
+    def test_import_reports_only_new_rows_as_written(self):
+        exported_file = io.BytesIO()
+        export_table('prices', 'parquet', exported_file)
+        Price.objects.filter(date=self.reference_date).delete()
+
+        exported_file.seek(0)
+        result = import_table('prices', 'parquet', exported_file, chunk_size=2)
+
+        self.assertEqual(result["received"], 5)
+        self.assertEqual(result["written"], 1)
+        self.assertEqual(Price.objects.count(), 5)
+
+    def test_import_updates_on_conflict(self):
+        exported_file = io.BytesIO()
+        export_table('prices', 'parquet', exported_file)
+        Price.objects.update(price=Decimal("1.00"))
+
+        exported_file.seek(0)
+        import_table('prices', 'parquet', exported_file, on_conflict='update')
+        self.assertEqual(Price.objects.get(date=self.reference_date).price, Decimal("100.25"))
+
+    def test_unknown_table(self):
+        with self.assertRaises(ValueError):
+            export_table('portfolios', 'parquet', io.BytesIO())
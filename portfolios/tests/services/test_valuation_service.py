@@ -0,0 +1,70 @@
+from django.test import TestCase, override_settings
+from datetime import date, timedelta
+from decimal import Decimal
+from portfolios.models import PortfolioValuation
+from portfolios.services.holding_service import create_holding
+from portfolios.services.price_service import create_price
+from portfolios.services.metrics_service import get_portfolio_metrics
+from portfolios.services.valuation_service import refresh_portfolio_valuations, refresh_valuations_for_assets
+from portfolios.tests.factories import (
+    PortfolioFactory,
+    AssetFactory,
+    PriceFactory,
+    HoldingFactory
+)
+
+
+class ValuationServiceTests(TestCase):
+    def setUp(self):
+        self.portfolio = PortfolioFactory(name="Test Portfolio")
+        self.asset1 = AssetFactory(name="Test Asset 1")
+        self.asset2 = AssetFactory(name="Test Asset 2")
+        self.reference_date = date(2022, 2, 15)
+        for day in range(5):
+            PriceFactory(asset=self.asset1, date=self.reference_date + timedelta(days=day), price=10 + day)
+            PriceFactory(asset=self.asset2, date=self.reference_date + timedelta(days=day), price=20)
+
+    def test_create_holding_materializes_history(self):
+        create_holding(self.portfolio, self.asset1, self.reference_date, 100)
+        create_holding(self.portfolio, self.asset2, self.reference_date, 50)
+
+        valuations = PortfolioValuation.objects.filter(portfolio=self.portfolio).order_by('date')
+        self.assertEqual(valuations.count(), 5)
+        self.assertEqual(valuations[0].total_value, 2000.0)
+        self.assertEqual(valuations[4].total_value, 2400.0)
+        self.assertEqual(valuations[0].weights, {str(self.asset1.id): 0.5, str(self.asset2.id): 0.5})
+
+        metrics = get_portfolio_metrics(self.portfolio.id, self.reference_date, self.reference_date + timedelta(days=4))
+        self.assertEqual(metrics[0]["weights"], {"Test Asset 1": 0.5, "Test Asset 2": 0.5})
+        self.assertEqual([m["total_value"] for m in metrics], [2000.0, 2100.0, 2200.0, 2300.0, 2400.0])
+
+    def test_create_price_refreshes_materialized_date(self):
+        create_holding(self.portfolio, self.asset1, self.reference_date, 100)
+        new_date = self.reference_date + timedelta(days=5)
+        create_price(self.asset1, new_date, Decimal("30.00"))
+
+        valuation = PortfolioValuation.objects.get(portfolio=self.portfolio, date=new_date)
+        self.assertEqual(valuation.total_value, 3000.0)
+
+    @override_settings(PRICE_STALENESS_DAYS=3)
+    def test_create_price_refreshes_filled_dates(self):
+        stale_asset = AssetFactory(name="Stale Asset")
+        PriceFactory(asset=stale_asset, date=self.reference_date, price=10)
+        create_holding(self.portfolio, self.asset1, self.reference_date, 100)
+        create_holding(self.portfolio, stale_asset, self.reference_date, 1)
+
+        # The new price also fills the following dates, which have no price of their own
+        create_price(stale_asset, self.reference_date + timedelta(days=1), Decimal("100.00"))
+
+        valuation = PortfolioValuation.objects.get(portfolio=self.portfolio, date=self.reference_date + timedelta(days=3))
+        self.assertEqual(valuation.total_value, 1400.0)
+
+    def test_refresh_valuations_for_assets_skips_unmaterialized_portfolios(self):
+        HoldingFactory(portfolio=self.portfolio, asset=self.asset1, date=self.reference_date, quantity=100)
+        refreshed = refresh_valuations_for_assets([self.asset1.id], self.reference_date)
+        self.assertEqual(refreshed, 0)
+        self.assertFalse(PortfolioValuation.objects.filter(portfolio=self.portfolio).exists())
+
+    def test_refresh_portfolio_valuations_without_holdings(self):
+        refreshed = refresh_portfolio_valuations(self.portfolio, self.reference_date)
+        self.assertEqual(refreshed, 0)
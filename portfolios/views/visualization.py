@@ -2,6 +2,7 @@ from django.views.generic import TemplateView
 from rest_framework import serializers
 from portfolios.services.visualization_service import get_portfolio_metrics_plot
 from portfolios.selectors.portfolio_selector import get_portfolio_by_id
+from portfolios.services.metrics_engine import DAILY, parse_resolution
 
 class PortfolioMetricsPlotView(TemplateView):
     template_name = 'portfolio/metrics_plot.html'
@@ -9,6 +10,13 @@ class PortfolioMetricsPlotView(TemplateView):
     class QueryParamsSerializer(serializers.Serializer):
         start_date = serializers.DateField(required=True)
         end_date = serializers.DateField(required=True)
+        resolution = serializers.CharField(required=False, default=DAILY)
+
+        def validate_resolution(self, value):
+            try:
+                return parse_resolution(value)
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
 
     def get_context_data(self, **kwargs):
         portfolio_id = kwargs['portfolio_id']
@@ -19,8 +27,9 @@ class PortfolioMetricsPlotView(TemplateView):
         
         start_date = serializer.validated_data.get('start_date')
         end_date = serializer.validated_data.get('end_date')
+        resolution = serializer.validated_data.get('resolution')
         
-        plot_div = get_portfolio_metrics_plot(portfolio_id, start_date, end_date)
+        plot_div = get_portfolio_metrics_plot(portfolio_id, start_date, end_date, resolution)
         
         return {
             'plot_div': plot_div,